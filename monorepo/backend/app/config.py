@@ -33,6 +33,7 @@ class Settings:
     embed_model: str
     store: str
     chroma_dir: str
+    numpy_store_dir: str  # STORE=numpy; defaults to DATA_DIR/vectors
     pinecone_api_key: str | None
     pinecone_index: str | None
     data_dir: str
@@ -44,9 +45,87 @@ class Settings:
     twilio_number_map: Dict[str, List[str]]
     tenant_sql_dsn: Dict[str, List[str]]  # map tenant -> [DSN]
     default_sql_dsn: str | None
+    db_max_engines: int  # engines (one per distinct database DSN) kept open; the least recently used is disposed beyond this
+    db_pool_size: int
+    db_max_overflow: int
+    db_pool_recycle_seconds: int  # reconnect pooled server connections older than this
+    db_sqlite_mmap_mb: int
+    db_sqlite_busy_timeout_ms: int  # how long a SQLite writer waits for the lock before failing
     site_api_keys: Dict[str, List[str]]  # map site_id -> [api_key]
     crypto_secret: str | None
     twilio_service_map: Dict[str, List[str]]  # phone_number -> [service_labels]
+    store_cache_max: int  # max open per-tenant vector stores per process
+    store_cache_idle_seconds: float
+    vector_workers: int  # threads running blocking vector-store calls
+    vector_tenant_concurrency: int  # max concurrent store calls per tenant
+    ollama_max_inflight: int  # cap on concurrent requests to the model server
+    ollama_connect_timeout: float
+    ollama_embed_timeout: float  # read timeout; *_total_timeout bounds the whole call
+    ollama_embed_total_timeout: float
+    ollama_generate_timeout: float
+    ollama_generate_total_timeout: float
+    ollama_stream_timeout: float  # max gap between streamed lines
+    ollama_stream_total_timeout: float
+    embed_cache_max_mb: float  # memory budget for cached query vectors
+    embed_cache_ttl_seconds: float
+    embed_batch_max_items: int  # micro-batch flush size; <= 1 disables batching
+    embed_batch_max_wait_ms: float
+    embed_ingest_batch_chars: int  # per-request text budget for document chunks
+    embed_ingest_batch_items: int
+    embed_ingest_concurrency: int
+    embed_ingest_retries: int
+    chunk_max_tokens: int  # chunk budget; capped to the embed model's context
+    chunk_overlap_tokens: int  # trailing sentences repeated at the start of the next chunk
+    max_upload_mb: int  # per uploaded file (and request body, plus 1 MB); larger uploads get 413
+    ingest_workers: int  # background ingest jobs processed concurrently
+    extract_workers: int  # processes parsing PDF/DOCX documents
+    ingest_job_max_attempts: int
+    ingest_job_lease_seconds: float  # running jobs without a heartbeat this long are requeued
+    ingest_poll_seconds: float
+    bulk_ingest_concurrency: int  # documents of one claimed bulk group ingested at once
+    bulk_upsert_batch: int  # chunks per vector-store write during bulk ingest
+    bulk_claim_files: int  # queued files of one bulk upload a worker ingests together
+    bulk_max_files: int  # members accepted from one archive
+    bulk_max_archive_mb: int  # uncompressed size of one archive; also caps a /ingest/bulk request body
+    answer_cache_threshold: float  # cosine similarity needed to reuse an answer
+    answer_cache_max_entries: int  # per tenant/customer bucket; 0 disables
+    answer_cache_ttl_seconds: float
+    answer_cache_max_buckets: int  # (tenant, customer) buckets kept; least recently used are dropped
+    answer_cache_generation_check_seconds: float  # how often to look for documents ingested by other processes
+    retrieval_mode: str  # vector | lexical | hybrid
+    ollama_keep_alive: str  # how long Ollama keeps the model (and its KV cache) loaded after a request
+    session_max: int  # chat sessions held in memory
+    session_idle_seconds: float
+    session_max_turns: int  # question/answer pairs kept per session
+    session_max_context_tokens: int  # longer Ollama contexts are dropped and the history re-prefilled
+    piper_voices_dir: str  # <voice>.onnx models for the Piper worker pool; unset disables synthesis
+    piper_worker_cmd: str  # overrides the worker command line; {voice} and {model} are substituted
+    piper_workers: int  # worker processes per voice
+    piper_max_queue: int  # requests waiting per voice before new ones fail fast
+    piper_timeout_seconds: float  # a reply taking longer kills and restarts the worker
+    piper_health_seconds: float  # idle workers are pinged this often; 0 disables
+    stt_engine: str  # streaming STT for WebRTC voice ("whisper" needs faster-whisper); unset disables
+    stt_model: str
+    vad_energy_db: float  # speech must be louder than this (dBFS) and the noise floor + margin
+    vad_margin_db: float
+    vad_hangover_ms: float  # silence that ends an utterance
+    vad_min_speech_ms: float  # shorter sounds are ignored
+    vad_max_utterance_seconds: float
+    rtc_tts_voice: str  # Piper voice for WebRTC answers (default TTS_VOICE)
+    rtc_max_sessions: int  # live WebRTC sessions per process; further offers get 503
+    rtc_idle_seconds: float  # sessions without inbound media or data for this long are closed
+    rtc_reap_interval_seconds: float
+    tts_voice: str  # Piper voice for phone answers and prewarmed phrases
+    tts_cache_mb: int  # disk budget for synthesized audio; least recently played files are deleted first
+    tts_prewarm: bool  # synthesize DATA_DIR/tenants/<tenant>/phrases.json at startup
+    twilio_segment_wait_seconds: float  # how long one TwiML request waits for the next spoken sentence
+    llm_max_concurrent: int  # generations sent to Ollama at once; the rest wait in the scheduler
+    llm_max_queue: int  # waiting requests before new ones get 503
+    llm_tenant_max_queue: int  # waiting requests per tenant before it gets 429
+    llm_tenant_weights: Dict[str, float]  # fair-share weight per tenant (default 1)
+    context_max_tokens: int  # retrieved context per prompt; capped to the chat model's window
+    context_overfetch: int  # candidates retrieved per packed snippet, for diversity selection
+    context_mmr_lambda: float  # 1.0 = relevance only, lower favours diverse snippets
 
 
 def get_settings() -> Settings:
@@ -63,6 +142,7 @@ def get_settings() -> Settings:
         embed_model=os.getenv("EMBED_MODEL", "nomic-embed-text"),
         store=os.getenv("STORE", "chroma"),
         chroma_dir=os.getenv("CHROMA_DIR", "./chroma"),
+        numpy_store_dir=os.getenv("NUMPY_STORE_DIR", ""),
         pinecone_api_key=os.getenv("PINECONE_API_KEY", "") or None,
         pinecone_index=os.getenv("PINECONE_INDEX", "") or None,
         data_dir=os.getenv("DATA_DIR", "./data"),
@@ -75,9 +155,87 @@ def get_settings() -> Settings:
     twilio_number_map=_parse_map(os.getenv("TWILIO_NUMBER_MAP", "")),
     tenant_sql_dsn=_parse_map(os.getenv("TENANT_SQL_DSN", "")),
     default_sql_dsn=os.getenv("DEFAULT_SQL_DSN", "") or None,
+    db_max_engines=int(os.getenv("DB_MAX_ENGINES", "64")),
+    db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    db_pool_recycle_seconds=int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800")),
+    db_sqlite_mmap_mb=int(os.getenv("DB_SQLITE_MMAP_MB", "64")),
+    db_sqlite_busy_timeout_ms=int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000")),
     site_api_keys=_parse_map(os.getenv("SITE_API_KEYS", "")),
     crypto_secret=os.getenv("CRYPTO_SECRET", "") or None,
     twilio_service_map=_parse_map(os.getenv("TWILIO_SERVICE_MAP", "")),
+    store_cache_max=int(os.getenv("STORE_CACHE_MAX", "256")),
+    store_cache_idle_seconds=float(os.getenv("STORE_CACHE_IDLE_SECONDS", "900")),
+    vector_workers=int(os.getenv("VECTOR_WORKERS", "8")),
+    vector_tenant_concurrency=int(os.getenv("VECTOR_TENANT_CONCURRENCY", "4")),
+    ollama_max_inflight=int(os.getenv("OLLAMA_MAX_INFLIGHT", "8")),
+    ollama_connect_timeout=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")),
+    ollama_embed_timeout=float(os.getenv("OLLAMA_EMBED_TIMEOUT", "30")),
+    ollama_embed_total_timeout=float(os.getenv("OLLAMA_EMBED_TOTAL_TIMEOUT", "60")),
+    ollama_generate_timeout=float(os.getenv("OLLAMA_GENERATE_TIMEOUT", "120")),
+    ollama_generate_total_timeout=float(os.getenv("OLLAMA_GENERATE_TOTAL_TIMEOUT", "300")),
+    ollama_stream_timeout=float(os.getenv("OLLAMA_STREAM_TIMEOUT", "60")),
+    ollama_stream_total_timeout=float(os.getenv("OLLAMA_STREAM_TOTAL_TIMEOUT", "600")),
+    embed_cache_max_mb=float(os.getenv("EMBED_CACHE_MAX_MB", "64")),
+    embed_cache_ttl_seconds=float(os.getenv("EMBED_CACHE_TTL_SECONDS", "3600")),
+    embed_batch_max_items=int(os.getenv("EMBED_BATCH_MAX_ITEMS", "32")),
+    embed_batch_max_wait_ms=float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5")),
+    embed_ingest_batch_chars=int(os.getenv("EMBED_INGEST_BATCH_CHARS", "16000")),
+    embed_ingest_batch_items=int(os.getenv("EMBED_INGEST_BATCH_ITEMS", "64")),
+    embed_ingest_concurrency=int(os.getenv("EMBED_INGEST_CONCURRENCY", "4")),
+    embed_ingest_retries=int(os.getenv("EMBED_INGEST_RETRIES", "3")),
+    chunk_max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", "350")),
+    chunk_overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "40")),
+    max_upload_mb=int(os.getenv("MAX_UPLOAD_MB", "25")),
+    ingest_workers=int(os.getenv("INGEST_WORKERS", "2")),
+    extract_workers=int(os.getenv("EXTRACT_WORKERS", "2")),
+    ingest_job_max_attempts=int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3")),
+    ingest_job_lease_seconds=float(os.getenv("INGEST_JOB_LEASE_SECONDS", "300")),
+    ingest_poll_seconds=float(os.getenv("INGEST_POLL_SECONDS", "2")),
+    bulk_ingest_concurrency=int(os.getenv("BULK_INGEST_CONCURRENCY", "4")),
+    bulk_upsert_batch=int(os.getenv("BULK_UPSERT_BATCH", "1024")),
+    bulk_claim_files=int(os.getenv("BULK_CLAIM_FILES", "25")),
+    bulk_max_files=int(os.getenv("BULK_MAX_FILES", "5000")),
+    bulk_max_archive_mb=int(os.getenv("BULK_MAX_ARCHIVE_MB", "500")),
+    answer_cache_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    answer_cache_max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")),
+    answer_cache_ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400")),
+    answer_cache_max_buckets=int(os.getenv("ANSWER_CACHE_MAX_BUCKETS", "1024")),
+    answer_cache_generation_check_seconds=float(os.getenv("ANSWER_CACHE_GENERATION_CHECK_SECONDS", "5")),
+    retrieval_mode=os.getenv("RETRIEVAL_MODE", "vector"),
+    ollama_keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+    session_max=int(os.getenv("SESSION_MAX", "1000")),
+    session_idle_seconds=float(os.getenv("SESSION_IDLE_SECONDS", "1800")),
+    session_max_turns=int(os.getenv("SESSION_MAX_TURNS", "10")),
+    session_max_context_tokens=int(os.getenv("SESSION_MAX_CONTEXT_TOKENS", "4096")),
+    piper_voices_dir=os.getenv("PIPER_VOICES_DIR", ""),
+    piper_worker_cmd=os.getenv("PIPER_WORKER_CMD", ""),
+    piper_workers=int(os.getenv("PIPER_WORKERS", "2")),
+    piper_max_queue=int(os.getenv("PIPER_MAX_QUEUE", "16")),
+    piper_timeout_seconds=float(os.getenv("PIPER_TIMEOUT_SECONDS", "20")),
+    piper_health_seconds=float(os.getenv("PIPER_HEALTH_SECONDS", "30")),
+    stt_engine=os.getenv("STT_ENGINE", ""),
+    stt_model=os.getenv("STT_MODEL", "base.en"),
+    vad_energy_db=float(os.getenv("VAD_ENERGY_DB", "-45")),
+    vad_margin_db=float(os.getenv("VAD_MARGIN_DB", "10")),
+    vad_hangover_ms=float(os.getenv("VAD_HANGOVER_MS", "500")),
+    vad_min_speech_ms=float(os.getenv("VAD_MIN_SPEECH_MS", "250")),
+    vad_max_utterance_seconds=float(os.getenv("VAD_MAX_UTTERANCE_SECONDS", "15")),
+    rtc_tts_voice=os.getenv("RTC_TTS_VOICE") or os.getenv("TTS_VOICE", "en_US-amy-medium"),
+    rtc_max_sessions=int(os.getenv("RTC_MAX_SESSIONS", "20")),
+    rtc_idle_seconds=float(os.getenv("RTC_IDLE_SECONDS", "60")),
+    rtc_reap_interval_seconds=float(os.getenv("RTC_REAP_INTERVAL_SECONDS", "10")),
+    tts_voice=os.getenv("TTS_VOICE", "en_US-amy-medium"),
+    tts_cache_mb=int(os.getenv("TTS_CACHE_MB", "512")),
+    tts_prewarm=os.getenv("TTS_PREWARM", "true").lower() in ("1", "true", "yes"),
+    twilio_segment_wait_seconds=float(os.getenv("TWILIO_SEGMENT_WAIT_SECONDS", "8")),
+    llm_max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "2")),
+    llm_max_queue=int(os.getenv("LLM_MAX_QUEUE", "64")),
+    llm_tenant_max_queue=int(os.getenv("LLM_TENANT_MAX_QUEUE", "16")),
+    llm_tenant_weights={k: float(v[0]) for k, v in _parse_map(os.getenv("LLM_TENANT_WEIGHTS", "")).items() if v},
+    context_max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "700")),
+    context_overfetch=int(os.getenv("CONTEXT_OVERFETCH", "3")),
+    context_mmr_lambda=float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7")),
     )
 
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List
 
@@ -12,7 +13,9 @@ from .config import SETTINGS
 from .log import setup_logging
 from .routers import chat, health, ingest, search, tenants, twilio, appointments, admin, ads, uploads, sites, webhooks, demo, crm, rtc
 from .auth import resolve_tenant
+from .utils.body_limit import BodySizeLimitMiddleware
 from .utils.tenant_ctx import set_current_tenant
+from .services import db, ingest_jobs, ollama, piper_pool, rtc_sessions, storage, stt, tts, voice_turns
 
 
 def _collect_cors_origins() -> List[str]:
@@ -25,8 +28,40 @@ def _collect_cors_origins() -> List[str]:
     return origins
 
 
+def _max_body_bytes(path: str) -> int:
+    # Bulk requests carry an archive or many files; elsewhere one file plus form fields
+    if path.endswith("/ingest/bulk"):
+        return SETTINGS.bulk_max_archive_mb * 1024 * 1024
+    return (SETTINGS.max_upload_mb + 1) * 1024 * 1024
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Application-scoped clients and workers live for the whole process
+    db.migrate()
+    await ollama.startup()
+    await ingest_jobs.startup()
+    await tts.startup()
+    await stt.startup()
+    await rtc_sessions.startup()
+    try:
+        yield
+    finally:
+        await rtc_sessions.shutdown()
+        await stt.shutdown()
+        await voice_turns.shutdown()
+        await tts.shutdown()
+        piper_pool.shutdown()
+        await ingest_jobs.shutdown()
+        storage.shutdown_extractors()
+        await ollama.shutdown()
+        db.dispose_engines()
+
+
 setup_logging()
-app = FastAPI(title="Multi-tenant RAG Backend", version="0.1.0")
+app = FastAPI(title="Multi-tenant RAG Backend", version="0.1.0", lifespan=lifespan)
+
+app.add_middleware(BodySizeLimitMiddleware, limit=_max_body_bytes)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
@@ -32,6 +33,7 @@ class ChatRequest(BaseModel):
     top_k: int = 5
     tenant: Optional[str] = None
     customer_id: Optional[str] = None
+    session_id: Optional[str] = None  # from a previous response; keeps the conversation server-side
 
 class ChatCitation(BaseModel):
     source: str
@@ -41,12 +43,59 @@ class ChatCitation(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     citations: List[ChatCitation] = Field(default_factory=list)
+    cached: bool = False  # served from the semantic answer cache
+    context_tokens: Optional[int] = None  # estimated tokens of retrieved context in the prompt
+    session_id: Optional[str] = None
 
 
 class IngestResponse(BaseModel):
     ok: bool
     doc_id: str
     chunks: int
+    job_id: Optional[str] = None
+    status: Optional[str] = None
+    sha256: Optional[str] = None  # of the stored file
+
+
+class BulkFileResult(BaseModel):
+    name: str
+    doc_id: Optional[str] = None
+    job_id: Optional[str] = None
+    status: str  # queued | running | done | failed | skipped
+    chunks: int = 0
+    error: Optional[str] = None
+
+
+class BulkIngestSummary(BaseModel):
+    files: int
+    queued: int = 0
+    running: int = 0
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    chunks: int = 0
+
+
+class BulkIngestResponse(BaseModel):
+    ok: bool  # no file has failed (so far)
+    batch_id: str
+    finished: bool  # no file is still queued or running
+    results: List[BulkFileResult]
+    summary: BulkIngestSummary
+
+
+class IngestJobResponse(BaseModel):
+    job_id: str
+    doc_id: str
+    status: str  # queued | running | done | failed
+    stage: str  # extract | chunk | embed | upsert | done
+    chunks_done: int = 0
+    chunks_total: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class TenantsResponse(BaseModel):
@@ -1,12 +1,27 @@
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import HTMLResponse, FileResponse
 from pathlib import Path
 
 from ..auth import require_admin_key, require_site_auth, resolve_tenant
-from ..services.db import open_session, ChatLog, CallLog, Upload, Appointment
+from ..services.db import db_stats, open_session, ChatLog, CallLog, Upload, Appointment
 from ..config import SETTINGS
+from ..services.answer_cache import answer_cache_stats
+from ..services.embed import batcher_stats, query_cache_stats
+from ..services.ingest_jobs import job_stats
+from ..services.lexical import lexical_stats
+from ..services.ollama import ollama_stats
+from ..services.piper_pool import piper_stats
+from ..services.rag import context_stats
+from ..services.rtc_sessions import rtc_stats
+from ..services.scheduler import scheduler_stats
+from ..services.sessions import session_stats
+from ..services.tts import tts_stats
+from ..services.voice_agent import voice_stats
+from ..services.vector import executor_stats, store_stats
 
 router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin_key), Depends(require_site_auth)])
 
@@ -113,6 +128,29 @@ async def admin_appointments(request: Request, limit: int = 100, offset: int = 0
     }
 
 
+@router.get("/admin/stats")
+async def admin_stats() -> dict:
+    """Per-process cache and queue statistics for capacity tuning."""
+    return {
+        "vector_stores": store_stats(),
+        "vector_executor": executor_stats(),
+        "lexical_indexes": lexical_stats(),
+        "ollama": ollama_stats(),
+        "query_embeddings": query_cache_stats(),
+        "embed_batcher": batcher_stats(),
+        "answers": answer_cache_stats(),
+        "ingest_jobs": await asyncio.to_thread(job_stats),
+        "context": context_stats(),
+        "chat_sessions": session_stats(),
+        "llm_scheduler": scheduler_stats(),
+        "tts_cache": tts_stats(),
+        "piper": piper_stats(),
+        "voice_pipeline": voice_stats(),
+        "rtc_sessions": rtc_stats(),
+        "db": db_stats(),
+    }
+
+
 @router.get("/admin/download/{upload_id}")
 async def admin_download(request: Request, upload_id: int):
     site_id = resolve_tenant(request)
@@ -1,20 +1,83 @@
 from __future__ import annotations
 
-from typing import AsyncIterator
+import asyncio
+import re
+from typing import Any, AsyncIterator, Dict, List
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 from ..auth import require_site_auth, resolve_tenant, require_bearer_or_public
 from ..models.schemas import ChatRequest, ChatResponse, ChatCitation
+from ..services.answer_cache import lookup_answer, store_answer
+from ..services.embed import embed_query
 from ..services.llm import stream_generate, generate
-from ..services.rag import build_prompt, retrieve
+from ..config import SETTINGS
+from ..services.rag import pack_prompt, retrieve
 from ..services.db import open_session, ChatLog
+from ..services.scheduler import QueueFull, Ticket, admit
+from ..services.sessions import ChatSession, finish_turn, get_chat_session
 
 
 router = APIRouter(tags=["chat"])
 
 
+def _citations(hits: List[dict]) -> List[ChatCitation]:
+    citations: List[ChatCitation] = []
+    for h in hits:
+        meta = h.get("metadata", {}) or {}
+        citations.append(
+            ChatCitation(
+                source=meta.get("filename") or meta.get("doc_id") or "doc",
+                page=meta.get("page"),
+                score=float(h.get("score", 0.0)) if isinstance(h.get("score", 0.0), (int, float)) else None,
+            )
+        )
+    return citations
+
+
+def _log_chat(tenant_id: str, customer_id: str | None, question: str, answer: str) -> None:
+    # Persist chat log best-effort
+    try:
+        with open_session() as session:
+            session.add(ChatLog(site_id=tenant_id, customer_id=customer_id, question=question, answer=answer))
+            session.commit()
+    except Exception:
+        pass
+
+
+def _conversation(body: ChatRequest, tenant_id: str) -> ChatSession:
+    # Unknown or missing ids get a new server-generated session, returned to the client
+    session = get_chat_session(tenant_id, body.customer_id, body.session_id)
+    if not session.history and body.history:
+        # Client-held history seeds a new session
+        session.history = [m.model_dump() for m in body.history]
+    return session
+
+
+def _turn_messages(session: ChatSession, messages: List[Dict]) -> List[Dict]:
+    """Prompt for this turn. With an Ollama context from the session only
+    the new turn is sent; otherwise earlier turns go before it."""
+    if session.context is not None:
+        return [m for m in messages if m["role"] != "system"]
+    return [m for m in messages if m["role"] == "system"] + session.history + [m for m in messages if m["role"] != "system"]
+
+
+async def _admit(tenant_id: str) -> Ticket:
+    # Refuse before any response bytes are sent, so clients see 429/503 + Retry-After
+    try:
+        return await admit(tenant_id, "web")
+    except QueueFull as exc:
+        raise HTTPException(status_code=exc.status, detail=exc.detail, headers={"Retry-After": str(exc.retry_after)})
+
+
+async def _replay(text: str) -> AsyncIterator[bytes]:
+    # Stream a cached answer word by word so clients render it like a live one
+    for piece in re.findall(r"\s*\S+", text):
+        yield piece.encode("utf-8")
+        await asyncio.sleep(0)
+
+
 @router.post("/chat/stream", dependencies=[Depends(require_site_auth)])
 async def chat_stream(request: Request, body: ChatRequest) -> StreamingResponse:
     # Allow body to request tenant override; attach to state for resolver
@@ -23,26 +86,56 @@ async def chat_stream(request: Request, body: ChatRequest) -> StreamingResponse:
     tenant_id = resolve_tenant(request)
     # Optional per-customer filtering
     filter_meta = {"customer_id": body.customer_id} if getattr(body, "customer_id", None) else None
-    hits = await retrieve(tenant_id, body.message, body.top_k, filter_meta)
-    messages = build_prompt(body.message, hits)
+    session = _conversation(body, tenant_id)
+    follow_up = bool(session.history)
+    session_headers = {"X-Session-Id": session.session_id}
+    qvec = await embed_query(body.message)
+    # A follow-up's answer depends on the conversation, not just the message
+    cached = None if follow_up else await lookup_answer(tenant_id, body.customer_id, qvec)
+    if cached is not None:
+        _log_chat(tenant_id, body.customer_id, body.message, cached.answer)
+        finish_turn(session, session.turns, body.message, cached.answer, None)
+        return StreamingResponse(
+            _replay(cached.answer),
+            media_type="text/plain; charset=utf-8",
+            headers={"X-Answer-Cache": "hit", **session_headers},
+        )
+    candidates = await retrieve(tenant_id, body.message, body.top_k * SETTINGS.context_overfetch, filter_meta, with_vectors=True)
+    packed = pack_prompt(body.message, candidates, query_vector=qvec, max_snippets=body.top_k)
+    hits = packed.hits
+    messages = _turn_messages(session, packed.messages)
+    context = session.context
+    turn = session.turns
+    result: Dict[str, Any] = {}
+    ticket = await _admit(tenant_id)
 
     chunks: list[str] = []
+    completed = False
     async def _gen() -> AsyncIterator[bytes]:
-        async for chunk in stream_generate(messages):
-            chunks.append(chunk)
-            yield chunk.encode("utf-8")
+        nonlocal completed
+        try:
+            async for chunk in stream_generate(messages, context=context, result=result, ticket=ticket):
+                chunks.append(chunk)
+                yield chunk.encode("utf-8")
+            completed = True
+        finally:
+            ticket.release()
 
     async def _on_complete() -> None:
-        # Persist chat log best-effort
-        try:
-            answer = "".join(chunks)
-            with open_session() as session:
-                session.add(ChatLog(site_id=tenant_id, customer_id=body.customer_id, question=body.message, answer=answer))
-                session.commit()
-        except Exception:
-            pass
-
-    response = StreamingResponse(_gen(), media_type="text/plain; charset=utf-8")
+        ticket.release()
+        answer = "".join(chunks)
+        _log_chat(tenant_id, body.customer_id, body.message, answer)
+        if completed:
+            finish_turn(session, turn, body.message, answer, result.get("context"))
+            if not follow_up:
+                citations = [c.model_dump() for c in _citations(hits)]
+                store_answer(tenant_id, body.customer_id, qvec, body.message, answer, citations)
+
+    response = StreamingResponse(
+        _gen(),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Answer-Cache": "miss", "X-Context-Tokens": str(packed.tokens), **session_headers},
+    )
     # Attach background callback via FastAPI-style background tasks if available
     try:
         from fastapi import BackgroundTasks
@@ -53,8 +146,6 @@ async def chat_stream(request: Request, body: ChatRequest) -> StreamingResponse:
         response.background = bg
     except Exception:
         # Fall back: fire-and-forget
-        import asyncio
-
         asyncio.create_task(_on_complete())
 
     return response
@@ -68,28 +159,36 @@ async def chat_json(request: Request, body: ChatRequest) -> ChatResponse:
         request.state.tenant_id = body.tenant
     tenant_id = resolve_tenant(request)
     filter_meta = {"customer_id": body.customer_id} if getattr(body, "customer_id", None) else None
-    hits = await retrieve(tenant_id, body.message, body.top_k, filter_meta)
-    messages = build_prompt(body.message, hits)
-    answer = await generate(messages)
-
-    # Build simple citations from hits
-    citations: list[ChatCitation] = []
-    for h in hits:
-        meta = h.get("metadata", {}) or {}
-        citations.append(
-            ChatCitation(
-                source=meta.get("filename") or meta.get("doc_id") or "doc",
-                page=meta.get("page"),
-                score=float(h.get("score", 0.0)) if isinstance(h.get("score", 0.0), (int, float)) else None,
-            )
+    session = _conversation(body, tenant_id)
+    follow_up = bool(session.history)
+    qvec = await embed_query(body.message)
+    cached = None if follow_up else await lookup_answer(tenant_id, body.customer_id, qvec)
+    if cached is not None:
+        _log_chat(tenant_id, body.customer_id, body.message, cached.answer)
+        finish_turn(session, session.turns, body.message, cached.answer, None)
+        return ChatResponse(
+            answer=cached.answer,
+            citations=[ChatCitation(**c) for c in cached.citations],
+            cached=True,
+            session_id=session.session_id,
         )
+    candidates = await retrieve(tenant_id, body.message, body.top_k * SETTINGS.context_overfetch, filter_meta, with_vectors=True)
+    packed = pack_prompt(body.message, candidates, query_vector=qvec, max_snippets=body.top_k)
+    hits = packed.hits
+    result: Dict[str, Any] = {}
+    turn = session.turns
+    answer = await generate(
+        _turn_messages(session, packed.messages),
+        context=session.context,
+        result=result,
+        ticket=await _admit(tenant_id),
+    )
+    finish_turn(session, turn, body.message, answer, result.get("context"))
 
-    # Persist chat log best-effort
-    try:
-        with open_session() as session:
-            session.add(ChatLog(site_id=tenant_id, customer_id=body.customer_id, question=body.message, answer=answer))
-            session.commit()
-    except Exception:
-        pass
+    # Build simple citations from hits
+    citations = _citations(hits)
+    _log_chat(tenant_id, body.customer_id, body.message, answer)
+    if not follow_up:
+        store_answer(tenant_id, body.customer_id, qvec, body.message, answer, [c.model_dump() for c in citations])
 
-    return ChatResponse(answer=answer, citations=citations)
+    return ChatResponse(answer=answer, citations=citations, context_tokens=packed.tokens, session_id=session.session_id)
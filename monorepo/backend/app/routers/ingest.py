@@ -1,24 +1,25 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List
 
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status, Query
 
 from ..auth import require_admin_key, require_site_auth, resolve_tenant
-from ..models.schemas import IngestResponse
-from ..services.chunk import chunk_text
-from ..services.embed import embed_texts
-from ..services.storage import extract_text, save_upload
-from ..services.vector import ChromaStore
 from ..config import SETTINGS
-from ..services.db import open_session, Upload
+from ..models.schemas import BulkFileResult, BulkIngestResponse, BulkIngestSummary, IngestJobResponse, IngestResponse
+from ..services.bulk import SUPPORTED_EXTS, BulkFile, skipped, unpack_archive
+from ..services.ingest_jobs import batch_jobs, enqueue, enqueue_batch, get_job
+from ..services.pipeline import IngestError
+from ..services.storage import UploadTooLarge, save_upload, tenant_docs_dir, write_stream
 
 
 router = APIRouter(tags=["ingest"], dependencies=[Depends(require_admin_key), Depends(require_site_auth)])
 
 
 ALLOWED_MIME = {"application/pdf", "text/plain", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
-MAX_SIZE_MB = 25
 
 
 @router.post("/ingest/upload", response_model=IngestResponse)
@@ -27,39 +28,110 @@ async def ingest_upload(
     file: UploadFile = File(...),
     customer_id: str | None = Query(default=None, description="Optional customer id to scope docs")
 ) -> IngestResponse:
+    """Save the document and queue it for background ingestion; poll
+    /ingest/jobs/{job_id} for progress."""
     tenant_id = resolve_tenant(request)
     if file.content_type not in ALLOWED_MIME:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported file type")
-    doc_id, saved_path = save_upload(tenant_id, file, customer_id=customer_id)
-    text = extract_text(saved_path)
-    if not text.strip():
-        raise HTTPException(status_code=400, detail="Empty or unreadable document")
-    chunks = chunk_text(text)
-    embeddings = await embed_texts(chunks)
-    store = ChromaStore(SETTINGS.chroma_dir, tenant_id)
-    items = []
-    for idx, (chunk, vec) in enumerate(zip(chunks, embeddings)):
-        items.append(
-            (
-                f"{doc_id}-{idx}",
-                vec,
-                {
-                    "doc_id": doc_id,
-                    "filename": saved_path.name,
-                    "page": idx + 1,
-                    "text": chunk,
-                    **({"customer_id": customer_id} if customer_id else {}),
-                },
-            )
-        )
-    count = store.upsert(items)
-    # Log upload best-effort
     try:
-        import json
-        meta = {"doc_id": doc_id, "customer_id": customer_id}
-        with open_session() as session:
-            session.add(Upload(site_id=tenant_id, customer_id=customer_id, filename=saved_path.name, metadata_json=json.dumps(meta)))
-            session.commit()
-    except Exception:
-        pass
-    return IngestResponse(ok=True, doc_id=doc_id, chunks=count)
+        saved = await save_upload(tenant_id, file, customer_id=customer_id)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc))
+    job_id = await asyncio.to_thread(enqueue, tenant_id, saved.doc_id, saved.path, customer_id=customer_id)
+    return IngestResponse(ok=True, doc_id=saved.doc_id, chunks=0, job_id=job_id, status="queued", sha256=saved.sha256)
+
+
+@router.post("/ingest/bulk", response_model=BulkIngestResponse)
+async def ingest_bulk(
+    request: Request,
+    archive: UploadFile | None = File(default=None, description="zip or tar(.gz) of documents"),
+    files: List[UploadFile] | None = File(default=None),
+    customer_id: str | None = Query(default=None, description="Optional customer id to scope docs")
+) -> BulkIngestResponse:
+    """Save many documents from an archive or a multipart batch and queue
+    them as background ingest jobs; poll /ingest/batches/{batch_id} for
+    per-file results. Unsupported files are reported as skipped; one bad
+    file does not fail the batch."""
+    tenant_id = resolve_tenant(request)
+    batch: List[BulkFile] = []
+    if archive is not None:
+        upload = tenant_docs_dir(tenant_id, customer_id) / f".bulk-{uuid.uuid4()}"
+        try:
+            await write_stream(archive, upload, SETTINGS.bulk_max_archive_mb * 1024 * 1024)
+            batch = await asyncio.to_thread(unpack_archive, tenant_id, upload, customer_id)
+        except UploadTooLarge as exc:
+            raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc))
+        except IngestError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        finally:
+            upload.unlink(missing_ok=True)
+    for file in files or []:
+        name = file.filename or ""
+        if Path(name).suffix.lower() not in SUPPORTED_EXTS:
+            batch.append(skipped(name, "Unsupported file type"))
+            continue
+        try:
+            saved = await save_upload(tenant_id, file, customer_id=customer_id)
+        except UploadTooLarge as exc:
+            batch.append(skipped(name, str(exc)))
+            continue
+        batch.append(BulkFile(name, saved.path, doc_id=saved.doc_id))
+    if not batch:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files in request")
+    seen: Dict[str, str] = {}
+    for f in batch:
+        if f.status == "pending" and f.doc_id in seen:
+            # Same logical document twice: the versions would race
+            f.status, f.error = "skipped", f"Duplicate of {seen[f.doc_id]}"
+            f.path.unlink(missing_ok=True)
+        elif f.status == "pending":
+            seen[f.doc_id] = f.name
+    queued = [f for f in batch if f.status == "pending"]
+    batch_id = uuid.uuid4().hex
+    job_ids = await asyncio.to_thread(enqueue_batch, tenant_id, queued, batch_id, customer_id) if queued else []
+    results = [BulkFileResult(name=f.name, doc_id=f.doc_id or None, status=f.status, error=f.error) for f in batch if f.status != "pending"]
+    results += [BulkFileResult(name=f.name, doc_id=f.doc_id, job_id=job_id, status="queued") for f, job_id in zip(queued, job_ids)]
+    return _batch_response(batch_id, results)
+
+
+def _batch_response(batch_id: str, results: List[BulkFileResult]) -> BulkIngestResponse:
+    counts: Dict[str, Any] = {s: sum(1 for r in results if r.status == s) for s in ("queued", "running", "done", "failed", "skipped")}
+    summary = BulkIngestSummary(files=len(results), chunks=sum(r.chunks for r in results), **counts)
+    return BulkIngestResponse(
+        ok=summary.failed == 0,
+        batch_id=batch_id,
+        finished=summary.queued + summary.running == 0,
+        results=results,
+        summary=summary,
+    )
+
+
+@router.get("/ingest/batches/{batch_id}", response_model=BulkIngestResponse)
+async def ingest_batch_status(request: Request, batch_id: str) -> BulkIngestResponse:
+    """Per-file status of the files a bulk request queued (skipped files
+    were only reported in that request's response)."""
+    tenant_id = resolve_tenant(request)
+    jobs = await asyncio.to_thread(batch_jobs, batch_id)
+    if not jobs or jobs[0]["tenant_id"] != tenant_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+    results = [
+        BulkFileResult(
+            name=job["name"] or Path(job["path"]).name,
+            doc_id=job["doc_id"],
+            job_id=job["job_id"],
+            status=job["status"],
+            chunks=job["chunks_done"] if job["status"] == "done" else 0,
+            error=job["error"] if job["status"] == "failed" else None,
+        )
+        for job in jobs
+    ]
+    return _batch_response(batch_id, results)
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestJobResponse)
+async def ingest_job_status(request: Request, job_id: str) -> IngestJobResponse:
+    tenant_id = resolve_tenant(request)
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None or job["tenant_id"] != tenant_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return IngestJobResponse(**{k: v for k, v in job.items() if k in IngestJobResponse.model_fields})
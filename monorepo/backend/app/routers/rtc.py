@@ -1,12 +1,20 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Optional, Any
+import json
+from typing import Optional, Any, AsyncIterator, Dict, List
 from importlib import import_module
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from ..auth import require_bearer_or_public, resolve_tenant
+from ..config import SETTINGS
+from ..services.piper_pool import synthesize_pcm
+from ..services.rtc_sessions import RTCSession, SessionLimit, get_rtc_sessions
+from ..services.stt import stt_factory
+from ..services.voice_agent import VoiceAgent
+
 # Optional imports for type checking and runtime flexibility
 # runtime: import lazily and tolerate absence
 _RTCPeerConnection = None  # type: ignore
@@ -15,15 +23,13 @@ try:
     _aiortc = import_module("aiortc")
     _RTCPeerConnection = getattr(_aiortc, "RTCPeerConnection")  # type: ignore
     _RTCSessionDescription = getattr(_aiortc, "RTCSessionDescription")  # type: ignore
+    from ..services import rtc_media as _rtc_media
 except Exception:
-    pass
+    _rtc_media = None
 
 
 router = APIRouter(tags=["rtc"], prefix="/rtc")
 
-# Track live peer connections so they don't get GC'd immediately
-_PEERS = set()
-
 
 class SDP(BaseModel):
     type: str
@@ -32,61 +38,99 @@ class SDP(BaseModel):
 
 @router.get("/health")
 async def rtc_health() -> dict:
-    return {"ok": True, "pc": bool(_RTCPeerConnection)}
+    sessions = get_rtc_sessions()
+    return {"ok": True, "pc": bool(_RTCPeerConnection), "sessions": len(sessions), "capacity": sessions.max_sessions}
 
 
-@router.post("/offer")
-async def create_answer(offer: SDP) -> dict:
-    if _RTCPeerConnection is None or _RTCSessionDescription is None:
+@router.post("/offer", dependencies=[Depends(require_bearer_or_public)])
+async def create_answer(request: Request, offer: SDP) -> dict:
+    if _RTCPeerConnection is None or _RTCSessionDescription is None or _rtc_media is None:
         raise HTTPException(status_code=503, detail="RTC not available on server")
 
+    tenant_id = resolve_tenant(request)
+    sessions = get_rtc_sessions()
+    try:
+        # Live sessions hold the peer connection and its tasks, so they are not GC'd
+        session = sessions.open(tenant_id)
+    except SessionLimit as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(max(1, int(sessions.reap_interval)))})
+    try:
+        return await _negotiate(session, offer)
+    except Exception:
+        await sessions.close(session, reason="negotiation failed")
+        raise
+
+
+async def _negotiate(session: RTCSession, offer: SDP) -> dict:
     pc: _RTCPeerConnection = _RTCPeerConnection()  # type: ignore[assignment]
-    _PEERS.add(pc)
+    session.pc = pc
+    channels: List[Any] = []
+
+    def on_event(event: Dict[str, Any]) -> None:
+        # Transcripts, answers and per-turn latencies go to the widget
+        for channel in channels:
+            if channel.readyState == "open":
+                channel.send(json.dumps(event))
+
+    session.output = _rtc_media.PCMOutputTrack()
+    session.agent = agent = VoiceAgent(
+        session.tenant_id,
+        stt=stt_factory(),
+        synthesize=lambda text: synthesize_pcm(text, SETTINGS.rtc_tts_voice),
+        output=session.output,
+        on_event=on_event,
+    )
 
     @pc.on("connectionstatechange")
     async def on_connectionstatechange():  # pragma: no cover - runtime effect only
         if pc.connectionState in ("failed", "closed", "disconnected"):
-            await pc.close()
-            _PEERS.discard(pc)
+            await get_rtc_sessions().close(session, reason=pc.connectionState)
+
+    def on_channel(channel) -> None:
+        channels.append(channel)
 
-    @pc.on("datachannel")
-    def on_datachannel(channel):  # pragma: no cover
-        # IVR/data messages from client widget
         @channel.on("message")
         def on_message(message: Any):
-            # Echo back for now; future: route DTMF/menu selections
+            session.touch()
+            session.messages_in += 1
+            # Typed questions from the widget: plain text or {"type": "text", "text": ...}
+            text = str(message)
             try:
-                channel.send(str(message))
-            except Exception:
+                data = json.loads(text)
+                if isinstance(data, dict):
+                    text = str(data.get("text", ""))
+            except ValueError:
                 pass
+            if text.strip():
+                agent.ask(text.strip())
+
+    @pc.on("datachannel")
+    def on_datachannel(channel):  # pragma: no cover
+        # IVR/data messages from client widget
+        on_channel(channel)
 
     # Ensure an "ivr" channel exists (negotiated)
     try:
-        pc.createDataChannel("ivr")
+        on_channel(pc.createDataChannel("ivr"))
     except Exception:
         pass
 
-    remote: _RTCSessionDescription = _RTCSessionDescription(sdp=offer.sdp, type=offer.type)  # type: ignore[assignment]
-    await pc.setRemoteDescription(remote)
+    # Inbound audio goes through VAD -> STT -> RAG -> TTS; answers play on the outbound track
+    async def inbound(track) -> AsyncIterator[Any]:
+        async for samples in _rtc_media.track_pcm(track):
+            session.touch()
+            session.samples_in += len(samples)
+            yield samples
 
-    # Audio receive: drain frames to keep pipeline active (placeholder sink)
     @pc.on("track")
     def on_track(track):  # pragma: no cover
         if getattr(track, "kind", None) == "audio":
-            async def _drain():
-                try:
-                    while True:
-                        frame = await track.recv()
-                        # Placeholder: here we could run STT on PCM frames
-                        _ = frame  # noqa: F841
-                except Exception:
-                    try:
-                        await track.stop()
-                    except Exception:
-                        pass
-            asyncio.ensure_future(_drain())
-
-    # Create a bare answer (no media until MVP client sends tracks)
+            session.tasks.append(asyncio.ensure_future(agent.run(inbound(track))))
+
+    remote: _RTCSessionDescription = _RTCSessionDescription(sdp=offer.sdp, type=offer.type)  # type: ignore[assignment]
+    await pc.setRemoteDescription(remote)
+    pc.addTrack(session.output)
+
     answer = await pc.createAnswer()
     await pc.setLocalDescription(answer)
     return {"type": pc.localDescription.type, "sdp": pc.localDescription.sdp}
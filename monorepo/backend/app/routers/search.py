@@ -4,9 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from ..auth import require_site_auth, resolve_tenant
 from ..models.schemas import SearchResponse, SearchResult
-from ..services.embed import embed_texts
-from ..services.vector import ChromaStore
-from ..config import SETTINGS
+from ..services.rag import retrieve
 
 
 router = APIRouter(tags=["search"], dependencies=[Depends(require_site_auth)])
@@ -18,14 +16,13 @@ async def search(
     q: str = Query(...),
     top_k: int = Query(5, ge=1, le=20),
     customer_id: str | None = Query(default=None),
+    mode: str | None = Query(default=None, pattern="^(vector|lexical|hybrid)$"),
 ) -> SearchResponse:
     tenant_id = resolve_tenant(request)
     if not q.strip():
         raise HTTPException(status_code=400, detail="Empty query")
-    [qvec] = await embed_texts([q])
-    store = ChromaStore(SETTINGS.chroma_dir, tenant_id)
     where = {"customer_id": customer_id} if customer_id else None
-    hits = store.query(qvec, top_k=top_k, where=where)
+    hits = await retrieve(tenant_id, q, top_k=top_k, where=where, mode=mode)
     results = [
         SearchResult(
             score=float(h.get("score", 0.0)),
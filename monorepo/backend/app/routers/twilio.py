@@ -1,18 +1,30 @@
 from __future__ import annotations
 
+from xml.sax.saxutils import escape
+
 from fastapi import APIRouter, Form, Request
 from fastapi.responses import PlainTextResponse
 
+from ..services.embed import embed_query
 from ..services.rag import build_prompt, retrieve
-from ..services.llm import stream_generate
+from ..services.scheduler import QueueFull, admit
 from ..services.stt import transcribe_from_twilio_payload
-from ..services.tts import synthesize_to_file
+from ..services.voice_turns import get_turn, start_turn
 from ..config import SETTINGS
 from ..services.db import open_session, CallLog
 
 
 router = APIRouter(tags=["twilio"])
 
+_BUSY_TWIML = """
+<Response>
+  <Gather input="speech" action="/api/v1/twilio/handle" method="POST" timeout="5">
+    <Say>Sorry, all our lines are busy right now. Please ask your question again in a moment.</Say>
+  </Gather>
+  <Say>Goodbye</Say>
+</Response>
+""".strip()
+
 
 @router.post("/twilio/voice")
 async def twilio_voice(request: Request) -> PlainTextResponse:
@@ -42,16 +54,18 @@ async def twilio_handle(request: Request, SpeechResult: str = Form(default=""))
       break
 
   query = transcribe_from_twilio_payload(SpeechResult)
-  hits = await retrieve(tenant_id, query, top_k=4)
-  messages = build_prompt(query, hits)
-
-  # Accumulate small text before TTS to avoid staccato audio
-  text_resp = []
-  async for chunk in stream_generate(messages):
-    text_resp.append(chunk)
-    if len("".join(text_resp)) > 500:
-      break
-  final_text = "".join(text_resp).strip() or "Sorry, I had trouble answering."
+  # Over-fetched candidates are thinned to diverse snippets by their similarity
+  # to the query; retrieve reuses the cached query embedding
+  qvec = await embed_query(query)
+  hits = await retrieve(tenant_id, query, top_k=4 * SETTINGS.context_overfetch, with_vectors=True)
+  messages = build_prompt(query, hits, max_snippets=4, query_vector=qvec)
+
+  try:
+    # Callers get the highest priority; if even that queue is full, say so and keep the line open
+    ticket = await admit(tenant_id, "voice")
+  except QueueFull:
+    return PlainTextResponse(_BUSY_TWIML, media_type="application/xml")
+
   # Determine simple intent
   default_intent = None
   for number, labels in SETTINGS.twilio_service_map.items():
@@ -62,24 +76,56 @@ async def twilio_handle(request: Request, SpeechResult: str = Form(default=""))
   qlow = (query or "").lower()
   if "book" in qlow or "appointment" in qlow:
     intent = intent or "book_appointment"
-  # Log best-effort
-  try:
-    with open_session() as session:
-      session.add(CallLog(site_id=tenant_id, from_number=from_number, customer_id=None, transcript=f"Q: {query}\nA: {final_text}", service_intent=intent, outcome="completed"))
-      session.commit()
-  except Exception:
-    pass
-  audio_path = synthesize_to_file(final_text)
+
+  def _log_call(answer: str) -> None:
+    # Log best-effort
+    try:
+      with open_session() as session:
+        session.add(CallLog(site_id=tenant_id, from_number=from_number, customer_id=None, transcript=f"Q: {query}\nA: {answer}", service_intent=intent, outcome="completed"))
+        session.commit()
+    except Exception:
+      pass
+
+  # Sentences are synthesized while the rest of the answer is generated; the
+  # caller hears the first one as soon as it is ready and Twilio fetches the
+  # rest through /twilio/continue
+  turn = start_turn(messages, ticket=ticket, tenant_id=tenant_id, on_done=_log_call)
+  return await _segments_twiml(turn.turn_id, 0)
+
+
+def _audio_url(path: str) -> str:
   # Build absolute URL when TWILIO_VOICE_WEBHOOK_BASE is set
   base = (SETTINGS.twilio_voice_webhook_base or "").rstrip("/")
-  audio_url = f"{base}{audio_path}" if base else audio_path
+  return f"{base}{path}" if base else path
 
-  twiml = f"""
+
+async def _segments_twiml(turn_id: str, start: int) -> PlainTextResponse:
+  turn = get_turn(turn_id)
+  segments = await turn.wait(start, SETTINGS.twilio_segment_wait_seconds) if turn is not None else []
+  if turn is None or (turn.done and not segments):
+    twiml = """
 <Response>
-  <Play>{audio_url}</Play>
   <Gather input="speech" action="/api/v1/twilio/handle" method="POST" timeout="5">
     <Say>You can ask another question.</Say>
   </Gather>
 </Response>
+""".strip()
+    return PlainTextResponse(twiml, media_type="application/xml")
+  # Play what is ready, then come back for the next sentences; sentences
+  # without audio are read out by Twilio instead
+  plays = "".join(
+    f"\n  <Play>{_audio_url(value)}</Play>" if kind == "play" else f"\n  <Say>{escape(value)}</Say>"
+    for kind, value in segments
+  )
+  wait = "" if segments else '\n  <Pause length="1"/>'
+  twiml = f"""
+<Response>{plays}{wait}
+  <Redirect method="POST">/api/v1/twilio/continue/{turn_id}/{start + len(segments)}</Redirect>
+</Response>
 """.strip()
   return PlainTextResponse(twiml, media_type="application/xml")
+
+
+@router.post("/twilio/continue/{turn_id}/{start}")
+async def twilio_continue(turn_id: str, start: int) -> PlainTextResponse:
+  return await _segments_twiml(turn_id, start)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
 
 from ..auth import require_site_auth, resolve_tenant
-from ..services.storage import save_upload
+from ..services.storage import UploadTooLarge, save_upload
 from ..services.db import open_session, Upload
 
 
@@ -11,7 +11,6 @@ router = APIRouter(tags=["uploads"], dependencies=[Depends(require_site_auth)])
 
 
 ALLOWED_MIME = {"application/pdf", "text/plain", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
-MAX_SIZE_MB = 25
 
 
 @router.post("/uploads")
@@ -19,15 +18,17 @@ async def uploads(request: Request, file: UploadFile = File(...), customer_id: s
     tenant_id = resolve_tenant(request)
     if file.content_type not in ALLOWED_MIME:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported file type")
-    # TODO: enforce max size by reading .spool? Depends on web server; keep simple for now
-    doc_id, saved_path = save_upload(tenant_id, file, customer_id=customer_id)
+    try:
+        saved = await save_upload(tenant_id, file, customer_id=customer_id)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(exc))
     # Log upload
     try:
         import json
-        meta = {"doc_id": doc_id, "customer_id": customer_id}
+        meta = {"doc_id": saved.doc_id, "customer_id": customer_id, "size": saved.size, "sha256": saved.sha256}
         with open_session() as session:
-            session.add(Upload(site_id=tenant_id, customer_id=customer_id, filename=saved_path.name, metadata_json=json.dumps(meta)))
+            session.add(Upload(site_id=tenant_id, customer_id=customer_id, filename=saved.path.name, metadata_json=json.dumps(meta)))
             session.commit()
     except Exception:
         pass
-    return {"ok": True, "doc_id": doc_id, "filename": saved_path.name}
+    return {"ok": True, "doc_id": saved.doc_id, "filename": saved.path.name, "sha256": saved.sha256}
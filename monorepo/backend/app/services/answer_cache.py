@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import SETTINGS
+from .documents import tenant_generation
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    citations: List[Dict[str, Any]] = field(default_factory=list)
+    expires_at: float = 0.0
+
+
+class _Bucket:
+    """Answers for one (tenant, customer, embed model), searched by cosine similarity."""
+
+    def __init__(self) -> None:
+        self.entries: "OrderedDict[int, Tuple[np.ndarray, CachedAnswer]]" = OrderedDict()
+        self._next_id = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[int] = []
+
+    def _index(self) -> Tuple[np.ndarray, List[int]]:
+        if self._matrix is None:
+            self._ids = list(self.entries.keys())
+            self._matrix = np.vstack([self.entries[i][0] for i in self._ids])
+        return self._matrix, self._ids
+
+    def best(self, qvec: np.ndarray) -> Tuple[float, Optional[int]]:
+        if not self.entries:
+            return 0.0, None
+        matrix, ids = self._index()
+        if matrix.shape[1] != qvec.shape[0]:
+            return 0.0, None
+        sims = matrix @ qvec
+        idx = int(np.argmax(sims))
+        return float(sims[idx]), ids[idx]
+
+    def add(self, vec: np.ndarray, entry: CachedAnswer, max_entries: int) -> None:
+        self.entries[self._next_id] = (vec, entry)
+        self._next_id += 1
+        while len(self.entries) > max_entries:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+    def drop(self, entry_id: int) -> None:
+        self.entries.pop(entry_id, None)
+        self._matrix = None
+
+
+def _unit(vector: List[float]) -> Optional[np.ndarray]:
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    if not vec.size or norm == 0.0:
+        return None
+    return vec / norm
+
+
+class AnswerCache:
+    """Per-tenant (and per-customer) semantic cache of final chat answers.
+
+    A question whose embedding is within ``threshold`` cosine similarity of a
+    cached question reuses that answer and its citations. Ingesting documents
+    for a tenant drops all of that tenant's entries: directly in the
+    ingesting process, and in other processes (e.g. the crawler CLI ingests
+    on its own) once ``check_generation`` sees the tenant's ``generation``
+    change. At most ``max_buckets`` (tenant, customer) buckets are kept,
+    least recently used first out.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int,
+        ttl_seconds: float,
+        max_buckets: int = 1024,
+        generation: Optional[Callable[[str], Any]] = None,
+        check_seconds: float = 5.0,
+    ):
+        self.threshold = float(threshold)
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self.max_buckets = max(1, int(max_buckets))
+        self.generation = generation
+        self.check_seconds = float(check_seconds)
+        self._buckets: "OrderedDict[Tuple[str, str, str], _Bucket]" = OrderedDict()
+        self._generations: Dict[str, Tuple[Any, float]] = {}  # tenant -> (generation, checked at)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _key(self, tenant_id: str, customer_id: Optional[str]) -> Tuple[str, str, str]:
+        return (tenant_id, customer_id or "", SETTINGS.embed_model)
+
+    def lookup(self, tenant_id: str, customer_id: Optional[str], qvec: List[float]) -> Optional[CachedAnswer]:
+        if not self.enabled:
+            return None
+        key = self._key(tenant_id, customer_id)
+        bucket = self._buckets.get(key)
+        unit = _unit(qvec)
+        if bucket is None or unit is None:
+            self.misses += 1
+            return None
+        self._buckets.move_to_end(key)
+        score, entry_id = bucket.best(unit)
+        if entry_id is None or score < self.threshold:
+            self.misses += 1
+            return None
+        _, entry = bucket.entries[entry_id]
+        if entry.expires_at <= time.monotonic():
+            bucket.drop(entry_id)
+            self.misses += 1
+            return None
+        bucket.entries.move_to_end(entry_id)
+        self.hits += 1
+        return entry
+
+    def store(
+        self,
+        tenant_id: str,
+        customer_id: Optional[str],
+        qvec: List[float],
+        question: str,
+        answer: str,
+        citations: List[Dict[str, Any]],
+    ) -> None:
+        unit = _unit(qvec)
+        if not self.enabled or unit is None or not answer.strip():
+            return
+        key = self._key(tenant_id, customer_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        entry = CachedAnswer(question=question, answer=answer, citations=citations, expires_at=time.monotonic() + self.ttl)
+        bucket.add(unit, entry, self.max_entries)
+        self.stores += 1
+
+    def invalidate_tenant(self, tenant_id: str) -> None:
+        for key in [k for k in self._buckets if k[0] == tenant_id]:
+            del self._buckets[key]
+        self.invalidations += 1
+
+    async def check_generation(self, tenant_id: str) -> None:
+        """Drop the tenant's entries if its documents changed since the last
+        check, at most every ``check_seconds``."""
+        if self.generation is None or not self.enabled:
+            return
+        now = time.monotonic()
+        seen = self._generations.get(tenant_id)
+        if seen is not None and now - seen[1] < self.check_seconds:
+            return
+        self._generations[tenant_id] = (seen[0] if seen else None, now)  # one check at a time
+        try:
+            current = await asyncio.to_thread(self.generation, tenant_id)
+        except Exception as exc:
+            logger.warning("answer cache generation check failed", extra={"extra": {"tenant_id": tenant_id, "error": str(exc)}})
+            return
+        if seen is not None and seen[0] != current:
+            self.invalidate_tenant(tenant_id)
+        self._generations[tenant_id] = (current, now)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "buckets": len(self._buckets),
+            "max_buckets": self.max_buckets,
+            "entries": sum(len(b.entries) for b in self._buckets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+_ANSWERS = AnswerCache(
+    threshold=SETTINGS.answer_cache_threshold,
+    max_entries=SETTINGS.answer_cache_max_entries,
+    ttl_seconds=SETTINGS.answer_cache_ttl_seconds,
+    max_buckets=SETTINGS.answer_cache_max_buckets,
+    generation=tenant_generation,
+    check_seconds=SETTINGS.answer_cache_generation_check_seconds,
+)
+
+
+async def lookup_answer(tenant_id: str, customer_id: Optional[str], qvec: List[float]) -> Optional[CachedAnswer]:
+    await _ANSWERS.check_generation(tenant_id)
+    return _ANSWERS.lookup(tenant_id, customer_id, qvec)
+
+
+def store_answer(
+    tenant_id: str,
+    customer_id: Optional[str],
+    qvec: List[float],
+    question: str,
+    answer: str,
+    citations: List[Dict[str, Any]],
+) -> None:
+    _ANSWERS.store(tenant_id, customer_id, qvec, question, answer, citations)
+
+
+def invalidate_tenant(tenant_id: str) -> None:
+    _ANSWERS.invalidate_tenant(tenant_id)
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return _ANSWERS.stats()
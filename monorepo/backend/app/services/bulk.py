@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import tarfile
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from ..config import SETTINGS
+from .db import Upload, open_session
+from .documents import logical_doc_id
+from .pipeline import IngestError, UpsertBuffer, ingest_file
+from .storage import tenant_docs_dir
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTS = {".pdf", ".docx", ".txt", ".md"}
+_COPY_CHUNK = 1024 * 1024
+
+
+@dataclass
+class BulkFile:
+    name: str  # file name, or member path inside the archive
+    path: Optional[Path] = None  # saved copy; None when skipped before saving
+    doc_id: str = ""
+    status: str = "pending"  # ok | failed | skipped
+    chunks: int = 0
+    error: Optional[str] = None
+    retry: bool = False  # failed for a reason that may pass (a server down), not the document
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "doc_id": self.doc_id or None, "status": self.status, "chunks": self.chunks, "error": self.error}
+
+
+def skipped(name: str, reason: str) -> BulkFile:
+    return BulkFile(name, status="skipped", error=reason)
+
+
+def saved(tenant_id: str, name: str, path: Path, customer_id: Optional[str] = None) -> BulkFile:
+    return BulkFile(name, path, doc_id=logical_doc_id(tenant_id, name, customer_id))
+
+
+def _members(archive: Path) -> Iterator[Tuple[str, int, Any]]:
+    """(name, declared size, opener) for each regular file in a zip or tar."""
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: zf.open(info)
+    elif tarfile.is_tarfile(archive):
+        with tarfile.open(archive) as tf:
+            for member in tf:
+                # Links and devices are never extracted
+                if member.isreg():
+                    yield member.name, member.size, lambda member=member: tf.extractfile(member)
+    else:
+        raise IngestError("Not a zip or tar archive")
+
+
+def _copy(src: IO[bytes], dest: Path, limit: int) -> int:
+    written = 0
+    with dest.open("wb") as out:
+        while chunk := src.read(_COPY_CHUNK):
+            written += len(chunk)
+            if written > limit:
+                raise IngestError("Archive exceeds the uncompressed size limit")
+            out.write(chunk)
+    return written
+
+
+def unpack_archive(tenant_id: str, archive: Path, customer_id: Optional[str] = None) -> List[BulkFile]:
+    """Save the supported documents in a zip/tar archive under the tenant's
+    docs dir. Members are written under fresh names, so paths inside the
+    archive never decide where anything lands; they only name the document.
+    Blocking: run it in a thread."""
+    dest_dir = tenant_docs_dir(tenant_id, customer_id)
+    budget = SETTINGS.bulk_max_archive_mb * 1024 * 1024
+    files: List[BulkFile] = []
+    accepted: List[Path] = []
+    try:
+        for raw_name, size, open_member in _members(archive):
+            parts = [p for p in PurePosixPath(raw_name.replace("\\", "/")).parts if p not in ("/", ".", "..")]
+            if not parts or parts[0] == "__MACOSX" or any(p.startswith(".") for p in parts):
+                continue  # hidden files and resource forks
+            name = "/".join(parts)
+            ext = PurePosixPath(name).suffix.lower()
+            if ext not in SUPPORTED_EXTS:
+                files.append(skipped(name, "Unsupported file type"))
+                continue
+            if len(accepted) >= SETTINGS.bulk_max_files:
+                raise IngestError(f"Archive has more than {SETTINGS.bulk_max_files} documents")
+            if size > budget:
+                raise IngestError("Archive exceeds the uncompressed size limit")
+            dest = dest_dir / f"{uuid.uuid4()}{ext}"
+            accepted.append(dest)
+            src = open_member()
+            if src is None:
+                continue
+            with src:
+                budget -= _copy(src, dest, budget)
+            files.append(saved(tenant_id, name, dest, customer_id))
+    except (IngestError, zipfile.BadZipFile, tarfile.TarError) as exc:
+        for path in accepted:
+            path.unlink(missing_ok=True)
+        raise IngestError(str(exc)) from exc
+    return files
+
+
+def _log_uploads(tenant_id: str, files: List[BulkFile], customer_id: Optional[str]) -> None:
+    # Best-effort, like the single-upload path
+    try:
+        with open_session(tenant_id) as session:
+            for f in files:
+                if f.status == "ok" and f.path is not None:
+                    meta = {"doc_id": f.doc_id, "customer_id": customer_id, "name": f.name, "bulk": True}
+                    session.add(Upload(site_id=tenant_id, customer_id=customer_id, filename=f.path.name, metadata_json=json.dumps(meta)))
+            session.commit()
+    except Exception:
+        pass
+
+
+async def ingest_many(tenant_id: str, files: List[BulkFile], customer_id: Optional[str] = None) -> Dict[str, Any]:
+    """Ingest saved files concurrently (BULK_INGEST_CONCURRENCY at a time),
+    writing chunks through one shared UpsertBuffer so the vector store sees
+    a few large upserts instead of one per document. Updates each file's
+    status in place and returns a summary."""
+    start = time.perf_counter()
+    sink = UpsertBuffer(tenant_id)
+    gate = asyncio.Semaphore(max(1, SETTINGS.bulk_ingest_concurrency))
+    seen: Dict[str, str] = {}
+    for f in files:
+        if f.status == "pending" and f.doc_id in seen:
+            # Same logical document twice: the versions would race
+            f.status, f.error = "skipped", f"Duplicate of {seen[f.doc_id]}"
+        elif f.status == "pending":
+            seen[f.doc_id] = f.name
+
+    async def one(f: BulkFile) -> None:
+        async with gate:
+            try:
+                f.chunks = await ingest_file(tenant_id, f.doc_id, f.path, customer_id, sink=sink)
+                f.status = "ok"
+            except IngestError as exc:
+                f.status, f.error = "failed", str(exc)
+            except Exception as exc:
+                f.status, f.error, f.retry = "failed", str(exc), True
+                logger.warning("bulk ingest failed", extra={"extra": {"tenant_id": tenant_id, "name": f.name, "error": str(exc)}})
+
+    await asyncio.gather(*(one(f) for f in files if f.status == "pending"))
+    await sink.flush()
+    for f in files:
+        if f.status == "ok" and f.doc_id in sink.failed:
+            f.status, f.chunks, f.error, f.retry = "failed", 0, sink.failed[f.doc_id], True
+    await asyncio.to_thread(_log_uploads, tenant_id, files, customer_id)
+    counts = {status: sum(1 for f in files if f.status == status) for status in ("ok", "failed", "skipped")}
+    return {
+        "files": len(files),
+        **counts,
+        "chunks": sum(f.chunks for f in files),
+        "writes": sink.writes,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
@@ -1,16 +1,184 @@
 from __future__ import annotations
 
-from typing import List
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from ..config import SETTINGS
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+
+# Context windows of common Ollama embedding models, in tokens; the chunk
+# budget stays below these so nothing is silently truncated at embed time.
+_MODEL_TOKEN_LIMITS = {
+    "all-minilm": 256,
+    "bge-large": 512,
+    "mxbai-embed-large": 512,
+    "snowflake-arctic-embed": 512,
+    "nomic-embed-text": 8192,
+    "bge-m3": 8192,
+}
 
 
 def chunk_text(text: str, max_chars: int = 1200, overlap: int = 150) -> List[str]:
+    """Fixed-size character windows. Kept for callers that want them; the
+    ingest pipeline uses Chunker."""
+    if max_chars <= 0 or not 0 <= overlap < max_chars:
+        raise ValueError("chunk_text needs max_chars > 0 and 0 <= overlap < max_chars")
     chunks: List[str] = []
     i = 0
     n = len(text)
     while i < n:
         end = min(i + max_chars, n)
         chunks.append(text[i:end])
+        if end == n:
+            break
         i = end - overlap
         if i < 0:
             i = 0
     return [c.strip() for c in chunks if c.strip()]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four characters per token for English
+    prose with the BPE/WordPiece vocabularies embedding models use."""
+    return (len(text) + 3) // 4
+
+
+def token_budget(model: Optional[str] = None) -> int:
+    """Chunk size in tokens for an embedding model: CHUNK_MAX_TOKENS,
+    capped to the model's context with some headroom for the estimate."""
+    name = (model or SETTINGS.embed_model).split(":", 1)[0]
+    limit = _MODEL_TOKEN_LIMITS.get(name)
+    budget = SETTINGS.chunk_max_tokens
+    return min(budget, int(limit * 0.8)) if limit else budget
+
+
+@dataclass
+class _Unit:
+    page: int
+    text: str
+    tokens: int
+    sep: str  # joins this unit to the one before it
+
+
+def _is_table(lines: List[str]) -> bool:
+    cells = sum(1 for line in lines if "|" in line or "\t" in line)
+    return len(lines) > 1 and cells * 2 >= len(lines)
+
+
+class Chunker:
+    """Streaming, structure-aware chunker.
+
+    Text is split into paragraphs, then sentences (or rows, for tables) only
+    where a paragraph exceeds the budget, and units are packed greedily into
+    chunks of up to ``max_tokens``. Each new chunk starts with the last whole
+    sentences of the previous one, up to ``overlap_tokens``. Feed pages in
+    order and collect the (page, chunk) pairs; a chunk's page is where its
+    new text begins.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None):
+        self.max_tokens = token_budget() if max_tokens is None else max_tokens
+        self.overlap_tokens = SETTINGS.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+        if self.max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= self.overlap_tokens < self.max_tokens:
+            raise ValueError("overlap_tokens must be at least 0 and less than max_tokens")
+        self._units: List[_Unit] = []
+        self._carried = 0  # leading units repeated from the previous chunk
+        self._tokens = 0
+
+    def _split(self, page: int, paragraph: str) -> Iterator[_Unit]:
+        tokens = estimate_tokens(paragraph)
+        if tokens <= self.max_tokens:
+            yield _Unit(page, paragraph, tokens, "\n\n")
+            return
+        lines = [line for line in paragraph.splitlines() if line.strip()]
+        if _is_table(lines):
+            parts, sep = lines, "\n"
+        else:
+            parts, sep = _SENTENCE_RE.split(" ".join(paragraph.split())), " "
+        first = True
+        for part in parts:
+            for piece in self._hard_split(part):
+                yield _Unit(page, piece, estimate_tokens(piece), "\n\n" if first else sep)
+                first = False
+
+    def _hard_split(self, text: str) -> Iterator[str]:
+        # A single sentence or row over budget: cut between words
+        if estimate_tokens(text) <= self.max_tokens:
+            yield text
+            return
+        words, current, size = text.split(" "), [], 0
+        for word in words:
+            cost = estimate_tokens(word) + 1
+            if current and size + cost > self.max_tokens:
+                yield " ".join(current)
+                current, size = [], 0
+            while cost > self.max_tokens:  # e.g. a base64 blob
+                step = self.max_tokens * 4
+                yield word[:step]
+                word, cost = word[step:], estimate_tokens(word[step:]) + 1
+            current.append(word)
+            size += cost
+        if current:
+            yield " ".join(current)
+
+    def _emit(self) -> Tuple[int, str]:
+        units = self._units
+        text = units[0].text + "".join(u.sep + u.text for u in units[1:])
+        page = units[self._carried].page
+        # Carry trailing whole sentences forward as overlap
+        carried: List[_Unit] = []
+        size = 0
+        for unit in reversed(units[self._carried :]):
+            if size + unit.tokens <= self.overlap_tokens and len(carried) + 1 < len(units):
+                carried.insert(0, unit)
+                size += unit.tokens
+                continue
+            tail: List[str] = []
+            for sentence in reversed(_SENTENCE_RE.split(unit.text)[1:]):
+                cost = estimate_tokens(sentence) + 1
+                if size + cost > self.overlap_tokens:
+                    break
+                tail.insert(0, sentence)
+                size += cost
+            if tail:
+                carried.insert(0, _Unit(unit.page, " ".join(tail), estimate_tokens(" ".join(tail)), "\n\n"))
+            break
+        self._units, self._carried, self._tokens = carried, len(carried), size
+        return page, text
+
+    def feed(self, page: int, text: str) -> Iterator[Tuple[int, str]]:
+        for paragraph in _PARAGRAPH_RE.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            for unit in self._split(page, paragraph):
+                if len(self._units) > self._carried and self._tokens + unit.tokens > self.max_tokens:
+                    yield self._emit()
+                # Drop overlap that would push this unit past the budget
+                while self._carried and self._tokens + unit.tokens > self.max_tokens:
+                    self._tokens -= self._units.pop(0).tokens
+                    self._carried -= 1
+                self._units.append(unit)
+                self._tokens += unit.tokens
+
+    def finish(self) -> Iterator[Tuple[int, str]]:
+        if len(self._units) > self._carried:
+            yield self._emit()
+        self._units, self._carried, self._tokens = [], 0, 0
+
+
+def iter_chunks(
+    pages: Iterable[Tuple[int, str]],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> Iterator[Tuple[int, str]]:
+    """(page, chunk) pairs for (page, text) input; see Chunker."""
+    chunker = Chunker(max_tokens, overlap_tokens)
+    for page, text in pages:
+        yield from chunker.feed(page, text)
+    yield from chunker.finish()
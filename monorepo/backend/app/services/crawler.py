@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from ..config import SETTINGS
+from .documents import logical_doc_id
+from .pipeline import ingest_pages
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "rag-backend-crawler/0.1"
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"}
+_MAIN_TAGS = {"main", "article"}
+_BLOCK_TAGS = {"p", "div", "section", "li", "tr", "br", "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol", "pre", "blockquote"}
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+# ingest(tenant_id, doc_id, url, title, text) -> chunks written
+IngestFn = Callable[[str, str, str, str, str], Awaitable[int]]
+
+
+class _PageParser(HTMLParser):
+    """Collects visible text (preferring <main>/<article> when present),
+    the title, and outgoing links."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.links: List[str] = []
+        self._all: List[str] = []
+        self._main: List[str] = []
+        self._skip = 0
+        self._in_main = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _MAIN_TAGS:
+            self._in_main += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in _BLOCK_TAGS:
+            self._text("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in _MAIN_TAGS and self._in_main:
+            self._in_main -= 1
+        elif tag == "title":
+            self._in_title = False
+        if tag in _BLOCK_TAGS:
+            self._text("\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self._text(data)
+
+    def _text(self, data: str) -> None:
+        self._all.append(data)
+        if self._in_main:
+            self._main.append(data)
+
+    def text(self) -> str:
+        raw = "".join(self._main) if "".join(self._main).strip() else "".join(self._all)
+        lines = [" ".join(line.split()) for line in raw.splitlines()]
+        # Block boundaries become paragraph breaks for the chunker
+        return "\n\n".join(line for line in lines if line)
+
+
+def extract_html(html: str, base_url: str) -> Tuple[str, str, List[str]]:
+    """(title, main text, absolute link URLs without fragments) of a page."""
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    links = [urldefrag(urljoin(base_url, href))[0] for href in parser.links]
+    return " ".join(parser.title.split()), parser.text(), [u for u in links if u.startswith(("http://", "https://"))]
+
+
+def parse_sitemap(xml: str) -> Tuple[List[str], List[str]]:
+    """(page URLs, nested sitemap URLs) listed in a sitemap or sitemap index."""
+    try:
+        root = ET.fromstring(xml)
+    except ET.ParseError:
+        return [], []
+    locs = [(el.text or "").strip() for el in root.iter() if el.tag == "loc" or el.tag.endswith("}loc")]
+    locs = [u for u in locs if u]
+    return ([], locs) if root.tag.endswith("sitemapindex") else (locs, [])
+
+
+@dataclass
+class CrawlStats:
+    fetched: int = 0
+    not_modified: int = 0  # 304 from a conditional request
+    unchanged: int = 0  # fetched, but the extracted text hash matched
+    ingested: int = 0
+    chunks: int = 0
+    failed: int = 0
+    disallowed: int = 0  # blocked by robots.txt
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _Host:
+    slots: asyncio.Semaphore
+    delay: float
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_at: float = 0.0
+    robots: Optional[RobotFileParser] = None
+    ready: asyncio.Event = field(default_factory=asyncio.Event)  # robots.txt loaded
+
+
+class Crawler:
+    """Crawls a tenant's site and ingests changed pages.
+
+    Starts from seed pages or sitemaps, follows links on the seed hosts,
+    and fetches with at most ``per_host`` requests in flight per host,
+    starting requests at least ``delay`` seconds apart (or robots.txt's
+    Crawl-delay, if longer). Per-URL ETag, Last-Modified, text hash and
+    links are kept in a JSON state file (saved every ``save_every`` pages
+    and at the end), so a re-crawl sends conditional requests and only
+    re-ingests pages whose text changed.
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        *,
+        customer_id: Optional[str] = None,
+        state_path: Optional[Path] = None,
+        ingest: Optional[IngestFn] = None,
+        per_host: int = 2,
+        delay: float = 0.5,
+        concurrency: int = 16,
+        max_pages: int = 5000,
+        follow_links: bool = True,
+        save_every: int = 100,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.tenant_id = tenant_id
+        self.customer_id = customer_id
+        self.state_path = state_path or Path(SETTINGS.data_dir) / "crawl" / f"{tenant_id}.json"
+        self._ingest = ingest or _pipeline_ingest(customer_id)
+        self.per_host = max(1, per_host)
+        self.delay = max(0.0, delay)
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.follow_links = follow_links
+        self.save_every = max(1, save_every)
+        self._transport = transport
+        self._hosts: Dict[str, _Host] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self.stats = CrawlStats()
+
+    # -- state --------------------------------------------------------------
+    def _load_state(self) -> None:
+        try:
+            self._state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self._state = {}
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._state), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    # -- politeness ---------------------------------------------------------
+    async def _host(self, client: httpx.AsyncClient, url: str) -> _Host:
+        netloc = urlsplit(url).netloc
+        host = self._hosts.get(netloc)
+        if host is not None:
+            await host.ready.wait()
+            return host
+        host = self._hosts[netloc] = _Host(asyncio.Semaphore(self.per_host), self.delay)
+        robots = RobotFileParser()
+        try:
+            res = await client.get(f"{urlsplit(url).scheme}://{netloc}/robots.txt")
+            if res.status_code >= 500:
+                # RFC 9309: an unreachable robots.txt means nothing may be crawled
+                raise httpx.HTTPStatusError(f"robots.txt returned {res.status_code}", request=res.request, response=res)
+            # A missing robots.txt (4xx) places no restrictions
+            robots.parse(res.text.splitlines() if res.status_code == 200 else [])
+            host.robots = robots
+            crawl_delay = robots.crawl_delay(USER_AGENT)
+            if crawl_delay:
+                host.delay = max(host.delay, float(crawl_delay))
+        except httpx.HTTPError as exc:
+            logger.warning("robots.txt unreachable; skipping host", extra={"extra": {"host": netloc, "error": str(exc)}})
+            robots.disallow_all = True
+            host.robots = robots
+        finally:
+            # Other workers for this host wait on it whatever happened here
+            host.ready.set()
+        return host
+
+    async def _get(self, client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> Optional[httpx.Response]:
+        host = await self._host(client, url)
+        if host.robots is not None and not host.robots.can_fetch(USER_AGENT, url):
+            self.stats.disallowed += 1
+            return None
+        loop = asyncio.get_running_loop()
+        async with host.slots:
+            async with host.lock:
+                wait = host.next_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                host.next_at = loop.time() + host.delay
+            return await client.get(url, headers=headers)
+
+    # -- crawl ----------------------------------------------------------------
+    async def _expand_sitemap(self, client: httpx.AsyncClient, url: str, depth: int = 0) -> List[str]:
+        res = await self._get(client, url, {})
+        if res is None or res.status_code != 200:
+            return []
+        pages, nested = parse_sitemap(res.text)
+        if depth < 3:
+            for child in nested:
+                pages.extend(await self._expand_sitemap(client, child, depth + 1))
+        return pages
+
+    async def _visit(self, client: httpx.AsyncClient, url: str) -> List[str]:
+        """Fetch and, if changed, ingest one page; returns links to follow."""
+        known = self._state.get(url, {})
+        headers: Dict[str, str] = {}
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+        res = await self._get(client, url, headers)
+        if res is None:
+            return []
+        if res.status_code == 304:
+            self.stats.not_modified += 1
+            return list(known.get("links", []))
+        res.raise_for_status()
+        self.stats.fetched += 1
+        if not res.headers.get("content-type", "").startswith(_HTML_TYPES):
+            return []
+        title, text, links = extract_html(res.text, str(res.url))
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        entry = {
+            "etag": res.headers.get("etag"),
+            "last_modified": res.headers.get("last-modified"),
+            "hash": known.get("hash"),
+            "links": links,
+        }
+        if digest == known.get("hash"):
+            self.stats.unchanged += 1
+        elif text.strip():
+            doc_id = logical_doc_id(self.tenant_id, url, self.customer_id)
+            self.stats.chunks += await self._ingest(self.tenant_id, doc_id, url, title, text)
+            self.stats.ingested += 1
+            entry["hash"] = digest
+        self._state[url] = entry
+        return links
+
+    async def run(self, seeds: List[str]) -> CrawlStats:
+        self._load_state()
+        scope = {urlsplit(u).netloc for u in seeds}
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        seen: Set[str] = set()
+        visited = [0]
+
+        def enqueue(url: str) -> None:
+            url = urldefrag(url)[0]
+            if url in seen or len(seen) >= self.max_pages or urlsplit(url).netloc not in scope:
+                return
+            seen.add(url)
+            queue.put_nowait(url)
+
+        async with httpx.AsyncClient(
+            transport=self._transport,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            timeout=httpx.Timeout(20.0, connect=5.0),
+        ) as client:
+            for seed in seeds:
+                if seed.endswith(".xml") or "sitemap" in urlsplit(seed).path:
+                    for url in await self._expand_sitemap(client, seed):
+                        enqueue(url)
+                else:
+                    enqueue(seed)
+
+            async def worker() -> None:
+                while True:
+                    url = await queue.get()
+                    try:
+                        links = await self._visit(client, url)
+                        if self.follow_links:
+                            for link in links:
+                                enqueue(link)
+                    except Exception as exc:
+                        self.stats.failed += 1
+                        logger.warning("crawl failed", extra={"extra": {"url": url, "error": str(exc)}})
+                    finally:
+                        visited[0] += 1
+                        if visited[0] % self.save_every == 0:
+                            # A crash late in a long crawl keeps what was learned so far
+                            self._save_state()
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self._save_state()
+        return self.stats
+
+
+def _pipeline_ingest(customer_id: Optional[str]) -> IngestFn:
+    async def ingest(tenant_id: str, doc_id: str, url: str, title: str, text: str) -> int:
+        async def pages() -> AsyncIterator[Tuple[int, str]]:
+            yield 1, f"{title}\n\n{text}" if title else text
+
+        return await ingest_pages(tenant_id, doc_id, pages(), url, url, customer_id)
+
+    return ingest
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Iterable, List
 
-from sqlalchemy import String, Text, DateTime, create_engine, UniqueConstraint
+from sqlalchemy import Integer, LargeBinary, String, Text, DateTime, create_engine, event, inspect, text, UniqueConstraint
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, Session
 
 from ..config import SETTINGS
 from ..utils.tenant_ctx import get_current_tenant
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     pass
@@ -85,14 +91,68 @@ class SiteCredential(Base):
     __table_args__ = (UniqueConstraint("site_id", "platform", name="uq_site_platform"),)
 
 
-_engines: dict[str, Any] = {}
+class IngestJob(Base):
+    """Queued document ingestion; rows live in the central database."""
+
+    __tablename__ = "ingest_jobs"
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    site_id: Mapped[str] = mapped_column(String(255), index=True)
+    customer_id: Mapped[Optional[str]] = mapped_column(String(128), index=True)
+    doc_id: Mapped[str] = mapped_column(String(64))
+    path: Mapped[str] = mapped_column(String(1024))
+    batch_id: Mapped[Optional[str]] = mapped_column(String(64), index=True)  # set for files of one /ingest/bulk request
+    name: Mapped[Optional[str]] = mapped_column(String(1024))  # file name as uploaded (archive member path)
+    status: Mapped[str] = mapped_column(String(16), index=True, default="queued")  # queued|running|done|failed
+    stage: Mapped[str] = mapped_column(String(16), default="queued")  # extract|chunk|embed|upsert|done
+    chunks_done: Mapped[int] = mapped_column(Integer(), default=0)
+    chunks_total: Mapped[int] = mapped_column(Integer(), default=0)
+    attempts: Mapped[int] = mapped_column(Integer(), default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=False))
+
+
+class Document(Base):
+    """Latest ingested version of a logical document and its chunk ids."""
+
+    __tablename__ = "documents"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(String(255), index=True)
+    customer_id: Mapped[Optional[str]] = mapped_column(String(128), index=True)
+    doc_id: Mapped[str] = mapped_column(String(64))
+    path: Mapped[str] = mapped_column(String(1024))
+    version: Mapped[int] = mapped_column(Integer(), default=1)
+    chunk_ids_json: Mapped[str] = mapped_column(Text())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
+    __table_args__ = (UniqueConstraint("site_id", "doc_id", name="uq_site_doc"),)
+
+
+class ChunkEmbedding(Base):
+    """Embedding of a chunk's normalized text, reused across re-ingests."""
+
+    __tablename__ = "chunk_embeddings"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    site_id: Mapped[str] = mapped_column(String(255), index=True)
+    model: Mapped[str] = mapped_column(String(128))
+    content_hash: Mapped[str] = mapped_column(String(64))
+    vector: Mapped[bytes] = mapped_column(LargeBinary())  # float32
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=False), default=datetime.utcnow)
+    __table_args__ = (UniqueConstraint("site_id", "model", "content_hash", name="uq_site_model_hash"),)
+
 
+# DSN -> engine, least recently used first; at most DB_MAX_ENGINES are kept.
+# Tenants map to a DSN through _tenant_dsn, so tenants sharing a database share its pool.
+_engines: "OrderedDict[str, Engine]" = OrderedDict()
+_engines_lock = threading.Lock()
+_schema_ready: set[str] = set()  # DSNs whose tables exist
+_schema_lock = threading.Lock()
+_opened = 0
+_evicted = 0
 
-def _get_engine():
-    tenant = get_current_tenant() or "default"
-    if tenant in _engines:
-        return _engines[tenant]
 
+def _tenant_dsn(tenant: str) -> str:
     # Priority: tenant-specific DSN -> default DSN -> sqlite fallback
     dsn = None
     # TENANT_SQL_DSN is a mapping tenant -> [DSN]
@@ -106,13 +166,157 @@ def _get_engine():
         db_path = Path(SETTINGS.data_dir) / db_name
         db_path.parent.mkdir(parents=True, exist_ok=True)
         dsn = f"sqlite:///{db_path}"
+    return dsn
 
-    engine = create_engine(dsn, pool_pre_ping=True)
-    Base.metadata.create_all(engine)
-    _engines[tenant] = engine
+
+def _sqlite_pragmas(dbapi_connection: Any, _record: Any) -> None:
+    # WAL lets readers run alongside the writer, and with synchronous=NORMAL
+    # a commit no longer waits for an fsync (only checkpoints do)
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SETTINGS.db_sqlite_mmap_mb * 1024 * 1024}")
+        cursor.execute(f"PRAGMA busy_timeout={SETTINGS.db_sqlite_busy_timeout_ms}")
+    finally:
+        cursor.close()
+
+
+def make_engine(dsn: str) -> Engine:
+    """Engine for ``dsn`` with the configured pool; SQLite files also get
+    WAL, synchronous=NORMAL, mmap and busy-timeout pragmas."""
+    url = make_url(dsn)
+    sqlite = url.get_backend_name() == "sqlite"
+    if sqlite and url.database in (None, "", ":memory:"):
+        # In-memory databases use a single-connection pool without size options
+        return create_engine(url, pool_pre_ping=True)
+    engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=SETTINGS.db_pool_size,
+        max_overflow=SETTINGS.db_max_overflow,
+        pool_recycle=SETTINGS.db_pool_recycle_seconds,
+    )
+    if sqlite:
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """create_all only creates missing tables; add the nullable columns (and
+    their indexes) that models gained since a table was created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            added = [c for c in table.columns if c.name not in existing and c.nullable]
+            for column in added:
+                ddl = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}"))
+            if added:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+
+def _ensure_schema(engine: Engine, dsn: str) -> None:
+    if dsn in _schema_ready:
+        return
+    with _schema_lock:
+        if dsn not in _schema_ready:
+            Base.metadata.create_all(engine)
+            _add_missing_columns(engine)
+            _schema_ready.add(dsn)
+
+
+def _get_engine(tenant: Optional[str] = None) -> Engine:
+    """Engine for a tenant's database. Engines are keyed by DSN, so tenants
+    that share a database (e.g. all on DEFAULT_SQL_DSN) share one pool."""
+    global _opened, _evicted
+    dsn = _tenant_dsn(tenant or get_current_tenant() or "default")
+    with _engines_lock:
+        engine = _engines.get(dsn)
+        if engine is not None:
+            _engines.move_to_end(dsn)
+            return engine
+
+    engine = make_engine(dsn)
+    # Tables are created by migrate() at startup; this only covers tenants
+    # first seen afterwards, once per database for the life of the process
+    _ensure_schema(engine, dsn)
+
+    evicted: List[Engine] = []
+    with _engines_lock:
+        current = _engines.get(dsn)
+        if current is not None:
+            # Another thread opened it first
+            _engines.move_to_end(dsn)
+            evicted.append(engine)
+            engine = current
+        else:
+            _engines[dsn] = engine
+            _opened += 1
+            while len(_engines) > max(1, SETTINGS.db_max_engines):
+                evicted.append(_engines.popitem(last=False)[1])
+                _evicted += 1
+    for old in evicted:
+        # Idle connections close now; ones still checked out close when returned
+        old.dispose()
     return engine
 
 
-def open_session() -> Session:
-    engine = _get_engine()
+def _known_tenants() -> List[str]:
+    tenants = ["default", *SETTINGS.tenant_sql_dsn.keys()]
+    data_dir = Path(SETTINGS.data_dir)
+    if not SETTINGS.tenant_sql_dsn and not SETTINGS.default_sql_dsn and data_dir.is_dir():
+        tenants.extend(p.stem for p in data_dir.glob("*.db") if p.stem != "central")
+    return tenants
+
+
+def migrate(tenants: Optional[Iterable[str]] = None) -> int:
+    """Create missing tables in the central database and each known tenant
+    database (TENANT_SQL_DSN and existing tenant SQLite files); called at
+    startup so requests do not pay for schema checks. Returns how many
+    databases were checked."""
+    checked = 0
+    for tenant in tenants if tenants is not None else _known_tenants():
+        dsn = _tenant_dsn(tenant)
+        if dsn in _schema_ready:
+            continue
+        engine = make_engine(dsn)
+        try:
+            _ensure_schema(engine, dsn)
+            checked += 1
+        except Exception as exc:
+            logger.warning("schema migration failed", extra={"extra": {"tenant_id": tenant, "error": str(exc)}})
+        finally:
+            engine.dispose()
+    return checked
+
+
+def dispose_engines() -> None:
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+def db_stats() -> Dict[str, Any]:
+    with _engines_lock:
+        engines = list(_engines.values())
+    return {
+        "engines": len(engines),
+        "capacity": SETTINGS.db_max_engines,
+        "opened": _opened,
+        "evicted": _evicted,
+        "checked_out": sum(e.pool.checkedout() for e in engines if hasattr(e.pool, "checkedout")),
+    }
+
+
+def open_session(tenant: Optional[str] = None) -> Session:
+    """Session on the given tenant's database, defaulting to the tenant of
+    the current request context. Background workers pass it explicitly."""
+    engine = _get_engine(tenant)
     return Session(engine)
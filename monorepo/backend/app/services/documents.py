@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from .db import ChunkEmbedding, Document, open_session
+
+_IN_BATCH = 500  # bound on SQL IN (...) list sizes
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a chunk's text with whitespace collapsed, so re-extraction
+    noise does not count as an edit."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def logical_doc_id(tenant_id: str, source: str, customer_id: Optional[str] = None) -> str:
+    """Stable id for a document across re-uploads: the same file name for the
+    same tenant and customer maps to the same id."""
+    key = f"{tenant_id}/{customer_id or ''}/{source.strip().lower()}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+
+def cached_vectors(tenant_id: str, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+    found: Dict[str, List[float]] = {}
+    with open_session(tenant_id) as session:
+        for start in range(0, len(hashes), _IN_BATCH):
+            rows = (
+                session.query(ChunkEmbedding.content_hash, ChunkEmbedding.vector)
+                .filter(
+                    ChunkEmbedding.site_id == tenant_id,
+                    ChunkEmbedding.model == model,
+                    ChunkEmbedding.content_hash.in_(hashes[start : start + _IN_BATCH]),
+                )
+                .all()
+            )
+            for digest, blob in rows:
+                found[digest] = np.frombuffer(blob, dtype=np.float32).tolist()
+    return found
+
+
+def save_vectors(tenant_id: str, model: str, vectors: Dict[str, List[float]]) -> None:
+    rows = [
+        ChunkEmbedding(site_id=tenant_id, model=model, content_hash=digest, vector=np.asarray(vec, dtype=np.float32).tobytes())
+        for digest, vec in vectors.items()
+    ]
+    if not rows:
+        return
+    with open_session(tenant_id) as session:
+        try:
+            session.add_all(rows)
+            session.commit()
+            return
+        except IntegrityError:
+            # Another job stored some of these first; keep the rest
+            session.rollback()
+        for row in rows:
+            try:
+                session.add(row)
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+
+
+def current_version(tenant_id: str, doc_id: str) -> Optional[Dict[str, Any]]:
+    with open_session(tenant_id) as session:
+        doc = session.query(Document).filter(Document.site_id == tenant_id, Document.doc_id == doc_id).first()
+        if doc is None:
+            return None
+        return {"version": doc.version, "path": doc.path, "chunk_ids": json.loads(doc.chunk_ids_json)}
+
+
+def record_version(tenant_id: str, doc_id: str, path: str, chunk_ids: List[str], customer_id: Optional[str] = None) -> int:
+    """Store the chunk ids of the version just ingested; returns its number."""
+    with open_session(tenant_id) as session:
+        doc = session.query(Document).filter(Document.site_id == tenant_id, Document.doc_id == doc_id).first()
+        if doc is None:
+            doc = Document(site_id=tenant_id, customer_id=customer_id, doc_id=doc_id, version=0)
+            session.add(doc)
+        doc.version = (doc.version or 0) + 1
+        doc.path = path
+        doc.chunk_ids_json = json.dumps(chunk_ids)
+        doc.updated_at = datetime.utcnow()
+        session.commit()
+        return doc.version
+
+
+def tenant_generation(tenant_id: str) -> str:
+    """Changes whenever a document of the tenant is ingested, from any process."""
+    with open_session(tenant_id) as session:
+        count, updated = (
+            session.query(func.count(Document.id), func.max(Document.updated_at)).filter(Document.site_id == tenant_id).one()
+        )
+    return f"{count}:{updated.isoformat() if updated else ''}"
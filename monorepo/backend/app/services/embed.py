@@ -1,23 +1,205 @@
 from __future__ import annotations
 
-from typing import List
-
-import httpx
+import asyncio
+import logging
+import random
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from ..config import SETTINGS
+from .embed_cache import EmbeddingCache
+from .ollama import get_ollama
+
+logger = logging.getLogger(__name__)
+
+_QUERY_CACHE = EmbeddingCache(
+    max_bytes=int(SETTINGS.embed_cache_max_mb * 1024 * 1024),
+    ttl_seconds=SETTINGS.embed_cache_ttl_seconds,
+)
+
+
+async def _embed_batch(texts: List[str]) -> List[List[float]]:
+    """One embedding request to the model server for a list of texts."""
+    data = await get_ollama().post_json(
+        "/api/embed", {"model": SETTINGS.embed_model, "input": texts}, kind="embed"
+    )
+    # /api/embed returns {"embeddings": [[...], ...]} for list input
+    if "embeddings" in data:
+        return list(data["embeddings"])
+    # OpenAI-style batch: 'data': [{embedding: [...]}]
+    if "data" in data:
+        return [item["embedding"] for item in data["data"]]
+    # Legacy single-embedding response
+    return [data.get("embedding", [])]
+
+
+class _EmbedBatcher:
+    """Coalesces concurrent embedding calls into batched model requests.
+
+    Each caller awaits a future; pending texts are flushed as one request once
+    ``max_items`` are queued or ``max_wait_ms`` has passed since the first one,
+    whichever comes first. Identical texts within a batch are sent once.
+
+    The timer and futures belong to the loop that queued them, so a call on
+    a different loop (a restarted app, successive asyncio.run calls) drops
+    whatever the previous loop left behind instead of waiting on it.
+    """
+
+    def __init__(self, max_items: int, max_wait_ms: float):
+        self.max_items = max(1, int(max_items))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._pending: List[Tuple[str, "asyncio.Future[List[float]]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind(loop)
+        fut: "asyncio.Future[List[float]]" = loop.create_future()
+        self._pending.append((text, fut))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await fut
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            logger.warning("dropped embedding requests of a finished event loop", extra={"extra": {"pending": len(self._pending)}})
+        self._pending, self._tasks = [], set()
+        self._loop = loop
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, "asyncio.Future[List[float]]"]]) -> None:
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            vectors = await _embed_batch(unique)
+            if len(vectors) != len(unique):
+                raise RuntimeError(f"Embedding server returned {len(vectors)} vectors for {len(unique)} inputs")
+            by_text = dict(zip(unique, vectors))
+            for text, fut in batch:
+                if not fut.done():
+                    fut.set_result(by_text[text])
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_items": self.max_items,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": (self.items / self.batches) if self.batches else 0.0,
+        }
+
+
+_BATCHER = _EmbedBatcher(SETTINGS.embed_batch_max_items, SETTINGS.embed_batch_max_wait_ms)
 
 
 async def embed_texts(texts: List[str]) -> List[List[float]]:
-    url = f"{SETTINGS.ollama_base}/api/embeddings"
-    async with httpx.AsyncClient(timeout=None) as client:
-        res = await client.post(url, json={"model": SETTINGS.embed_model, "input": texts})
-        res.raise_for_status()
-        data = res.json()
-        # Ollama returns one embedding for single input; batch emulate
-        if isinstance(texts, list) and len(texts) == 1 and "embedding" in data:
-            return [data["embedding"]]
-        # If server supports batch, expect 'data': [{embedding: [...]}]
-        if "data" in data:
-            return [item["embedding"] for item in data["data"]]
-        # Fallback single
-        return [data.get("embedding", [])]
+    if _BATCHER.max_items <= 1:
+        return await _embed_batch(texts)
+    return list(await asyncio.gather(*(_BATCHER.submit(t) for t in texts)))
+
+
+def _plan_batches(texts: List[str], max_chars: int, max_items: int) -> List[Tuple[int, int]]:
+    """Split texts into contiguous [start, end) ranges within the size budget."""
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    chars = 0
+    for i, text in enumerate(texts):
+        if i > start and (chars + len(text) > max_chars or i - start >= max_items):
+            ranges.append((start, i))
+            start, chars = i, 0
+        chars += len(text)
+    if start < len(texts):
+        ranges.append((start, len(texts)))
+    return ranges
+
+
+async def _embed_exact(texts: List[str], retries: int) -> List[List[float]]:
+    """Embed a batch, retrying with backoff, and return exactly one vector per text.
+
+    A server that answers a batch with fewer vectors (e.g. a single legacy
+    ``embedding`` field) gets the batch split in halves until counts match.
+    """
+    attempt = 0
+    while True:
+        try:
+            vectors = await _embed_batch(texts)
+            break
+        except Exception as exc:
+            attempt += 1
+            if attempt > retries:
+                raise
+            delay = min(8.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random())
+            logger.warning("embedding batch failed, retrying", extra={"extra": {"attempt": attempt, "size": len(texts), "error": str(exc)}})
+            await asyncio.sleep(delay)
+    if len(vectors) == len(texts) and all(vectors):
+        return vectors
+    if len(texts) == 1:
+        raise RuntimeError("Embedding server returned no vector for input")
+    mid = len(texts) // 2
+    return await _embed_exact(texts[:mid], retries) + await _embed_exact(texts[mid:], retries)
+
+
+async def embed_documents(texts: List[str]) -> List[List[float]]:
+    """Embed document chunks for ingest.
+
+    Chunks are grouped into batches bounded by EMBED_INGEST_BATCH_CHARS and
+    EMBED_INGEST_BATCH_ITEMS, with up to EMBED_INGEST_CONCURRENCY batches in
+    flight. The result always has one vector per input, in order.
+    """
+    ranges = _plan_batches(texts, SETTINGS.embed_ingest_batch_chars, SETTINGS.embed_ingest_batch_items)
+    gate = asyncio.Semaphore(max(1, SETTINGS.embed_ingest_concurrency))
+
+    async def _run(start: int, end: int) -> List[List[float]]:
+        async with gate:
+            return await _embed_exact(texts[start:end], SETTINGS.embed_ingest_retries)
+
+    parts = await asyncio.gather(*(_run(s, e) for s, e in ranges))
+    vectors = [vec for part in parts for vec in part]
+    if len(vectors) != len(texts):
+        raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+    return vectors
+
+
+async def embed_query(text: str) -> List[float]:
+    """Embed a single search/chat query, served from the query cache when possible."""
+    model = SETTINGS.embed_model
+    cached = _QUERY_CACHE.get(model, text)
+    if cached is not None:
+        return cached
+    [vec] = await embed_texts([text])
+    if vec:
+        _QUERY_CACHE.put(model, text, vec)
+    return vec
+
+
+def query_cache_stats() -> Dict[str, Any]:
+    return _QUERY_CACHE.stats()
+
+
+def batcher_stats() -> Dict[str, Any]:
+    return _BATCHER.stats()
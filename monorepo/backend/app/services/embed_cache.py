@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and case so trivially different phrasings share a key."""
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """LRU + TTL cache of query embeddings keyed by (model, normalized text).
+
+    Vectors are held as float32 and the budget is counted in vector bytes.
+    Seeing a different model than the previous call drops every entry, so
+    switching EMBED_MODEL never serves stale vectors.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self._max_bytes = max(0, int(max_bytes))
+        self._ttl = float(ttl_seconds)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._bytes = 0
+        self._model: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_model(self, model: str) -> None:
+        if model != self._model:
+            self.clear()
+            self._model = model
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        self._check_model(model)
+        key = (model, normalize_query(text))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        vec, expires = entry
+        if expires <= time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vec.tolist()
+
+    def put(self, model: str, text: str, vector: List[float]) -> None:
+        self._check_model(model)
+        vec = np.asarray(vector, dtype=np.float32)
+        if vec.nbytes > self._max_bytes:
+            return
+        key = (model, normalize_query(text))
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (vec, time.monotonic() + self._ttl)
+        self._bytes += vec.nbytes
+        while self._bytes > self._max_bytes and self._entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        vec, _ = self._entries.pop(key)
+        self._bytes -= vec.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self._model,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
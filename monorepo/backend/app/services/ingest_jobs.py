@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from ..config import SETTINGS
+from .bulk import BulkFile, ingest_many
+from .db import IngestJob, Upload, open_session
+from .pipeline import IngestError, ingest_file
+
+logger = logging.getLogger(__name__)
+
+# Jobs live in the central database so one set of workers sees every tenant
+_JOBS_DB = "default"
+
+_tasks: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_busy = 0
+
+
+def _as_dict(job: IngestJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "tenant_id": job.site_id,
+        "customer_id": job.customer_id,
+        "doc_id": job.doc_id,
+        "path": job.path,
+        "batch_id": job.batch_id,
+        "name": job.name,
+        "status": job.status,
+        "stage": job.stage,
+        "chunks_done": job.chunks_done,
+        "chunks_total": job.chunks_total,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _new_job(tenant_id: str, doc_id: str, path: Path, customer_id: Optional[str], **extra: Any) -> IngestJob:
+    return IngestJob(
+        id=uuid.uuid4().hex,
+        site_id=tenant_id,
+        customer_id=customer_id,
+        doc_id=doc_id,
+        path=str(path),
+        status="queued",
+        stage="queued",
+        chunks_done=0,
+        chunks_total=0,
+        attempts=0,
+        **extra,
+    )
+
+
+def enqueue(tenant_id: str, doc_id: str, path: Path, customer_id: Optional[str] = None) -> str:
+    job = _new_job(tenant_id, doc_id, path, customer_id)
+    with open_session(_JOBS_DB) as session:
+        session.add(job)
+        session.commit()
+        job_id = job.id
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id
+
+
+def enqueue_batch(tenant_id: str, files: List[BulkFile], batch_id: str, customer_id: Optional[str] = None) -> List[str]:
+    """Queue the saved files of one bulk upload in a single transaction.
+    Workers claim them together (see claim_batch) so their chunks share
+    batched vector-store writes. Returns the job ids in order."""
+    jobs = [_new_job(tenant_id, f.doc_id, f.path, customer_id, batch_id=batch_id, name=f.name) for f in files]
+    with open_session(_JOBS_DB) as session:
+        session.add_all(jobs)
+        session.commit()
+        job_ids = [job.id for job in jobs]
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_ids
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    with open_session(_JOBS_DB) as session:
+        job = session.get(IngestJob, job_id)
+        return _as_dict(job) if job is not None else None
+
+
+def batch_jobs(batch_id: str) -> List[Dict[str, Any]]:
+    with open_session(_JOBS_DB) as session:
+        jobs = session.query(IngestJob).filter(IngestJob.batch_id == batch_id).order_by(IngestJob.created_at, IngestJob.id).all()
+        return [_as_dict(job) for job in jobs]
+
+
+def claim_next() -> Optional[Dict[str, Any]]:
+    """Atomically move the oldest queued job to running and return it.
+
+    The conditional UPDATE lets several workers (or processes) poll the same
+    table; whoever changes the row first owns the job.
+    """
+    with open_session(_JOBS_DB) as session:
+        while True:
+            job_id = (
+                session.query(IngestJob.id)
+                .filter(IngestJob.status == "queued")
+                .order_by(IngestJob.created_at)
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                return None
+            job = _claim(session, job_id)
+            if job is not None:
+                return job
+
+
+def claim_batch(batch_id: str, limit: int) -> List[Dict[str, Any]]:
+    """Claim up to ``limit`` more queued jobs of a bulk upload."""
+    claimed: List[Dict[str, Any]] = []
+    with open_session(_JOBS_DB) as session:
+        job_ids = (
+            session.query(IngestJob.id)
+            .filter(IngestJob.batch_id == batch_id, IngestJob.status == "queued")
+            .order_by(IngestJob.created_at)
+            .limit(max(0, limit))
+            .all()
+        )
+        for (job_id,) in job_ids:
+            job = _claim(session, job_id)
+            if job is not None:
+                claimed.append(job)
+    return claimed
+
+
+def _claim(session: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    # Whoever changes the row from queued owns the job
+    claimed = (
+        session.query(IngestJob)
+        .filter(IngestJob.id == job_id, IngestJob.status == "queued")
+        .update(
+            {"status": "running", "stage": "extract", "attempts": IngestJob.attempts + 1, "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+    )
+    session.commit()
+    return _as_dict(session.get(IngestJob, job_id)) if claimed else None
+
+
+def _update(job_id: str, **values: Any) -> None:
+    _update_many([job_id], **values)
+
+
+def _update_many(job_ids: List[str], **values: Any) -> None:
+    values["updated_at"] = datetime.utcnow()
+    with open_session(_JOBS_DB) as session:
+        session.query(IngestJob).filter(IngestJob.id.in_(job_ids)).update(values, synchronize_session=False)
+        session.commit()
+
+
+def requeue_stale(lease_seconds: Optional[float] = None) -> int:
+    """Return running jobs whose worker stopped heartbeating to the queue.
+
+    Jobs that already used INGEST_JOB_MAX_ATTEMPTS fail instead: a document
+    that kills its worker (OOM, a crashing extractor) would otherwise be
+    retried after every lease or restart forever.
+    """
+    lease = SETTINGS.ingest_job_lease_seconds if lease_seconds is None else lease_seconds
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=lease)
+    exhausted = IngestJob.attempts >= SETTINGS.ingest_job_max_attempts
+    with open_session(_JOBS_DB) as session:
+        count = (
+            session.query(IngestJob)
+            .filter(IngestJob.status == "running", IngestJob.updated_at < cutoff)
+            .update(
+                {
+                    "status": case((exhausted, "failed"), else_="queued"),
+                    "error": case((exhausted, "worker stopped while processing this document"), else_=IngestJob.error),
+                    "finished_at": case((exhausted, now), else_=IngestJob.finished_at),
+                },
+                synchronize_session=False,
+            )
+        )
+        session.commit()
+    return count
+
+
+def _log_upload(job: Dict[str, Any]) -> None:
+    # Best-effort, as the synchronous upload path did
+    try:
+        meta = {"doc_id": job["doc_id"], "customer_id": job["customer_id"], "job_id": job["job_id"]}
+        with open_session(job["tenant_id"]) as session:
+            session.add(
+                Upload(
+                    site_id=job["tenant_id"],
+                    customer_id=job["customer_id"],
+                    filename=Path(job["path"]).name,
+                    metadata_json=json.dumps(meta),
+                )
+            )
+            session.commit()
+    except Exception:
+        pass
+
+
+async def _heartbeat(*job_ids: str) -> None:
+    while True:
+        await asyncio.sleep(SETTINGS.ingest_job_lease_seconds / 3)
+        await asyncio.to_thread(_update_many, list(job_ids))
+
+
+class _Progress:
+    """Progress callback for the pipeline, which reports on the event loop.
+    Writes run in a thread; reports arriving while one is written are
+    coalesced, so only the latest is written next."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._pending: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __call__(self, stage: str, done: int, total: int) -> None:
+        self._pending = {"stage": stage, "chunks_done": done, "chunks_total": total}
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._write())
+
+    async def _write(self) -> None:
+        while self._pending is not None:
+            values, self._pending = self._pending, None
+            try:
+                await asyncio.to_thread(_update, self.job_id, **values)
+            except Exception as exc:
+                logger.warning("job progress not saved", extra={"extra": {"job_id": self.job_id, "error": str(exc)}})
+
+    async def flush(self) -> None:
+        # The outcome is written after this, so a late progress write cannot overwrite it
+        self._pending = None
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def run_job(job: Dict[str, Any]) -> None:
+    """Run a claimed job through the pipeline and record the outcome."""
+    job_id = job["job_id"]
+    progress = _Progress(job_id)
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        try:
+            count = await ingest_file(job["tenant_id"], job["doc_id"], Path(job["path"]), job["customer_id"], progress)
+        finally:
+            await progress.flush()
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back so the next start resumes it
+        await asyncio.to_thread(_update, job_id, status="queued")
+        raise
+    except IngestError as exc:
+        await asyncio.to_thread(_update, job_id, status="failed", error=str(exc), finished_at=datetime.utcnow())
+    except Exception as exc:
+        retry = job["attempts"] < SETTINGS.ingest_job_max_attempts
+        logger.warning(
+            "ingest job failed",
+            extra={"extra": {"job_id": job_id, "attempt": job["attempts"], "retry": retry, "error": str(exc)}},
+        )
+        if retry:
+            await asyncio.to_thread(_update, job_id, status="queued", error=str(exc)[:1000])
+        else:
+            await asyncio.to_thread(_update, job_id, status="failed", error=str(exc)[:1000], finished_at=datetime.utcnow())
+    else:
+        await asyncio.to_thread(
+            _update, job_id, status="done", stage="done", chunks_done=count, chunks_total=count, error=None, finished_at=datetime.utcnow()
+        )
+        await asyncio.to_thread(_log_upload, job)
+    finally:
+        heartbeat.cancel()
+
+
+async def run_batch(jobs: List[Dict[str, Any]]) -> None:
+    """Run claimed jobs of one bulk upload together through ingest_many, so
+    their chunks share batched vector-store writes, and record each outcome
+    as run_job would."""
+    job_ids = [job["job_id"] for job in jobs]
+    files = [BulkFile(job["name"] or Path(job["path"]).name, Path(job["path"]), doc_id=job["doc_id"]) for job in jobs]
+    heartbeat = asyncio.create_task(_heartbeat(*job_ids))
+    try:
+        summary = await ingest_many(jobs[0]["tenant_id"], files, customer_id=jobs[0]["customer_id"])
+    except asyncio.CancelledError:
+        await asyncio.to_thread(_update_many, job_ids, status="queued")
+        raise
+    finally:
+        heartbeat.cancel()
+    logger.info("bulk jobs finished", extra={"extra": {"batch_id": jobs[0]["batch_id"], **summary}})
+    now = datetime.utcnow()
+    for job, f in zip(jobs, files):
+        if f.status == "ok":
+            values = dict(status="done", stage="done", chunks_done=f.chunks, chunks_total=f.chunks, error=None, finished_at=now)
+        elif f.retry and job["attempts"] < SETTINGS.ingest_job_max_attempts:
+            values = dict(status="queued", error=(f.error or "")[:1000])
+        else:
+            values = dict(status="failed", error=(f.error or "failed")[:1000], finished_at=now)
+        await asyncio.to_thread(_update, job["job_id"], **values)
+
+
+async def _worker(index: int) -> None:
+    global _busy
+    assert _wakeup is not None
+    while True:
+        # Queue queries run in threads: a locked central.db must not stall requests
+        job = await asyncio.to_thread(claim_next)
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=SETTINGS.ingest_poll_seconds)
+            except TimeoutError:
+                if index == 0:
+                    await asyncio.to_thread(requeue_stale)
+            _wakeup.clear()
+            continue
+        _busy += 1
+        try:
+            if job["batch_id"]:
+                more = await asyncio.to_thread(claim_batch, job["batch_id"], SETTINGS.bulk_claim_files - 1)
+                await run_batch([job, *more])
+            else:
+                await run_job(job)
+        finally:
+            _busy -= 1
+
+
+async def startup() -> None:
+    """Start the worker pool; called from the app lifespan hook."""
+    global _wakeup
+    if _tasks or SETTINGS.ingest_workers <= 0:
+        return
+    _wakeup = asyncio.Event()
+    await asyncio.to_thread(requeue_stale)
+    for i in range(SETTINGS.ingest_workers):
+        _tasks.append(asyncio.create_task(_worker(i), name=f"ingest-worker-{i}"))
+
+
+async def shutdown() -> None:
+    global _wakeup
+    tasks = list(_tasks)
+    _tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _wakeup = None
+
+
+def job_stats() -> Dict[str, Any]:
+    with open_session(_JOBS_DB) as session:
+        counts = dict(session.query(IngestJob.status, func.count()).group_by(IngestJob.status).all())
+    return {"workers": len(_tasks), "busy": _busy, **{s: counts.get(s, 0) for s in ("queued", "running", "done", "failed")}}
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+import re
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from ..config import SETTINGS
+from ..utils.filelock import file_lock
+from .vector import StoreRegistry, where_terms
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-./]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or our the this to we what when where which who why with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound tokens such as part numbers ("ab-1234") or
+    phone numbers ("555-123-4567") are kept whole, split, and joined."""
+    terms: List[str] = []
+    for match in _TOKEN_RE.finditer(text.lower()):
+        token = match.group(0)
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        parts = [p for p in _SPLIT_RE.split(token) if p]
+        if len(parts) > 1:
+            terms.extend(parts)
+            terms.append("".join(parts))
+    return terms
+
+
+class BM25Index:
+    """Per-tenant BM25 inverted index over chunk text.
+
+    Updated incrementally on upsert/delete and persisted as an append-only
+    JSON-lines log that is rewritten with live documents only once dead
+    records outnumber them. Postings are rebuilt from the log on open, and
+    records appended by other workers are replayed before each search.
+    Writers in any process (the server, the ingest CLIs) serialize on an
+    exclusive lock of ``<tenant>.lock`` next to the log.
+    """
+
+    def __init__(self, path: Optional[Path] = None, k1: float = 1.2, b: float = 0.75):
+        self.tenant_id = ""
+        self._path = path
+        self._k1 = k1
+        self._b = b
+        self._lock = threading.RLock()
+        self._slots: Dict[str, int] = {}
+        self._docs: List[Optional[Tuple[str, int, Dict[str, Any]]]] = []  # (id, length, metadata)
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_len = 0
+        self._log_records = 0
+        self._log_size = 0
+        self._log_ino = 0  # compaction replaces the file, so a new inode means start over
+        self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _refresh(self) -> None:
+        if self._path is None:
+            return
+        try:
+            st = self._path.stat()
+        except FileNotFoundError:
+            return
+        if st.st_ino == self._log_ino and st.st_size == self._log_size:
+            return
+        if st.st_ino != self._log_ino or st.st_size < self._log_size:
+            # New file, or compacted by another worker: rebuild from scratch
+            self._docs, self._slots, self._postings, self._total_len = [], {}, {}, 0
+            self._log_records = self._log_size = 0
+            self._log_ino = st.st_ino
+        with self._path.open("rb") as f:
+            f.seek(self._log_size)
+            data = f.read(st.st_size - self._log_size)
+        end = data.rfind(b"\n") + 1  # a partially written trailing line is read next time
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+                doc_id = rec["id"]
+            except (ValueError, KeyError, TypeError):
+                # A torn record (writer died mid-line); the next line starts clean
+                logger.warning("skipped corrupt lexical record", extra={"extra": {"tenant_id": self.tenant_id, "path": str(self._path)}})
+                continue
+            self._log_records += 1
+            if rec.get("del"):
+                self._remove(doc_id)
+            else:
+                self._add(doc_id, rec["m"])
+        self._log_size += end
+
+    def _write_lock(self):
+        return file_lock(self._path.with_suffix(".lock")) if self._path is not None else nullcontext()
+
+    def _add(self, doc_id: str, meta: Dict[str, Any]) -> None:
+        self._remove(doc_id)
+        terms = tokenize(str(meta.get("text", "")))
+        slot = len(self._docs)
+        self._docs.append((doc_id, len(terms), meta))
+        self._slots[doc_id] = slot
+        self._total_len += len(terms)
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[slot] = tf
+
+    def _remove(self, doc_id: str) -> None:
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return
+        entry = self._docs[slot]
+        self._docs[slot] = None
+        if entry is None:
+            return
+        _, length, meta = entry
+        self._total_len -= length
+        for term in set(tokenize(str(meta.get("text", "")))):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slot, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _append_log(self, records: List[Dict[str, Any]]) -> None:
+        # Caller holds _write_lock() and has just refreshed
+        if self._path is None or not records:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in records).encode("utf-8")
+        with self._path.open("ab") as f:
+            if f.tell() != self._log_size:
+                # Terminate a torn trailing line so it cannot swallow our first record
+                data = b"\n" + data
+            f.write(data)
+            self._log_size = f.tell()
+        if not self._log_ino:
+            self._log_ino = self._path.stat().st_ino
+        self._log_records += len(records)
+        if self._log_records > 2 * max(len(self._slots), 1024):
+            self._compact()
+
+    def _compact(self) -> None:
+        assert self._path is not None
+        tmp = self._path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for entry in self._docs:
+                if entry is not None:
+                    f.write(json.dumps({"id": entry[0], "m": entry[2]}, ensure_ascii=False) + "\n")
+        tmp.replace(self._path)
+        st = self._path.stat()
+        self._log_size, self._log_ino = st.st_size, st.st_ino
+        self._log_records = len(self._slots)
+        # Re-pack slots so dead entries do not accumulate in memory either
+        live = [e for e in self._docs if e is not None]
+        self._docs, self._slots, self._postings, self._total_len = [], {}, {}, 0
+        for doc_id, _, meta in live:
+            self._add(doc_id, meta)
+
+    def upsert(self, items: List[Tuple[str, Any, Dict[str, Any]]]) -> int:
+        """Index (id, vector, metadata) items as passed to VectorStore.upsert;
+        the vector is ignored and metadata["text"] is indexed."""
+        with self._lock, self._write_lock():
+            self._refresh()
+            for doc_id, _, meta in items:
+                self._add(doc_id, meta)
+            self._append_log([{"id": doc_id, "m": meta} for doc_id, _, meta in items])
+        return len(items)
+
+    def delete(self, ids: List[str]) -> int:
+        with self._lock, self._write_lock():
+            self._refresh()
+            present = [i for i in ids if i in self._slots]
+            for doc_id in present:
+                self._remove(doc_id)
+            self._append_log([{"id": doc_id, "del": 1} for doc_id in present])
+        return len(present)
+
+    def search(self, query: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        terms = set(tokenize(query))
+        with self._lock:
+            self._refresh()
+            n = len(self._slots)
+            if not n or not terms:
+                return []
+            avg_len = (self._total_len / n) or 1.0
+            allowed: Optional[Set[Tuple[str, Any]]] = set(where_terms(where)) if where else None
+            matched = sorted((p for p in (self._postings.get(t) for t in terms) if p), key=len)
+            # Terms found in a large share of chunks (e.g. the "pn" in "PN-1234")
+            # only re-score candidates found via selective terms, when there are any.
+            common_df = max(64, n // 10)
+            selective = [p for p in matched if len(p) <= common_df] or matched
+            scores: Dict[int, float] = {}
+            for postings in matched:
+                df = len(postings)
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                if any(postings is p for p in selective):
+                    pairs = postings.items()
+                else:
+                    pairs = [(slot, postings[slot]) for slot in scores if slot in postings]
+                for slot, tf in pairs:
+                    length = self._docs[slot][1]  # type: ignore[index]
+                    denom = tf + self._k1 * (1.0 - self._b + self._b * length / avg_len)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self._k1 + 1.0) / denom
+            if allowed:
+                ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+            else:
+                ranked = heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+            out: List[Dict[str, Any]] = []
+            for slot, score in ranked:
+                doc_id, _, meta = self._docs[slot]  # type: ignore[misc]
+                if allowed and any(meta.get(k) != v for k, v in allowed):
+                    continue
+                out.append({"id": doc_id, "score": score, "metadata": meta, "document": meta.get("text", "")})
+                if len(out) >= top_k:
+                    break
+            return out
+
+    def close(self) -> None:
+        return None
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """Merge ranked hit lists by summing 1 / (k + rank); the fused score
+    replaces each hit's "score" (higher is better)."""
+    fused: Dict[str, float] = {}
+    first_seen: Dict[str, Dict[str, Any]] = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits, start=1):
+            hit_id = str(hit.get("id"))
+            fused[hit_id] = fused.get(hit_id, 0.0) + 1.0 / (k + rank)
+            first_seen.setdefault(hit_id, hit)
+    ranked = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+    return [{**first_seen[hit_id], "score": score} for hit_id, score in ranked]
+
+
+def _build_index(tenant_id: str) -> BM25Index:
+    index = BM25Index(Path(SETTINGS.data_dir) / "lexical" / f"{tenant_id}.jsonl")
+    index.tenant_id = tenant_id
+    return index
+
+
+_INDEXES: StoreRegistry[BM25Index] = StoreRegistry(
+    _build_index,
+    max_open=SETTINGS.store_cache_max,
+    idle_seconds=SETTINGS.store_cache_idle_seconds,
+)
+
+
+def get_lexical_index(tenant_id: str) -> BM25Index:
+    return _INDEXES.get(tenant_id)
+
+
+def lexical_stats() -> Dict[str, Any]:
+    return _INDEXES.stats()
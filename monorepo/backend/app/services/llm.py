@@ -1,59 +1,91 @@
 from __future__ import annotations
 
-from typing import AsyncIterator, Dict, List
-
-import httpx
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from ..config import SETTINGS
+from .ollama import get_ollama
+from .scheduler import Ticket, admit
 
 
-async def stream_generate(messages: List[Dict], model: str | None = None) -> AsyncIterator[str]:
-    """Stream text from Ollama generate endpoint."""
-    url = f"{SETTINGS.ollama_base}/api/generate"
-    payload = {
+def _payload(messages: List[Dict], model: Optional[str], context: Optional[List[int]], stream: bool) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
         "model": model or SETTINGS.ollama_model,
-        "prompt": _messages_to_prompt(messages),
-        "stream": True,
+        # With a context the system prompt is already in it
+        "prompt": _messages_to_prompt(messages, system=context is None),
+        "stream": stream,
+        "keep_alive": SETTINGS.ollama_keep_alive,
     }
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream("POST", url, json=payload) as r:
-            async for line in r.aiter_lines():
-                if not line:
-                    continue
-                try:
-                    import json
-
-                    data = json.loads(line)
-                    if "response" in data:
-                        yield data["response"]
-                except Exception:
-                    continue
-
-
-def _messages_to_prompt(messages: List[Dict]) -> str:
-    system = "You are a helpful assistant. Cite sources when provided."
-    lines: List[str] = [f"<SYSTEM> {system}"]
+    if context:
+        payload["context"] = list(context)
+    return payload
+
+
+async def stream_generate(
+    messages: List[Dict],
+    model: str | None = None,
+    *,
+    context: Optional[List[int]] = None,
+    result: Optional[Dict[str, Any]] = None,
+    tenant_id: str = "default",
+    priority: str = "web",
+    ticket: Optional[Ticket] = None,
+) -> AsyncIterator[str]:
+    """Stream text from Ollama generate endpoint.
+
+    ``context`` is the token context Ollama returned for the previous turn
+    of a conversation; only ``messages`` (the new turn) are then prefilled.
+    When the stream completes, the new context is stored in ``result``.
+
+    The call waits for a scheduler slot as ``tenant_id`` at ``priority``
+    (may raise QueueFull) unless the caller already holds ``ticket``; the
+    slot is released when the stream ends or is closed.
+    """
+    payload = _payload(messages, model, context, stream=True)
+    ticket = ticket or await admit(tenant_id, priority)
+    try:
+        async for data in get_ollama().stream_json("/api/generate", payload, kind="stream"):
+            if "response" in data:
+                yield data["response"]
+            if data.get("done") and result is not None:
+                result["context"] = data.get("context")
+    finally:
+        ticket.release()
+
+
+def _messages_to_prompt(messages: List[Dict], system: bool = True) -> str:
+    lines: List[str] = []
+    if system:
+        lines.append("<SYSTEM> You are a helpful assistant. Cite sources when provided.")
     for m in messages:
         role = m.get("role", "user")
+        if role == "system" and not system:
+            continue
         content = m.get("content", "")
         lines.append(f"<{role.upper()}> {content}")
     return "\n".join(lines)
 
 
-async def generate(messages: List[Dict], model: str | None = None) -> str:
+async def generate(
+    messages: List[Dict],
+    model: str | None = None,
+    *,
+    context: Optional[List[int]] = None,
+    result: Optional[Dict[str, Any]] = None,
+    tenant_id: str = "default",
+    priority: str = "web",
+    ticket: Optional[Ticket] = None,
+) -> str:
     """Non-streaming generate: returns the full response text.
 
-    Uses Ollama's /api/generate with stream=false.
+    Uses Ollama's /api/generate with stream=false; the keyword arguments
+    work as in stream_generate.
     """
-    url = f"{SETTINGS.ollama_base}/api/generate"
-    payload = {
-        "model": model or SETTINGS.ollama_model,
-        "prompt": _messages_to_prompt(messages),
-        "stream": False,
-    }
-    async with httpx.AsyncClient(timeout=None) as client:
-        r = await client.post(url, json=payload)
-        r.raise_for_status()
-        data = r.json()
-        # Ollama returns { response: str, done: bool, ... }
-        return data.get("response", "")
+    ticket = ticket or await admit(tenant_id, priority)
+    try:
+        data = await get_ollama().post_json("/api/generate", _payload(messages, model, context, stream=False), kind="generate")
+    finally:
+        ticket.release()
+    if result is not None:
+        result["context"] = data.get("context")
+    # Ollama returns { response: str, done: bool, ... }
+    return data.get("response", "")
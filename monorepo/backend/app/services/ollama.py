@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from ..config import SETTINGS
+
+
+class OllamaClient:
+    """Application-scoped HTTP client for the Ollama server.
+
+    Keeps connections alive across requests and caps the number of in-flight
+    calls; callers beyond the cap wait on a semaphore instead of piling onto
+    the model server. Timeouts are chosen per call kind: "embed", "generate"
+    or "stream".
+    """
+
+    def __init__(self, base_url: str, max_inflight: int = 8, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_inflight = max(1, int(max_inflight))
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=self.max_inflight,
+                max_keepalive_connections=self.max_inflight,
+                keepalive_expiry=60.0,
+            ),
+        )
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+
+    def _timeouts(self, kind: str) -> Tuple[httpx.Timeout, float]:
+        read, total = {
+            "embed": (SETTINGS.ollama_embed_timeout, SETTINGS.ollama_embed_total_timeout),
+            "generate": (SETTINGS.ollama_generate_timeout, SETTINGS.ollama_generate_total_timeout),
+            "stream": (SETTINGS.ollama_stream_timeout, SETTINGS.ollama_stream_total_timeout),
+        }[kind]
+        timeout = httpx.Timeout(read, connect=SETTINGS.ollama_connect_timeout)
+        return timeout, total
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.inflight += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+
+    async def post_json(self, path: str, payload: Dict[str, Any], *, kind: str = "generate") -> Dict[str, Any]:
+        timeout, total = self._timeouts(kind)
+        async with self._slot():
+            async with asyncio.timeout(total):
+                res = await self._client.post(path, json=payload, timeout=timeout)
+                res.raise_for_status()
+                return res.json()
+
+    async def stream_json(self, path: str, payload: Dict[str, Any], *, kind: str = "stream") -> AsyncIterator[Dict[str, Any]]:
+        """Yield each JSON line of a streaming response.
+
+        The read timeout bounds the gap between lines; the total timeout is
+        checked between lines since a cancel scope cannot span yields.
+        """
+        timeout, total = self._timeouts(kind)
+        loop = asyncio.get_running_loop()
+        async with self._slot():
+            deadline = loop.time() + total
+            async with self._client.stream("POST", path, json=payload, timeout=timeout) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if loop.time() > deadline:
+                        raise TimeoutError(f"Ollama stream exceeded {total}s")
+                    if not line:
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except Exception:
+                        continue
+                    yield data
+
+    def stats(self) -> Dict[str, Any]:
+        return {"max_inflight": self.max_inflight, "inflight": self.inflight, "waiting": self.waiting}
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: Optional[OllamaClient] = None
+
+
+async def startup() -> None:
+    """Create the shared client; called from the app lifespan hook."""
+    global _client
+    if _client is None:
+        _client = OllamaClient(SETTINGS.ollama_base, SETTINGS.ollama_max_inflight)
+
+
+async def shutdown() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+def get_ollama() -> OllamaClient:
+    """Return the shared client, creating it lazily outside the app lifespan
+    (scripts, tests)."""
+    global _client
+    if _client is None:
+        _client = OllamaClient(SETTINGS.ollama_base, SETTINGS.ollama_max_inflight)
+    return _client
+
+
+def ollama_stats() -> Dict[str, Any]:
+    return _client.stats() if _client is not None else {"max_inflight": SETTINGS.ollama_max_inflight, "inflight": 0, "waiting": 0}
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..config import SETTINGS
+from .answer_cache import invalidate_tenant
+from .chunk import Chunker
+from .documents import cached_vectors, content_hash, current_version, record_version, save_vectors
+from .embed import embed_documents
+from .lexical import BM25Index, get_lexical_index
+from .storage import stream_pages
+from .vector import VectorStore, get_store, run_store_call
+
+# (stage, chunks_done, chunks_total)
+ProgressFn = Callable[[str, int, int], None]
+
+
+class IngestError(Exception):
+    """The document cannot be ingested; retrying will not help."""
+
+
+def _noop(stage: str, done: int, total: int) -> None:
+    return None
+
+
+Item = Tuple[str, List[float], Dict[str, Any]]
+
+
+def _open_stores(tenant_id: str) -> Tuple[VectorStore, BM25Index]:
+    # Opening a cold tenant replays its logs, so this runs on the store pool
+    return get_store(tenant_id), get_lexical_index(tenant_id)
+
+
+async def _write(tenant_id: str, items: List[Item]) -> None:
+    store, lexical = await run_store_call(tenant_id, _open_stores, tenant_id)
+    await store.aupsert(items)
+    await run_store_call(tenant_id, lexical.upsert, items)
+
+
+class UpsertBuffer:
+    """Collects chunks from several documents of one tenant and writes them
+    to the vector store and BM25 index in large batches.
+
+    Work that has to follow a document's writes (retiring its previous
+    version) is deferred until the batch holding its last chunks is written.
+    A failed write marks every document in the batch as failed instead of
+    raising into whichever document happened to trigger it.
+    """
+
+    def __init__(self, tenant_id: str, max_items: Optional[int] = None):
+        self.tenant_id = tenant_id
+        self.max_items = max(1, max_items or SETTINGS.bulk_upsert_batch)
+        self.failed: Dict[str, str] = {}  # doc_id -> error
+        self.writes = 0
+        self._items: List[Item] = []
+        self._after: List[Tuple[str, Callable[[], Awaitable[None]]]] = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, items: List[Item]) -> None:
+        self._items.extend(items)
+        if len(self._items) >= self.max_items:
+            await self.flush()
+
+    def defer(self, doc_id: str, fn: Callable[[], Awaitable[None]]) -> None:
+        self._after.append((doc_id, fn))
+
+    async def flush(self) -> None:
+        async with self._lock:
+            items, self._items = self._items, []
+            after, self._after = self._after, []
+            try:
+                if items:
+                    await _write(self.tenant_id, items)
+                    self.writes += 1
+            except Exception as exc:
+                for doc_id in {meta["doc_id"] for _, _, meta in items} | {doc_id for doc_id, _ in after}:
+                    self.failed[doc_id] = str(exc)
+                return
+            for doc_id, fn in after:
+                try:
+                    await fn()
+                except Exception as exc:
+                    self.failed[doc_id] = str(exc)
+
+
+async def ingest_file(
+    tenant_id: str,
+    doc_id: str,
+    path: Path,
+    customer_id: Optional[str] = None,
+    progress: Optional[ProgressFn] = None,
+    sink: Optional[UpsertBuffer] = None,
+) -> int:
+    """Extract, chunk, embed and upsert one saved document.
+
+    Pages stream in from the extraction pool, so chunking and embedding
+    start while later pages are still being parsed. Once the new version is
+    recorded, the file saved for the previous version is removed.
+    """
+    return await ingest_pages(
+        tenant_id, doc_id, stream_pages(path), path.name, str(path), customer_id, progress, sink, remove_previous_file=True
+    )
+
+
+async def ingest_pages(
+    tenant_id: str,
+    doc_id: str,
+    pages: AsyncIterator[Tuple[int, str]],
+    filename: str,
+    source: str,
+    customer_id: Optional[str] = None,
+    progress: Optional[ProgressFn] = None,
+    sink: Optional[UpsertBuffer] = None,
+    remove_previous_file: bool = False,
+) -> int:
+    """Chunk, embed and upsert (page, text) pairs as one document version.
+
+    ``filename`` is the label stored on each chunk and ``source`` (a file
+    path or URL) is recorded with the version. Chunks are embedded and
+    upserted a few batches at a time, so only that much of the document is
+    held in memory.
+
+    Chunk ids are ``{doc_id}-{content hash}``, and vectors are looked up by
+    content hash before embedding, so re-ingesting an edited document only
+    embeds the chunks that changed. Chunks of the previous version that are
+    not in the new one are deleted once the new version is written, as is
+    the previous version's saved file with ``remove_previous_file``. With a
+    ``sink``, writes and that cleanup go through the shared buffer, so a
+    failed batch write leaves the previous version intact.
+    """
+    report = progress or _noop
+    model = SETTINGS.embed_model
+    # Embed a few batches at once so progress moves during long documents
+    step = max(1, SETTINGS.embed_ingest_batch_items * SETTINGS.embed_ingest_concurrency)
+    pending: List[Tuple[int, str, str]] = []  # (page, chunk, content hash)
+    chunk_ids: Dict[str, None] = {}  # ordered set of this version's ids
+    chunked = 0
+    written = 0
+
+    async def flush() -> None:
+        nonlocal written
+        report("embed", written, chunked)
+        vectors = await asyncio.to_thread(cached_vectors, tenant_id, model, [digest for _, _, digest in pending])
+        missing = [(digest, chunk) for _, chunk, digest in pending if digest not in vectors]
+        if missing:
+            fresh = await embed_documents([chunk for _, chunk in missing])
+            new_vectors = {digest: vec for (digest, _), vec in zip(missing, fresh, strict=True)}
+            await asyncio.to_thread(save_vectors, tenant_id, model, new_vectors)
+            vectors.update(new_vectors)
+        items: List[Item] = []
+        for page, chunk, digest in pending:
+            items.append(
+                (
+                    f"{doc_id}-{digest[:16]}",
+                    vectors[digest],
+                    {
+                        "doc_id": doc_id,
+                        "filename": filename,
+                        "page": page,
+                        "text": chunk,
+                        "content_hash": digest,
+                        **({"customer_id": customer_id} if customer_id else {}),
+                    },
+                )
+            )
+        report("upsert", written, chunked)
+        if sink is not None:
+            await sink.add(items)
+        else:
+            await _write(tenant_id, items)
+        written += len(items)
+        pending.clear()
+
+    def add(page_chunks: Iterable[Tuple[int, str]]) -> None:
+        nonlocal chunked
+        for page, chunk in page_chunks:
+            digest = content_hash(chunk)
+            chunk_id = f"{doc_id}-{digest[:16]}"
+            if chunk_id in chunk_ids:  # repeated boilerplate within the document
+                continue
+            chunk_ids[chunk_id] = None
+            pending.append((page, chunk, digest))
+            chunked += 1
+
+    chunker = Chunker()
+    report("extract", 0, 0)
+    async for page, text in pages:
+        add(chunker.feed(page, text))
+        if len(pending) >= step:
+            await flush()
+    add(chunker.finish())
+    if pending:
+        await flush()
+    if not written:
+        raise IngestError("Empty or unreadable document")
+
+    async def replace_previous() -> None:
+        previous = await asyncio.to_thread(current_version, tenant_id, doc_id)
+        stale = [cid for cid in (previous or {}).get("chunk_ids", []) if cid not in chunk_ids]
+        if stale:
+            store, lexical = await run_store_call(tenant_id, _open_stores, tenant_id)
+            await store.adelete(stale)
+            await run_store_call(tenant_id, lexical.delete, stale)
+        await asyncio.to_thread(record_version, tenant_id, doc_id, source, list(chunk_ids), customer_id)
+        if remove_previous_file and previous and previous["path"] != source:
+            Path(previous["path"]).unlink(missing_ok=True)
+        # Cached answers may be stale once new documents are searchable
+        invalidate_tenant(tenant_id)
+
+    if sink is not None:
+        sink.defer(doc_id, replace_previous)
+    else:
+        await replace_previous()
+    return written
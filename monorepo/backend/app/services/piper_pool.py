@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config import SETTINGS
+from .piper_worker import read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+# Workers run from the backend root so "-m app.services.piper_worker" resolves
+_BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+
+class TTSBusy(Exception):
+    """Too many synthesis requests already waiting for this voice."""
+
+
+class WorkerError(Exception):
+    """A worker died, hung or sent a malformed reply."""
+
+
+class PiperProcess:
+    """One worker process with its voice model loaded (see piper_worker).
+
+    Not thread-safe: the pool hands each process to one caller at a time.
+    """
+
+    def __init__(self, command: List[str], timeout: float):
+        self.command = command
+        self.timeout = timeout
+        self.proc: Optional[subprocess.Popen] = None
+        self.started = 0.0
+
+    def start(self) -> None:
+        self.proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=_BACKEND_ROOT)
+        self.started = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def close(self) -> None:
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except Exception:
+            proc.kill()
+            proc.wait()
+
+    def request(self, payload: Dict[str, Any]) -> Iterator[bytes]:
+        """Send one request; yields the reply header, then PCM frames.
+
+        A reply that does not finish within ``timeout`` kills the process,
+        which surfaces here as WorkerError like any other crash.
+        """
+        if not self.alive:
+            raise WorkerError("worker not running")
+        proc = self.proc
+        watchdog = threading.Timer(self.timeout, proc.kill)
+        watchdog.start()
+        try:
+            try:
+                write_frame(proc.stdin, json.dumps(payload).encode("utf-8"))
+                proc.stdin.flush()
+            except (BrokenPipeError, OSError) as exc:
+                raise WorkerError(f"worker stdin closed: {exc}")
+            while True:
+                frame = read_frame(proc.stdout)
+                if frame is None:
+                    raise WorkerError(f"worker exited (code {proc.poll()})")
+                if not frame:
+                    return
+                yield frame
+        finally:
+            watchdog.cancel()
+
+    def synthesize(self, text: str) -> tuple[int, bytes]:
+        """(sample rate, 16-bit mono PCM) for ``text``."""
+        frames = self.request({"text": text})
+        try:
+            header = json.loads(next(frames))
+            pcm = b"".join(frames)
+            ok = bool(header.get("ok"))
+            sample_rate = int(header["sample_rate"]) if ok else 0
+        except WorkerError:
+            raise
+        except Exception as exc:
+            # Frames of this reply may still be in the pipe; only a restart resyncs
+            frames.close()
+            raise WorkerError(f"malformed reply: {exc!r}") from exc
+        if not ok:
+            raise RuntimeError(header.get("error") or "synthesis failed")
+        return sample_rate, pcm
+
+    def ping(self) -> bool:
+        try:
+            return all(json.loads(frame).get("ok") for frame in self.request({"ping": True}))
+        except (WorkerError, ValueError):
+            return False
+
+
+class VoicePool:
+    """``size`` worker processes for one voice.
+
+    Callers wait for an idle worker; once ``max_queue`` callers are already
+    waiting, new requests fail fast with TTSBusy. A worker that crashes or
+    hangs is replaced and the request retried once on the new process.
+    """
+
+    def __init__(self, voice: str, command: List[str], size: int, max_queue: int, timeout: float):
+        self.voice = voice
+        self.command = command
+        self.timeout = timeout
+        self.max_queue = int(max_queue)
+        self._workers = [PiperProcess(command, timeout) for _ in range(max(1, int(size)))]
+        self._idle: "queue.Queue[PiperProcess]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.requests = 0
+        self.restarts = 0
+        self.rejected = 0
+        self.failures = 0
+        self.synth_seconds = 0.0
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def _restart(self, worker: PiperProcess) -> None:
+        worker.close()
+        worker.start()
+        with self._lock:
+            self.restarts += 1
+        logger.warning("piper worker restarted", extra={"extra": {"voice": self.voice}})
+
+    def _acquire(self) -> PiperProcess:
+        with self._lock:
+            if self._waiting >= self.max_queue and self._idle.empty():
+                self.rejected += 1
+                raise TTSBusy(f"{self._waiting} synthesis requests already waiting for {self.voice}")
+            self._waiting += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TTSBusy(f"no {self.voice} worker became free in {self.timeout:.0f}s")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def synthesize(self, text: str) -> tuple[int, bytes]:
+        worker = self._acquire()
+        start = time.perf_counter()
+        try:
+            try:
+                result = worker.synthesize(text)
+            except WorkerError:
+                self._restart(worker)
+                result = worker.synthesize(text)
+        except WorkerError:
+            with self._lock:
+                self.failures += 1
+            self._restart(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+        with self._lock:
+            self.requests += 1
+            self.synth_seconds += time.perf_counter() - start
+        return result
+
+    def check(self) -> None:
+        """Ping the idle workers and replace any that do not answer."""
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if not worker.ping():
+                    self._restart(worker)
+            finally:
+                self._idle.put(worker)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": len(self._workers),
+                "idle": self._idle.qsize(),
+                "waiting": self._waiting,
+                "requests": self.requests,
+                "restarts": self.restarts,
+                "rejected": self.rejected,
+                "failures": self.failures,
+                "synth_ms_avg": round(1000 * self.synth_seconds / self.requests, 1) if self.requests else 0.0,
+            }
+
+
+def voice_command(voice: str) -> Optional[List[str]]:
+    """Worker command line for ``voice``, or None when it is not installed.
+
+    PIPER_WORKER_CMD overrides the default (this backend's piper_worker
+    with PIPER_VOICES_DIR/<voice>.onnx); ``{voice}`` and ``{model}`` in it
+    are substituted.
+    """
+    model = Path(SETTINGS.piper_voices_dir) / f"{voice}.onnx" if SETTINGS.piper_voices_dir else None
+    if SETTINGS.piper_worker_cmd:
+        return shlex.split(SETTINGS.piper_worker_cmd.format(voice=voice, model=model or ""))
+    if model is None or not model.exists():
+        return None
+    return [sys.executable, "-m", "app.services.piper_worker", "--model", str(model)]
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(pcm)
+    return buf.getvalue()
+
+
+_POOLS: Dict[str, VoicePool] = {}
+_POOLS_LOCK = threading.Lock()
+_health: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _health_loop() -> None:
+    while not _stop.wait(SETTINGS.piper_health_seconds):
+        for pool in list(_POOLS.values()):
+            try:
+                pool.check()
+            except Exception as exc:
+                logger.warning("piper health check failed", extra={"extra": {"voice": pool.voice, "error": str(exc)}})
+
+
+def get_pool(voice: str) -> Optional[VoicePool]:
+    """The voice's pool, started on first use; None if the voice is not installed."""
+    global _health
+    pool = _POOLS.get(voice)
+    if pool is not None:
+        return pool
+    command = voice_command(voice)
+    if command is None:
+        return None
+    with _POOLS_LOCK:
+        pool = _POOLS.get(voice)
+        if pool is None:
+            pool = VoicePool(
+                voice,
+                command,
+                size=SETTINGS.piper_workers,
+                max_queue=SETTINGS.piper_max_queue,
+                timeout=SETTINGS.piper_timeout_seconds,
+            )
+            _POOLS[voice] = pool
+        if _health is None and SETTINGS.piper_health_seconds > 0:
+            _stop.clear()
+            _health = threading.Thread(target=_health_loop, name="piper-health", daemon=True)
+            _health.start()
+    return pool
+
+
+def synthesize_pcm(text: str, voice: str) -> Optional[tuple[int, bytes]]:
+    """(sample rate, 16-bit mono PCM) for ``text`` from the voice's worker
+    pool, or None if the voice is not installed."""
+    pool = get_pool(voice)
+    if pool is None:
+        return None
+    return pool.synthesize(text)
+
+
+def synthesize_wav(text: str, voice: str) -> Optional[bytes]:
+    """WAV audio for ``text`` from the voice's worker pool, or None if the voice is not installed."""
+    result = synthesize_pcm(text, voice)
+    return pcm_to_wav(result[1], result[0]) if result is not None else None
+
+
+def shutdown() -> None:
+    global _health
+    _stop.set()
+    if _health is not None:
+        _health.join(timeout=5)
+        _health = None
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
+
+
+def piper_stats() -> Dict[str, Any]:
+    return {voice: pool.stats() for voice, pool in list(_POOLS.items())}
@@ -0,0 +1,90 @@
+"""Long-lived Piper synthesis worker, driven over stdin/stdout.
+
+The voice model is loaded once at start; requests and replies are
+length-prefixed frames (4-byte big-endian length, then payload):
+
+- request: one frame of JSON, ``{"text": "..."}`` or ``{"ping": true}``
+- reply: one frame of JSON header (``{"ok": true, "sample_rate": 22050}``
+  or ``{"ok": false, "error": "..."}``), then zero or more frames of raw
+  16-bit mono PCM, then an empty frame
+
+Usage: python -m app.services.piper_worker --model voices/en_US-amy-medium.onnx
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import struct
+import sys
+from typing import BinaryIO, Callable, Iterable, Optional, Tuple
+
+_LENGTH = struct.Struct(">I")
+
+# text -> (sample rate, PCM chunks)
+Synthesizer = Callable[[str], Tuple[int, Iterable[bytes]]]
+
+
+def write_frame(stream: BinaryIO, payload: bytes) -> None:
+    stream.write(_LENGTH.pack(len(payload)))
+    stream.write(payload)
+
+
+def read_frame(stream: BinaryIO) -> Optional[bytes]:
+    """Next frame's payload, or None at end of stream."""
+    head = stream.read(_LENGTH.size)
+    if len(head) < _LENGTH.size:
+        return None
+    (size,) = _LENGTH.unpack(head)
+    payload = stream.read(size)
+    if len(payload) < size:
+        return None
+    return payload
+
+
+def serve(synthesize: Synthesizer, stdin: BinaryIO, stdout: BinaryIO) -> None:
+    """Answer requests until stdin closes."""
+    while (frame := read_frame(stdin)) is not None:
+        request = json.loads(frame)
+        if request.get("ping"):
+            write_frame(stdout, json.dumps({"ok": True}).encode())
+        else:
+            try:
+                sample_rate, chunks = synthesize(str(request.get("text", "")))
+                chunks = iter(chunks)
+            except Exception as exc:
+                write_frame(stdout, json.dumps({"ok": False, "error": str(exc)}).encode())
+            else:
+                write_frame(stdout, json.dumps({"ok": True, "sample_rate": sample_rate}).encode())
+                # A failure mid-stream kills the worker; the pool sees the
+                # truncated reply and restarts it
+                for chunk in chunks:
+                    if chunk:
+                        write_frame(stdout, chunk)
+                        stdout.flush()
+        write_frame(stdout, b"")
+        stdout.flush()
+
+
+def _piper_synthesizer(model: str) -> Synthesizer:
+    from piper import PiperVoice  # type: ignore
+
+    voice = PiperVoice.load(model)
+    sample_rate = int(voice.config.sample_rate)
+
+    def synthesize(text: str) -> Tuple[int, Iterable[bytes]]:
+        if hasattr(voice, "synthesize_stream_raw"):
+            return sample_rate, voice.synthesize_stream_raw(text)
+        return sample_rate, (chunk.audio_int16_bytes for chunk in voice.synthesize(text))
+
+    return synthesize
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True, help="Piper .onnx voice model (with its .onnx.json next to it)")
+    args = parser.parse_args()
+    serve(_piper_synthesizer(args.model), sys.stdin.buffer, sys.stdout.buffer)
+
+
+if __name__ == "__main__":
+    main()
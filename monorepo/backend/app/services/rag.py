@@ -1,77 +1,215 @@
 from __future__ import annotations
 
+import asyncio
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple, Set
 
+import numpy as np
+
 from ..config import SETTINGS
-from .embed import embed_texts
-from .vector import ChromaStore, VectorStore
+from .chunk import estimate_tokens
+from .embed import embed_query
+from .lexical import get_lexical_index, reciprocal_rank_fusion
+from .vector import get_store, run_store_call
 
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
 
-def _get_store(tenant_id: str) -> VectorStore:
-    if SETTINGS.store == "chroma":
-        return ChromaStore(SETTINGS.chroma_dir, tenant_id)
-    # Future: Pinecone adapter
-    return ChromaStore(SETTINGS.chroma_dir, tenant_id)
 
+def _vector_search(
+    tenant_id: str, vector: List[float], top_k: int, where: Optional[Dict[str, Any]], with_vectors: bool
+) -> List[Dict]:
+    # On the store pool: a cold tenant's store is opened (rows replayed) here, not on the loop
+    return get_store(tenant_id).query(vector, top_k=top_k, where=where, with_vectors=with_vectors)
 
-async def retrieve(tenant_id: str, question: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict]:
-    [qvec] = await embed_texts([question])
-    store = _get_store(tenant_id)
-    hits = store.query(qvec, top_k=top_k, where=where)
-    return hits
 
+def _lexical_search(tenant_id: str, question: str, top_k: int, where: Optional[Dict[str, Any]]) -> List[Dict]:
+    # On the store pool: a cold tenant's index is opened (its log replayed) here too
+    return get_lexical_index(tenant_id).search(question, top_k=top_k, where=where)
 
-def build_prompt(
+
+async def retrieve(
+    tenant_id: str,
+    question: str,
+    top_k: int = 5,
+    where: Optional[Dict[str, Any]] = None,
+    mode: Optional[str] = None,
+    with_vectors: bool = False,
+) -> List[Dict]:
+    """Top-k hits for a question.
+
+    mode "vector" queries the embedding store, "lexical" the tenant's BM25
+    index, and "hybrid" fuses both lists with reciprocal rank fusion (the
+    hit "score" is then the fused score, higher is better). With
+    ``with_vectors``, store hits carry their "embedding" for pack_prompt.
+    """
+    mode = mode or SETTINGS.retrieval_mode
+    if mode == "lexical":
+        return await run_store_call(tenant_id, _lexical_search, tenant_id, question, top_k, where)
+    qvec = await embed_query(question)
+    if mode != "hybrid":
+        return await run_store_call(tenant_id, _vector_search, tenant_id, qvec, top_k, where, with_vectors)
+    depth = max(top_k * 2, 10)
+    vector_hits, lexical_hits = await asyncio.gather(
+        run_store_call(tenant_id, _vector_search, tenant_id, qvec, depth, where, with_vectors),
+        run_store_call(tenant_id, _lexical_search, tenant_id, question, depth, where),
+    )
+    return reciprocal_rank_fusion([vector_hits, lexical_hits], top_k=top_k)
+
+
+# Context windows of common Ollama chat models, in tokens
+_CHAT_MODEL_CONTEXT = {
+    "llama3": 8192,
+    "llama3.1": 131072,
+    "llama3.2": 131072,
+    "mistral": 32768,
+    "phi3": 4096,
+    "gemma2": 8192,
+    "qwen2.5": 32768,
+}
+_NEAR_DUPLICATE = 0.95  # cosine similarity at which a candidate only repeats a packed one
+_MIN_SNIPPET_TOKENS = 64  # smallest truncated snippet worth adding
+
+_STATS = {"prompts": 0, "candidates": 0, "snippets": 0, "tokens": 0}
+
+
+def context_budget(model: Optional[str] = None) -> int:
+    """Tokens of retrieved context per prompt: CONTEXT_MAX_TOKENS, capped to
+    half the chat model's window so instructions and the answer still fit."""
+    name = (model or SETTINGS.ollama_model).split(":", 1)[0]
+    limit = _CHAT_MODEL_CONTEXT.get(name)
+    return min(SETTINGS.context_max_tokens, limit // 2) if limit else SETTINGS.context_max_tokens
+
+
+def _norm_text(s: str) -> str:
+    s = s.replace("\r", "")
+    # collapse excessive newlines/spaces while keeping paragraphs
+    lines = [ln.strip() for ln in s.split("\n")]
+    return "\n".join([ln for ln in lines if ln])
+
+
+def _truncate(text: str, tokens: int) -> str:
+    cut = text[: max(0, tokens) * 4]
+    return cut if len(cut) == len(text) else cut.rsplit(" ", 1)[0]
+
+
+def select_diverse(
+    hits: List[Dict],
+    query_vector: Optional[List[float]] = None,
+    *,
+    k: int,
+    lambda_: Optional[float] = None,
+) -> List[int]:
+    """Indices of up to ``k`` hits in maximal-marginal-relevance order.
+
+    Each step picks the hit maximizing ``lambda * relevance - (1 - lambda) *
+    max similarity to the hits already picked``, using the "embedding" the
+    store returned with each hit; hits within _NEAR_DUPLICATE of a picked
+    one are dropped. Relevance is cosine similarity to ``query_vector``
+    when every hit has a vector, otherwise the retrieval rank. Hits without
+    a vector count as dissimilar to everything.
+    """
+    n = len(hits)
+    if not n or k <= 0:
+        return []
+    lam = SETTINGS.context_mmr_lambda if lambda_ is None else lambda_
+    vectors = [h.get("embedding") for h in hits]
+    dim = next((len(v) for v in vectors if v is not None), 0)
+    emb = np.zeros((n, max(dim, 1)), dtype=np.float32)
+    for i, vec in enumerate(vectors):
+        if vec is not None and len(vec) == dim:
+            emb[i] = vec
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    emb /= norms
+    similarity = emb @ emb.T
+    if query_vector is not None and dim and len(query_vector) == dim and all(v is not None for v in vectors):
+        query = np.asarray(query_vector, dtype=np.float32)
+        relevance = emb @ (query / (np.linalg.norm(query) or 1.0))
+    else:
+        relevance = 1.0 - np.arange(n, dtype=np.float32) / n
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+    picked: List[int] = []
+    while len(picked) < k and available.any():
+        scores = np.where(available, lam * relevance - (1.0 - lam) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        available &= similarity[best] < _NEAR_DUPLICATE
+    return picked
+
+
+@dataclass
+class PackedPrompt:
+    messages: List[Dict]
+    hits: List[Dict]  # one per citation marker, in order
+    tokens: int  # estimated tokens of the packed context
+    candidates: int
+
+
+def pack_prompt(
     question: str,
     hits: List[Dict],
     *,
+    query_vector: Optional[List[float]] = None,
     max_snippets: int = 8,
-    max_chars: int = 4000,
-) -> List[Dict]:
+    max_tokens: Optional[int] = None,
+) -> PackedPrompt:
     """Build an instruction + context prompt for the LLM.
 
-    - Deduplicates snippets by (doc_id, page) or (filename, page)
-    - Caps total context length and number of snippets to keep prompts lean
+    - Orders candidates for diversity (select_diverse) and skips exact repeats
+    - Packs snippets until ``max_tokens`` (default context_budget()) of
+      context or ``max_snippets`` sources; chunks from an already cited
+      (doc_id, page) join that snippet instead of taking a new marker
     - Adds simple numeric citation markers [1], [2], ... to encourage grounded answers
     """
-    def _norm_text(s: str) -> str:
-        s = s.replace("\r", "")
-        # collapse excessive newlines/spaces while keeping paragraphs
-        lines = [ln.strip() for ln in s.split("\n")]
-        return "\n".join([ln for ln in lines if ln])
-
-    seen: Set[Tuple[Any, Any]] = set()
-    context_lines: List[str] = []
-    total_len = 0
-    cite_idx = 1
+    budget = context_budget() if max_tokens is None else max_tokens
+    candidates: List[Tuple[Dict, str]] = []
+    seen_text: Set[str] = set()
     for h in hits:
-        if len(context_lines) >= max_snippets or total_len >= max_chars:
-            break
         meta = h.get("metadata", {}) or {}
+        text = _norm_text(str(meta.get("text", "")))
+        key = meta.get("content_hash") or text
+        if text and key not in seen_text:
+            seen_text.add(key)
+            candidates.append((h, text))
+
+    sources: Dict[Tuple[Any, Any], int] = {}
+    snippets: List[List[str]] = []  # header, then body parts
+    packed: List[Dict] = []
+    tokens = 0
+    for i in select_diverse([h for h, _ in candidates], query_vector, k=len(candidates)):
+        hit, text = candidates[i]
+        meta = hit.get("metadata", {}) or {}
         filename = meta.get("filename") or meta.get("doc_id") or "doc"
         page = meta.get("page", "?")
         key = (meta.get("doc_id") or filename, page)
-        if key in seen:
-            continue
-        seen.add(key)
-        text = _norm_text(str(meta.get("text", "")))
-        if not text:
+        slot = sources.get(key)
+        if slot is None and len(snippets) >= max_snippets:
             continue
-        snippet = f"[{cite_idx}] Source: {filename} p.{page}\n{text}"
-        # If adding this snippet would exceed max_chars too much, trim text
-        remaining = max_chars - total_len
-        if remaining <= 0:
-            break
-        if len(snippet) > remaining:
-            # keep header and truncate body
-            header = f"[{cite_idx}] Source: {filename} p.{page}\n"
-            body_budget = max(0, remaining - len(header))
-            snippet = header + text[:body_budget]
-        context_lines.append(snippet)
-        total_len += len(snippet) + 2  # include spacing
-        cite_idx += 1
-
-    context = "\n\n".join(context_lines) if context_lines else "(no context found)"
+        header = "" if slot is not None else f"[{len(snippets) + 1}] Source: {filename} p.{page}"
+        remaining = budget - tokens - estimate_tokens(header)
+        if estimate_tokens(text) > remaining:
+            # Trim to fit only when enough room is left to be useful (or nothing is packed yet)
+            if remaining < _MIN_SNIPPET_TOKENS and snippets:
+                continue
+            text = _truncate(text, remaining)
+            if not text:
+                break
+        if slot is None:
+            sources[key] = len(snippets)
+            snippets.append([header, text])
+            packed.append(hit)
+        else:
+            snippets[slot].append(text)
+        tokens += estimate_tokens(header) + estimate_tokens(text)
+
+    _STATS["prompts"] += 1
+    _STATS["candidates"] += len(hits)
+    _STATS["snippets"] += len(snippets)
+    _STATS["tokens"] += tokens
+    context = "\n\n".join("\n".join(parts) for parts in snippets) if snippets else "(no context found)"
     user_content = (
         "You are given CONTEXT snippets with citation markers like [1], [2]. "
         "Answer the QUESTION concisely and include citations by their markers when using information.\n\n"
@@ -81,4 +219,31 @@ def build_prompt(
         {"role": "system", "content": "Use the provided CONTEXT to answer. If unsure, say you don't know."},
         {"role": "user", "content": user_content},
     ]
-    return messages
+    return PackedPrompt(messages, packed, tokens, len(hits))
+
+
+def build_prompt(
+    question: str,
+    hits: List[Dict],
+    *,
+    max_snippets: int = 8,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    query_vector: Optional[List[float]] = None,
+) -> List[Dict]:
+    """Messages of pack_prompt; ``max_chars`` is still accepted and
+    converted to a token budget."""
+    if max_tokens is None and max_chars is not None:
+        max_tokens = max_chars // 4
+    return pack_prompt(question, hits, query_vector=query_vector, max_snippets=max_snippets, max_tokens=max_tokens).messages
+
+
+def context_stats() -> Dict[str, Any]:
+    prompts = _STATS["prompts"] or 1
+    return {
+        **_STATS,
+        "budget_tokens": context_budget(),
+        "avg_candidates": round(_STATS["candidates"] / prompts, 2),
+        "avg_snippets": round(_STATS["snippets"] / prompts, 2),
+        "avg_tokens": round(_STATS["tokens"] / prompts, 1),
+    }
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import fractions
+import time
+from typing import AsyncIterator, Optional
+
+import av
+import numpy as np
+from aiortc.mediastreams import MediaStreamError, MediaStreamTrack
+
+from .voice_agent import SAMPLE_RATE, RingBuffer
+
+_PTIME = 0.020  # seconds of audio per outbound frame, as aiortc's own tracks
+
+
+async def track_pcm(track: MediaStreamTrack, sample_rate: int = SAMPLE_RATE) -> AsyncIterator[np.ndarray]:
+    """Inbound audio of ``track`` as mono int16 arrays at ``sample_rate``,
+    until the track ends. Arrays are views of the resampled frames."""
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    while True:
+        try:
+            frame = await track.recv()
+        except MediaStreamError:
+            return
+        for out in resampler.resample(frame):
+            yield out.to_ndarray()[0]
+
+
+class PCMOutputTrack(MediaStreamTrack):
+    """Outbound audio track playing queued PCM in real time, silence when idle."""
+
+    kind = "audio"
+
+    def __init__(self, sample_rate: int = 48000, max_seconds: int = 120):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.samples_per_frame = int(sample_rate * _PTIME)
+        self._ring = RingBuffer(sample_rate * max_seconds)
+        self._played = 0  # absolute ring index of the next sample to send
+        self._start: Optional[float] = None
+        self._pts = 0
+        self._sent = 0  # samples of queued audio sent (not counting silence)
+
+    @property
+    def pending_seconds(self) -> float:
+        return (self._ring.written - self._played) / self.sample_rate
+
+    @property
+    def sent_seconds(self) -> float:
+        return self._sent / self.sample_rate
+
+    @property
+    def buffer_bytes(self) -> int:
+        return self._ring.nbytes
+
+    def enqueue(self, pcm: np.ndarray, sample_rate: int) -> None:
+        """Queue mono int16 audio at any rate for playback after what is already queued."""
+        if sample_rate == self.sample_rate:
+            self._ring.write(pcm)
+            return
+        frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(pcm, dtype=np.int16).reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=self.sample_rate)
+        for out in [*resampler.resample(frame), *resampler.resample(None)]:
+            self._ring.write(out.to_ndarray()[0])
+
+    def clear(self) -> None:
+        """Drop queued audio, e.g. when the caller talks over the answer."""
+        self._played = self._ring.written
+
+    async def recv(self) -> av.AudioFrame:
+        if self.readyState != "live":
+            raise MediaStreamError
+        if self._start is None:
+            self._start = time.monotonic()
+        else:
+            wait = self._start + self._pts / self.sample_rate - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        n = self.samples_per_frame
+        self._played = max(self._played, self._ring.written - self._ring.capacity)
+        data = np.zeros((1, n), dtype=np.int16)
+        chunk = self._ring.read(self._played, self._played + n)
+        data[0, : len(chunk)] = chunk
+        self._played += len(chunk)
+        self._sent += len(chunk)
+        frame = av.AudioFrame.from_ndarray(data, format="s16", layout="mono")
+        frame.sample_rate = self.sample_rate
+        frame.pts = self._pts
+        frame.time_base = fractions.Fraction(1, self.sample_rate)
+        self._pts += n
+        return frame
+
+
+class PCMSourceTrack(MediaStreamTrack):
+    """Inbound stand-in: plays recorded mono int16 PCM as 20 ms frames, then
+    ends. Not paced unless ``realtime``, so tests run faster than real time."""
+
+    kind = "audio"
+
+    def __init__(self, pcm: np.ndarray, sample_rate: int = 48000, realtime: bool = False):
+        super().__init__()
+        self.pcm = np.asarray(pcm, dtype=np.int16)
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self._pos = 0
+        self._start = time.monotonic()
+
+    async def recv(self) -> av.AudioFrame:
+        n = int(self.sample_rate * _PTIME)
+        if self.readyState != "live" or self._pos >= len(self.pcm):
+            self.stop()
+            raise MediaStreamError
+        if self.realtime:
+            wait = self._start + self._pos / self.sample_rate - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        else:
+            await asyncio.sleep(0)
+        data = np.zeros((1, n), dtype=np.int16)
+        chunk = self.pcm[self._pos : self._pos + n]
+        data[0, : len(chunk)] = chunk
+        frame = av.AudioFrame.from_ndarray(data, format="s16", layout="mono")
+        frame.sample_rate = self.sample_rate
+        frame.pts = self._pos
+        frame.time_base = fractions.Fraction(1, self.sample_rate)
+        self._pos += n
+        return frame
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..config import SETTINGS
+from .voice_agent import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimit(Exception):
+    """The process already holds its maximum number of RTC sessions."""
+
+
+@dataclass(eq=False)
+class RTCSession:
+    """One peer connection and everything hanging off it."""
+
+    tenant_id: str
+    pc: Any = None  # RTCPeerConnection
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    agent: Any = None  # VoiceAgent
+    output: Any = None  # outbound media track
+    tasks: List[asyncio.Task] = field(default_factory=list)
+    created: float = field(default_factory=time.monotonic)
+    last_activity: float = field(default_factory=time.monotonic)
+    samples_in: int = 0  # inbound audio at SAMPLE_RATE
+    messages_in: int = 0
+    closed: bool = False
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+
+    def usage(self, now: float) -> Dict[str, Any]:
+        buffers = 0
+        if self.agent is not None:
+            buffers += self.agent.ring.nbytes
+        if self.output is not None:
+            buffers += self.output.buffer_bytes
+        return {
+            "session_id": self.session_id,
+            "tenant_id": self.tenant_id,
+            "age_s": round(now - self.created, 1),
+            "idle_s": round(now - self.last_activity, 1),
+            "audio_in_s": round(self.samples_in / SAMPLE_RATE, 1),
+            "audio_out_s": round(self.output.sent_seconds, 1) if self.output is not None else 0.0,
+            "messages_in": self.messages_in,
+            "turns": len(self.agent.turns) if self.agent is not None else 0,
+            "tasks": sum(1 for t in self.tasks if not t.done()),
+            "buffer_bytes": buffers,
+        }
+
+
+class RTCSessionManager:
+    """Live RTC sessions of this process.
+
+    At most ``max_sessions`` at once (``open`` raises SessionLimit beyond
+    that). Sessions with no inbound media or data for ``idle_seconds`` are
+    closed by a background reaper, which catches peers that went away
+    without a connection state change.
+    """
+
+    def __init__(self, max_sessions: int, idle_seconds: float, reap_interval: float):
+        self.max_sessions = int(max_sessions)
+        self.idle_seconds = float(idle_seconds)
+        self.reap_interval = float(reap_interval)
+        self._sessions: Dict[str, RTCSession] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self.created = 0
+        self.rejected = 0
+        self.reaped = 0
+        self.closed = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def open(self, tenant_id: str) -> RTCSession:
+        if len(self._sessions) >= self.max_sessions:
+            self.rejected += 1
+            raise SessionLimit(f"{len(self._sessions)} RTC sessions already open")
+        session = RTCSession(tenant_id)
+        self._sessions[session.session_id] = session
+        self.created += 1
+        return session
+
+    async def close(self, session: RTCSession, reason: str = "closed") -> None:
+        """Tear a session down; safe to call more than once."""
+        if session.closed:
+            return
+        session.closed = True
+        self._sessions.pop(session.session_id, None)
+        self.closed += 1
+        if session.agent is not None:
+            await session.agent.close()
+        for task in session.tasks:
+            task.cancel()
+        await asyncio.gather(*session.tasks, return_exceptions=True)
+        if session.output is not None:
+            session.output.stop()
+        try:
+            if session.pc is not None:
+                await session.pc.close()
+        except Exception as exc:
+            logger.warning("rtc close failed", extra={"extra": {"session_id": session.session_id, "error": str(exc)}})
+        logger.info("rtc session closed", extra={"extra": {"session_id": session.session_id, "reason": reason}})
+
+    async def reap(self) -> int:
+        now = time.monotonic()
+        idle = [s for s in self._sessions.values() if now - s.last_activity > self.idle_seconds]
+        for session in idle:
+            await self.close(session, reason="idle")
+        self.reaped += len(idle)
+        return len(idle)
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as exc:
+                logger.warning("rtc reaper failed", extra={"extra": {"error": str(exc)}})
+
+    def start(self) -> None:
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop(), name="rtc-reaper")
+
+    async def shutdown(self) -> None:
+        reaper, self._reaper = self._reaper, None
+        if reaper is not None:
+            reaper.cancel()
+            await asyncio.gather(reaper, return_exceptions=True)
+        for session in list(self._sessions.values()):
+            await self.close(session, reason="shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "sessions": len(self._sessions),
+            "capacity": self.max_sessions,
+            "created": self.created,
+            "rejected": self.rejected,
+            "reaped": self.reaped,
+            "closed": self.closed,
+            "active": [s.usage(now) for s in self._sessions.values()],
+        }
+
+
+_SESSIONS = RTCSessionManager(
+    max_sessions=SETTINGS.rtc_max_sessions,
+    idle_seconds=SETTINGS.rtc_idle_seconds,
+    reap_interval=SETTINGS.rtc_reap_interval_seconds,
+)
+
+
+def get_rtc_sessions() -> RTCSessionManager:
+    return _SESSIONS
+
+
+async def startup() -> None:
+    """Start the idle reaper; called from the app lifespan hook."""
+    _SESSIONS.start()
+
+
+async def shutdown() -> None:
+    await _SESSIONS.shutdown()
+
+
+def rtc_stats() -> Dict[str, Any]:
+    return _SESSIONS.stats()
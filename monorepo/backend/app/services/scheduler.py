@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..config import SETTINGS
+
+# Lower runs first: a caller on the phone cannot wait behind a web chat,
+# and a web chat should not wait behind batch work
+PRIORITIES = {"voice": 0, "web": 1, "batch": 2}
+
+
+class QueueFull(Exception):
+    """Admission refused. ``status`` is 429 when the tenant's own queue is
+    full and 503 when the server is saturated; ``retry_after`` in seconds."""
+
+    def __init__(self, status: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+@dataclass(eq=False)
+class _Waiter:
+    tenant_id: str
+    priority: int
+    future: "asyncio.Future[None]"
+    enqueued: float
+    cancelled: bool = False
+
+
+@dataclass
+class _TenantStats:
+    queued: int = 0
+    running: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def as_dict(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(1000 * self.wait_total / self.admitted, 1) if self.admitted else 0.0,
+            "wait_ms_p95": round(1000 * p95, 1),
+            "wait_ms_max": round(1000 * self.wait_max, 1),
+        }
+
+
+class Ticket:
+    """A granted generation slot; release it when the call is done (also on
+    error or disconnect). Releasing twice is harmless."""
+
+    def __init__(self, scheduler: "LLMScheduler", tenant_id: str):
+        self._scheduler = scheduler
+        self.tenant_id = tenant_id
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._scheduler._release(self.tenant_id, time.monotonic() - self._started)
+
+    async def __aenter__(self) -> "Ticket":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.release()
+
+
+class LLMScheduler:
+    """Admission control in front of the chat model.
+
+    At most ``max_concurrent`` generations run at once. Waiting requests
+    are served strictly by priority class, and within a class by weighted
+    fair queuing across tenants: each request gets a virtual finish tag
+    ``max(class clock, tenant's last tag) + 1 / weight`` and the smallest
+    tag goes next, so a tenant with a burst queued cannot starve one that
+    sends an occasional request. Requests are refused rather than queued
+    once ``max_queue`` requests of the same or higher priority are waiting
+    (503), or the tenant already has ``max_tenant_queue`` waiting (429).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        max_tenant_queue: int,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = int(max_queue)
+        self.max_tenant_queue = int(max_tenant_queue)
+        self.weights = dict(weights or {})
+        self.running = 0
+        self._heaps: List[List[Tuple[float, int, _Waiter]]] = [[] for _ in PRIORITIES]
+        self._queued = [0 for _ in PRIORITIES]
+        self._clock = [0.0 for _ in PRIORITIES]
+        self._last_tag: Dict[Tuple[int, str], float] = {}
+        self._seq = itertools.count()
+        self._tenants: Dict[str, _TenantStats] = {}
+        self._service = 2.0  # EWMA of seconds per generation, for Retry-After
+
+    def _stats(self, tenant_id: str) -> _TenantStats:
+        stats = self._tenants.get(tenant_id)
+        if stats is None:
+            stats = self._tenants[tenant_id] = _TenantStats()
+        return stats
+
+    def _retry_after(self, ahead: int) -> int:
+        return max(1, min(60, math.ceil((ahead + 1) * self._service / self.max_concurrent)))
+
+    def _admitted(self, stats: _TenantStats, waited: float) -> None:
+        self.running += 1
+        stats.running += 1
+        stats.admitted += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        stats.recent.append(waited)
+
+    async def admit(self, tenant_id: str, priority: str = "web") -> Ticket:
+        """Wait for a slot; raises QueueFull instead of queueing past the limits."""
+        level = PRIORITIES[priority]
+        stats = self._stats(tenant_id)
+        if self.running < self.max_concurrent and not any(self._queued):
+            self._admitted(stats, 0.0)
+            return Ticket(self, tenant_id)
+        ahead = sum(self._queued[: level + 1])
+        if ahead >= self.max_queue:
+            stats.rejected += 1
+            raise QueueFull(503, self._retry_after(ahead), "Server busy, try again shortly")
+        if stats.queued >= self.max_tenant_queue:
+            stats.rejected += 1
+            raise QueueFull(429, self._retry_after(stats.queued), "Too many queued requests for this site")
+
+        weight = max(self.weights.get(tenant_id, 1.0), 1e-3)
+        tag = max(self._clock[level], self._last_tag.get((level, tenant_id), 0.0)) + 1.0 / weight
+        self._last_tag[(level, tenant_id)] = tag
+        waiter = _Waiter(tenant_id, level, asyncio.get_running_loop().create_future(), time.monotonic())
+        heapq.heappush(self._heaps[level], (tag, next(self._seq), waiter))
+        self._queued[level] += 1
+        stats.queued += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller went away: hand the slot on
+                self._release(tenant_id, 0.0)
+            elif not waiter.cancelled:
+                waiter.cancelled = True
+                self._queued[level] -= 1
+                stats.queued -= 1
+            raise
+        return Ticket(self, tenant_id)
+
+    def _dispatch(self) -> None:
+        for level, heap in enumerate(self._heaps):
+            while heap and self.running < self.max_concurrent:
+                tag, _, waiter = heapq.heappop(heap)
+                if waiter.cancelled:
+                    continue
+                self._clock[level] = tag
+                self._queued[level] -= 1
+                stats = self._stats(waiter.tenant_id)
+                stats.queued -= 1
+                self._admitted(stats, time.monotonic() - waiter.enqueued)
+                waiter.future.set_result(None)
+            if not heap:
+                # An idle class starts over, so old tags do not penalize new arrivals
+                self._clock[level] = 0.0
+                for key in [k for k in self._last_tag if k[0] == level]:
+                    del self._last_tag[key]
+
+    def _release(self, tenant_id: str, seconds: float) -> None:
+        self.running -= 1
+        self._stats(tenant_id).running -= 1
+        if seconds > 0:
+            self._service = 0.8 * self._service + 0.2 * seconds
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queued": {name: self._queued[level] for name, level in PRIORITIES.items()},
+            "service_seconds": round(self._service, 3),
+            "tenants": {tenant_id: s.as_dict() for tenant_id, s in self._tenants.items()},
+        }
+
+
+_SCHEDULER = LLMScheduler(
+    max_concurrent=SETTINGS.llm_max_concurrent,
+    max_queue=SETTINGS.llm_max_queue,
+    max_tenant_queue=SETTINGS.llm_tenant_max_queue,
+    weights=SETTINGS.llm_tenant_weights,
+)
+
+
+async def admit(tenant_id: str, priority: str = "web") -> Ticket:
+    return await _SCHEDULER.admit(tenant_id, priority)
+
+
+def scheduler_stats() -> Dict[str, Any]:
+    return _SCHEDULER.stats()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import secrets
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import SETTINGS
+
+
+@dataclass
+class ChatSession:
+    session_id: str
+    tenant_id: str
+    customer_id: Optional[str]
+    history: List[Dict[str, str]] = field(default_factory=list)  # {"role", "content"}, questions and answers only
+    # Ollama's token context after the last turn; the next turn sends it
+    # back so the server only prefills the new prompt
+    context: Optional[array] = None
+    turns: int = 0
+    last_used: float = 0.0
+
+    def context_tokens(self) -> int:
+        return len(self.context) if self.context is not None else 0
+
+
+class SessionStore:
+    """Server-side conversation state for /chat and /chat/stream.
+
+    Bounded to ``max_sessions`` (least recently used dropped first);
+    sessions idle longer than ``idle_seconds`` are evicted on access. Ids
+    are generated here, never taken from the client: a missing, unknown or
+    expired id starts a new session under a fresh id, and an id is only
+    reused by the tenant and customer that created it.
+    """
+
+    def __init__(self, max_sessions: int, idle_seconds: float, max_turns: int):
+        self.max_sessions = int(max_sessions)
+        self.idle_seconds = float(idle_seconds)
+        self.max_turns = int(max_turns)
+        self._sessions: "OrderedDict[Tuple[str, str, str], ChatSession]" = OrderedDict()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self.context_resets = 0
+
+    def _evict_idle(self, now: float) -> None:
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.idle_seconds:
+                break
+            del self._sessions[key]
+            self.evicted += 1
+
+    def open(self, tenant_id: str, customer_id: Optional[str], session_id: Optional[str]) -> ChatSession:
+        now = time.monotonic()
+        self._evict_idle(now)
+        session = self._sessions.get((tenant_id, customer_id or "", session_id or ""))
+        if session is None:
+            session = ChatSession(secrets.token_urlsafe(16), tenant_id, customer_id)
+            self._sessions[(tenant_id, customer_id or "", session.session_id)] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._sessions.move_to_end((tenant_id, customer_id or "", session.session_id))
+            self.reused += 1
+        session.last_used = now
+        return session
+
+    def finish_turn(
+        self, session: ChatSession, turn: int, question: str, answer: str, context: Optional[List[int]]
+    ) -> None:
+        """Record a completed turn. ``turn`` is the session's turn count when
+        the turn started; if another turn finished meanwhile, the returned
+        context no longer follows the history and is dropped."""
+        session.history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+        del session.history[: max(0, len(session.history) - 2 * self.max_turns)]
+        if (
+            turn != session.turns
+            or not context
+            or self.max_turns <= 0  # the context would carry the history that was just dropped
+            or len(context) > SETTINGS.session_max_context_tokens
+        ):
+            # Next turn re-prefills the (trimmed) history instead
+            session.context = None
+            self.context_resets += 1
+        else:
+            session.context = array("i", context)
+        session.turns += 1
+        session.last_used = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        contexts = [s.context_tokens() for s in self._sessions.values()]
+        return {
+            "sessions": len(self._sessions),
+            "created": self.created,
+            "reused": self.reused,
+            "evicted": self.evicted,
+            "context_resets": self.context_resets,
+            "context_tokens": sum(contexts),
+            "context_bytes": 4 * sum(contexts),
+        }
+
+
+_SESSIONS = SessionStore(
+    max_sessions=SETTINGS.session_max,
+    idle_seconds=SETTINGS.session_idle_seconds,
+    max_turns=SETTINGS.session_max_turns,
+)
+
+
+def get_chat_session(tenant_id: str, customer_id: Optional[str], session_id: Optional[str]) -> ChatSession:
+    return _SESSIONS.open(tenant_id, customer_id, session_id)
+
+
+def finish_turn(session: ChatSession, turn: int, question: str, answer: str, context: Optional[List[int]]) -> None:
+    _SESSIONS.finish_turn(session, turn, question, answer, context)
+
+
+def session_stats() -> Dict[str, Any]:
+    return _SESSIONS.stats()
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import multiprocessing
 import os
-import shutil
+import queue
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Any, AsyncIterator, Iterator, List, Tuple, Optional
 
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile
 
 from ..config import SETTINGS
+from .documents import logical_doc_id
 
 
-def save_upload(tenant_id: str, file: UploadFile, customer_id: Optional[str] = None) -> Tuple[str, Path]:
-    ext = Path(file.filename or "").suffix.lower()
-    doc_id = str(uuid.uuid4())
+def tenant_docs_dir(tenant_id: str, customer_id: Optional[str] = None) -> Path:
+    """Directory saved documents of a tenant (and customer) live in."""
     base_dir = Path(SETTINGS.data_dir) / "docs" / tenant_id
     tenant_dir = base_dir / customer_id if customer_id else base_dir
     try:
@@ -23,26 +30,207 @@ def save_upload(tenant_id: str, file: UploadFile, customer_id: Optional[str] = N
         fallback = Path("./data_fallback") / "docs" / tenant_id
         tenant_dir = fallback / customer_id if customer_id else fallback
         tenant_dir.mkdir(parents=True, exist_ok=True)
-    dest = tenant_dir / f"{doc_id}{ext}"
-    with dest.open("wb") as out:
-        shutil.copyfileobj(file.file, out)
-    return doc_id, dest
+    return tenant_dir
 
 
-def extract_text(path: Path) -> str:
-    ext = path.suffix.lower()
-    if ext == ".pdf":
-        from pdfminer.high_level import extract_text as pdf_extract
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
-        return pdf_extract(str(path))
-    elif ext in {".txt", ".md"}:
-        return path.read_text(encoding="utf-8", errors="ignore")
-    elif ext in {".docx"}:
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit_bytes: int):
+        super().__init__(f"File exceeds the {limit_bytes // (1024 * 1024)} MB upload limit")
+        self.limit_bytes = limit_bytes
+
+
+@dataclass
+class SavedUpload:
+    doc_id: str  # logical id; same file name for the same tenant/customer -> same id
+    path: Path
+    size: int
+    sha256: str
+
+
+async def write_stream(file: UploadFile, dest: Path, max_bytes: int) -> Tuple[int, str]:
+    """Copy an upload to ``dest`` in fixed-size chunks without blocking the
+    event loop; returns (size, SHA-256 hex digest).
+
+    Data goes to a temp file next to ``dest`` that is renamed into place
+    only once complete, so a partial file is never visible under its final
+    name. Raises UploadTooLarge as soon as more than ``max_bytes`` are read.
+    This bounds what is kept; by the time a route runs Starlette has already
+    spooled the request, whose size BodySizeLimitMiddleware caps.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    tmp = dest.with_name(f".{dest.name}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await out.write(chunk)
+        await aiofiles.os.replace(tmp, dest)
+    except BaseException:
+        await asyncio.to_thread(tmp.unlink, True)
+        raise
+    return size, digest.hexdigest()
+
+
+async def save_upload(
+    tenant_id: str,
+    file: UploadFile,
+    customer_id: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> SavedUpload:
+    """Save an upload under a fresh name (see write_stream). Uploads over
+    ``max_bytes`` (default MAX_UPLOAD_MB) raise UploadTooLarge."""
+    ext = Path(file.filename or "").suffix.lower()
+    doc_id = logical_doc_id(tenant_id, file.filename, customer_id) if file.filename else str(uuid.uuid4())
+    dest = tenant_docs_dir(tenant_id, customer_id) / f"{uuid.uuid4()}{ext}"
+    limit = max_bytes if max_bytes is not None else SETTINGS.max_upload_mb * 1024 * 1024
+    size, sha256 = await write_stream(file, dest, limit)
+    return SavedUpload(doc_id, dest, size, sha256)
+
+
+PDF_READAHEAD_PAGES = 16  # parsed PDF pages buffered ahead of the consumer
+BLOCK_CHARS = 4000  # target size of DOCX paragraph blocks and text sections
+
+_extractors: Optional[ProcessPoolExecutor] = None
+_manager: Optional[Any] = None
+
+
+def _extractor_pool() -> ProcessPoolExecutor:
+    global _extractors, _manager
+    if _extractors is None:
+        # spawn: forking a process that runs event-loop and pool threads is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        _manager = ctx.Manager()
+        _extractors = ProcessPoolExecutor(max_workers=max(1, SETTINGS.extract_workers), mp_context=ctx)
+    return _extractors
+
+
+def shutdown_extractors() -> None:
+    """Stop extraction processes; called from the app lifespan hook."""
+    global _extractors, _manager
+    pool, _extractors = _extractors, None
+    manager, _manager = _manager, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if manager is not None:
+        manager.shutdown()
+
+
+def _pdf_stream(path: str, out: Any, stop: Any) -> None:
+    """Put (1-based page number, text) for each page on ``out``, then None.
+    Runs in an extraction process; a single pass, since pdfminer has to walk
+    the whole page tree to seek to a page."""
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    try:
+        for number, layout in enumerate(extract_pages(path), start=1):
+            text = "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+            while True:
+                if stop.is_set():
+                    return
+                try:
+                    out.put((number, text), timeout=1.0)
+                    break
+                except queue.Full:
+                    continue
+    finally:
         try:
-            import docx  # python-docx
+            out.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+def _docx_blocks(path: str) -> List[Tuple[int, str]]:
+    """Paragraph blocks as (page number, text). Page numbers follow the page
+    breaks Word recorded at last save, or explicit breaks when there are
+    none. Runs in an extraction process."""
+    try:
+        import docx  # python-docx
+
+        document = docx.Document(path)
+    except Exception:
+        return []
+    body = document.element.body
+    rendered = bool(body.xpath(".//w:lastRenderedPageBreak"))
+    breaks = ".//w:lastRenderedPageBreak" if rendered else './/w:br[@w:type="page"]'
+    blocks: List[Tuple[int, str]] = []
+    page, parts, size = 1, [], 0
+    for para in document.paragraphs:
+        page_breaks = len(para._p.xpath(breaks))
+        if page_breaks and parts:
+            blocks.append((page, "\n".join(parts)))
+            parts, size = [], 0
+        page += page_breaks
+        if para.text:
+            parts.append(para.text)
+            size += len(para.text) + 1
+        if size >= BLOCK_CHARS:
+            blocks.append((page, "\n".join(parts)))
+            parts, size = [], 0
+    if parts:
+        blocks.append((page, "\n".join(parts)))
+    return blocks
+
+
+def _text_sections(path: Path) -> Iterator[Tuple[int, str]]:
+    """Plain text in sections of about BLOCK_CHARS, split at blank lines
+    when possible; the "page" is the section number."""
+    section, parts, size = 1, [], 0
+    with path.open("r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts.append(line)
+            size += len(line)
+            if size >= BLOCK_CHARS and (not line.strip() or size >= 2 * BLOCK_CHARS):
+                yield section, "".join(parts)
+                section, parts, size = section + 1, [], 0
+    if parts:
+        yield section, "".join(parts)
+
+
+async def stream_pages(path: Path) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (page number, text) for a document as it is parsed.
 
-            doc = docx.Document(str(path))
-            return "\n".join(p.text for p in doc.paragraphs)
-        except Exception:
-            return ""
-    return ""
+    PDF and DOCX parsing is CPU-bound and runs in the extraction process
+    pool. PDF pages arrive through a bounded queue while later pages are
+    still being parsed, so memory stays flat on very long documents.
+    """
+    ext = path.suffix.lower()
+    loop = asyncio.get_running_loop()
+    if ext == ".pdf":
+        pool = _extractor_pool()
+        assert _manager is not None
+        pages, stop = _manager.Queue(maxsize=PDF_READAHEAD_PAGES), _manager.Event()
+        producer = loop.run_in_executor(pool, _pdf_stream, str(path), pages, stop)
+        try:
+            while True:
+                try:
+                    page = await asyncio.to_thread(pages.get, True, 1.0)
+                except queue.Empty:
+                    if producer.done():
+                        break
+                    continue
+                if page is None:
+                    break
+                yield page
+            await producer  # surface parse errors
+        finally:
+            stop.set()
+    elif ext in {".docx"}:
+        for block in await loop.run_in_executor(_extractor_pool(), _docx_blocks, str(path)):
+            yield block
+    elif ext in {".txt", ".md"}:
+        sections = _text_sections(path)
+        while True:
+            section = await asyncio.to_thread(next, sections, None)
+            if section is None:
+                return
+            yield section
@@ -1,8 +1,114 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
 
 def transcribe_from_twilio_payload(speech_text: str) -> str:
     """For MVP, Twilio provides the transcript already via <Gather input="speech">.
     This function can normalize or post-process the transcript.
     """
     return speech_text.strip()
+
+
+class STTStream:
+    """Transcription of one utterance, fed 16 kHz mono int16 samples while
+    the caller is still speaking. Streaming engines decode in ``feed``;
+    ``finish`` returns the final transcript."""
+
+    def feed(self, samples: np.ndarray) -> None:
+        raise NotImplementedError
+
+    async def finish(self) -> str:
+        raise NotImplementedError
+
+
+class BufferedSTT(STTStream):
+    """Adapter for engines that transcribe a whole utterance at once: the
+    samples are collected (``feed`` may be handed views of a buffer that is
+    reused) and ``transcribe(float32 audio)`` runs in a thread on finish."""
+
+    def __init__(self, transcribe: Callable[[np.ndarray], str]):
+        self._transcribe = transcribe
+        self._parts: List[np.ndarray] = []
+
+    def feed(self, samples: np.ndarray) -> None:
+        self._parts.append(np.array(samples, dtype=np.int16))
+
+    async def finish(self) -> str:
+        audio = np.concatenate(self._parts) if self._parts else np.zeros(0, dtype=np.int16)
+        return (await asyncio.to_thread(self._transcribe, audio.astype(np.float32) / 32768.0)).strip()
+
+
+_whisper = None
+_whisper_lock = threading.Lock()
+
+
+def _whisper_model():
+    global _whisper
+    with _whisper_lock:
+        if _whisper is None:
+            from faster_whisper import WhisperModel  # type: ignore
+
+            _whisper = WhisperModel(SETTINGS.stt_model, device="cpu", compute_type="int8")
+    return _whisper
+
+
+def _whisper_stream() -> STTStream:
+    # Streams are opened on the event loop; the model is only touched in
+    # the transcription thread, which waits if it is still loading
+    def transcribe(audio: np.ndarray) -> str:
+        segments, _ = _whisper_model().transcribe(audio, language="en", beam_size=1, vad_filter=False)
+        return "".join(s.text for s in segments)
+
+    return BufferedSTT(transcribe)
+
+
+# Engine name -> factory for one utterance's stream; register others here
+STT_ENGINES: Dict[str, Callable[[], STTStream]] = {"whisper": _whisper_stream}
+# Engine name -> model loader run at startup, so the first utterance does not wait for it
+STT_LOADERS: Dict[str, Callable[[], Any]] = {"whisper": _whisper_model}
+
+
+def stt_factory(name: Optional[str] = None) -> Optional[Callable[[], STTStream]]:
+    """Factory for the configured engine (STT_ENGINE), or None if it is unset or unknown."""
+    name = SETTINGS.stt_engine if name is None else name
+    if not name:
+        return None
+    factory = STT_ENGINES.get(name)
+    if factory is None:
+        logger.warning("unknown STT engine", extra={"extra": {"engine": name}})
+    return factory
+
+
+_load_task: Optional[asyncio.Task] = None
+
+
+async def _load(name: str) -> None:
+    try:
+        await asyncio.to_thread(STT_LOADERS[name])
+    except Exception as exc:
+        logger.warning("STT model failed to load", extra={"extra": {"engine": name, "error": str(exc)}})
+
+
+async def startup() -> None:
+    """Load the configured engine's model in the background, off the event
+    loop; called from the app lifespan hook."""
+    global _load_task
+    if SETTINGS.stt_engine in STT_LOADERS and _load_task is None:
+        _load_task = asyncio.create_task(_load(SETTINGS.stt_engine), name="stt-load")
+
+
+async def shutdown() -> None:
+    global _load_task
+    task, _load_task = _load_task, None
+    if task is not None:
+        await asyncio.gather(task, return_exceptions=True)
@@ -1,23 +1,210 @@
 from __future__ import annotations
 
-import subprocess
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
 import uuid
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 from ..config import SETTINGS
+from .piper_pool import synthesize_wav
 
+logger = logging.getLogger(__name__)
 
-def synthesize_to_file(text: str, voice: str = "en_US-amy") -> str:
-    """Synthesize text using Piper CLI and return public URL path.
-    Requires Piper installed and configured; this is a placeholder interface.
+
+class VoiceUnavailable(RuntimeError):
+    def __init__(self, voice: str):
+        super().__init__(f"Piper voice {voice!r} is not installed")
+        self.voice = voice
+
+
+def _synthesize(text: str, voice: str, out: Path) -> None:
+    """Synthesize ``text`` into the wav file ``out`` using the voice's Piper
+    worker pool. Raises VoiceUnavailable without Piper installed for the
+    voice, so nothing is cached under the text's key.
     """
-    audio_dir = Path(SETTINGS.data_dir) / "audio"
-    audio_dir.mkdir(parents=True, exist_ok=True)
-    out = audio_dir / f"{uuid.uuid4()}.wav"
-    try:
-        # TODO: integrate actual Piper command; placeholder writes empty wav
-        out.write_bytes(b"RIFF\x00\x00\x00\x00WAVEfmt ")
-    except Exception:
-        out.write_bytes(b"")
+    wav = synthesize_wav(text, voice)
+    if wav is None:
+        raise VoiceUnavailable(voice)
+    out.write_bytes(wav)
+
+
+def normalize_text(text: str) -> str:
+    # Differences that do not change the audio must not change the key
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def audio_key(text: str, voice: str) -> str:
+    return hashlib.sha256(f"{voice}\0{normalize_text(text)}".encode("utf-8")).hexdigest()[:32]
+
+
+class AudioCache:
+    """Synthesized audio on disk, addressed by (voice, normalized text).
+
+    A phrase is synthesized once and then served from its stable file name.
+    Files are kept in access order (hits refresh the file's access time so
+    the order survives restarts) and the least recently used are deleted
+    once the directory exceeds ``max_bytes``; 0 disables eviction.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, least recent first
+        self._bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.synth_seconds = 0.0
+
+    def _load(self) -> None:
+        # Pick up files from earlier runs, oldest access first
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.directory.glob("*.wav"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_atime, path.name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self._bytes += size
+        self._loaded = True
+
+    def _evict(self) -> None:
+        while self.max_bytes and self._bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evicted += 1
+            try:
+                (self.directory / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _hit(self, name: str) -> bool:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if name not in self._files:
+                return False
+            self._files.move_to_end(name)
+            self.hits += 1
+        try:
+            os.utime(self.directory / name)
+        except FileNotFoundError:
+            # Deleted behind our back: forget it and synthesize again
+            with self._lock:
+                self._bytes -= self._files.pop(name, 0)
+            return False
+        return True
+
+    def get_or_synthesize(self, text: str, voice: Optional[str] = None) -> str:
+        """File name of the audio for ``text`` in ``voice`` (default
+        TTS_VOICE), synthesizing it on a miss."""
+        voice = voice or SETTINGS.tts_voice
+        name = f"{audio_key(text, voice)}.wav"
+        if self._hit(name):
+            return name
+        start = time.perf_counter()
+        tmp = self.directory / f".{name}.{uuid.uuid4().hex}.part"
+        try:
+            _synthesize(normalize_text(text), voice, tmp)
+            os.replace(tmp, self.directory / name)
+        finally:
+            tmp.unlink(missing_ok=True)
+        size = (self.directory / name).stat().st_size
+        with self._lock:
+            self.misses += 1
+            self.synth_seconds += time.perf_counter() - start
+            self._bytes += size - self._files.pop(name, 0)
+            self._files[name] = size
+            self._evict()
+        return name
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "synth_seconds": round(self.synth_seconds, 3),
+            }
+
+
+_AUDIO = AudioCache(Path(SETTINGS.data_dir) / "audio", SETTINGS.tts_cache_mb * 1024 * 1024)
+
+
+def synthesize_to_file(text: str, voice: Optional[str] = None) -> str:
+    """Synthesize text (or reuse earlier audio for it) and return public URL path."""
+    name = _AUDIO.get_or_synthesize(text, voice)
     # The file will be served via /static/audio in dev or Nginx in prod
-    return f"/static/audio/{out.name}"
+    return f"/static/audio/{name}"
+
+
+def tenant_phrases(tenant_id: str) -> List[str]:
+    """Phrases listed in DATA_DIR/tenants/<tenant>/phrases.json (a JSON list of strings)."""
+    path = Path(SETTINGS.data_dir) / "tenants" / tenant_id / "phrases.json"
+    try:
+        phrases = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    return [p for p in phrases if isinstance(p, str) and p.strip()] if isinstance(phrases, list) else []
+
+
+def prewarm(tenant_ids: Optional[List[str]] = None) -> int:
+    """Synthesize every tenant's phrase list ahead of calls; returns phrases warmed."""
+    if tenant_ids is None:
+        root = Path(SETTINGS.data_dir) / "tenants"
+        tenant_ids = sorted(p.name for p in root.iterdir() if p.is_dir()) if root.is_dir() else []
+    warmed = 0
+    for tenant_id in tenant_ids:
+        for phrase in tenant_phrases(tenant_id):
+            if _stop_prewarm.is_set():
+                return warmed
+            try:
+                synthesize_to_file(phrase)
+                warmed += 1
+            except VoiceUnavailable as exc:
+                logger.warning("tts prewarm skipped", extra={"extra": {"error": str(exc)}})
+                return warmed
+            except Exception as exc:
+                logger.warning("tts prewarm failed", extra={"extra": {"tenant_id": tenant_id, "error": str(exc)}})
+    return warmed
+
+
+_prewarm_task: Optional[asyncio.Task] = None
+_stop_prewarm = threading.Event()
+
+
+async def startup() -> None:
+    """Pre-warm phrase lists in the background; called from the app lifespan hook."""
+    global _prewarm_task
+    if SETTINGS.tts_prewarm and _prewarm_task is None:
+        _stop_prewarm.clear()
+        _prewarm_task = asyncio.create_task(asyncio.to_thread(prewarm), name="tts-prewarm")
+
+
+async def shutdown() -> None:
+    global _prewarm_task
+    task, _prewarm_task = _prewarm_task, None
+    if task is not None:
+        # The thread stops after its current phrase
+        _stop_prewarm.set()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def tts_stats() -> Dict[str, Any]:
+    return _AUDIO.stats()
@@ -1,24 +1,167 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple, Optional, cast
+import asyncio
+import functools
+import json
+import mmap
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, List, Set, Tuple, TypeVar, Optional, cast
+
+import numpy as np
+
+from ..config import SETTINGS
+from ..utils.filelock import file_lock
+
+
+class _StoreExecutor:
+    """Bounded thread pool for blocking store calls with per-tenant limits.
+
+    Each tenant may have at most ``per_tenant`` calls submitted at once;
+    further calls wait on an asyncio semaphore without occupying a thread.
+    """
+
+    def __init__(self, workers: int, per_tenant: int):
+        self.workers = max(1, int(workers))
+        self.per_tenant = max(1, int(per_tenant))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vector")
+        self._gates: Dict[str, asyncio.Semaphore] = {}
+        self._counts_lock = threading.Lock()
+        self.waiting = 0  # blocked on a tenant limit
+        self.queued = 0  # submitted to the pool, not started yet
+        self.running = 0
+        self.completed = 0
+
+    def _started(self) -> None:
+        with self._counts_lock:
+            self.queued -= 1
+            self.running += 1
+
+    def _finished(self) -> None:
+        with self._counts_lock:
+            self.running -= 1
+            self.completed += 1
+
+    def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self._started()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._finished()
+
+    async def run(self, tenant_id: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        gate = self._gates.get(tenant_id)
+        if gate is None:
+            gate = self._gates[tenant_id] = asyncio.Semaphore(self.per_tenant)
+        self.waiting += 1
+        try:
+            await gate.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            with self._counts_lock:
+                self.queued += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(self._call, fn, *args, **kwargs))
+        finally:
+            gate.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "per_tenant": self.per_tenant,
+            "waiting": self.waiting,
+            "queued": self.queued,
+            "running": self.running,
+            "queue_depth": self.waiting + self.queued,
+            "completed": self.completed,
+        }
+
+
+_EXECUTOR = _StoreExecutor(SETTINGS.vector_workers, SETTINGS.vector_tenant_concurrency)
+
+
+async def run_store_call(tenant_id: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking store/index call on the shared vector thread pool."""
+    return await _EXECUTOR.run(tenant_id, fn, *args, **kwargs)
 
 
 class VectorStore:
-    """Abstract vector store interface."""
+    """Abstract vector store interface.
+
+    Backends implement the blocking methods; handlers on the event loop use
+    the ``a*`` variants, which run them on the shared vector thread pool.
+    """
+
+    tenant_id: str = ""
 
     def upsert(self, items: List[Tuple[str, List[float], Dict[str, Any]]]) -> int:  # returns count
         raise NotImplementedError
 
-    def query(self, vector: List[float], top_k: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def query(
+        self, vector: List[float], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Nearest hits; with ``with_vectors`` each hit also carries its
+        stored "embedding", for re-ranking without another lookup."""
         raise NotImplementedError
 
+    def delete(self, ids: List[str]) -> int:  # returns count
+        raise NotImplementedError
+
+    def query_batch(
+        self, vectors: List[List[float]], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        return [self.query(v, top_k=top_k, where=where, with_vectors=with_vectors) for v in vectors]
+
+    def close(self) -> None:
+        """Release handles held by this store. Called on registry eviction."""
+        return None
+
+    async def aupsert(self, items: List[Tuple[str, List[float], Dict[str, Any]]]) -> int:
+        return await run_store_call(self.tenant_id, self.upsert, items)
+
+    async def aquery(
+        self, vector: List[float], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        return await run_store_call(self.tenant_id, self.query, vector, top_k=top_k, where=where, with_vectors=with_vectors)
+
+    async def adelete(self, ids: List[str]) -> int:
+        return await run_store_call(self.tenant_id, self.delete, ids)
+
+    async def aquery_batch(
+        self, vectors: List[List[float]], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        return await run_store_call(
+            self.tenant_id, self.query_batch, vectors, top_k=top_k, where=where, with_vectors=with_vectors
+        )
+
+
+_chroma_clients: Dict[str, Any] = {}
+_chroma_lock = threading.Lock()
+
+
+def _chroma_client(data_dir: str) -> Any:
+    """One chromadb client per persist directory, shared by all tenants."""
+    with _chroma_lock:
+        client = _chroma_clients.get(data_dir)
+        if client is None:
+            import chromadb
+            from chromadb.config import Settings as ChromaSettings
+
+            client = chromadb.Client(ChromaSettings(persist_directory=data_dir))
+            _chroma_clients[data_dir] = client
+        return client
+
 
 class ChromaStore(VectorStore):
     def __init__(self, data_dir: str, tenant_id: str):
-        import chromadb
-        from chromadb.config import Settings as ChromaSettings
-
-        self._client = chromadb.Client(ChromaSettings(persist_directory=data_dir))
+        self.tenant_id = tenant_id
+        self._client = _chroma_client(data_dir)
         self._collection = self._client.get_or_create_collection(name=f"docs-{tenant_id}")
 
     def upsert(self, items: List[Tuple[str, List[float], Dict[str, Any]]]) -> int:
@@ -35,22 +178,34 @@ class ChromaStore(VectorStore):
         )
         return len(items)
 
-    def query(self, vector: List[float], top_k: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def delete(self, ids: List[str]) -> int:
+        if ids:
+            self._collection.delete(ids=ids)
+        return len(ids)
+
+    def query(
+        self, vector: List[float], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
         kwargs: Dict[str, Any] = {"query_embeddings": [vector], "n_results": top_k}
         if where:
             kwargs["where"] = where
+        if with_vectors:
+            kwargs["include"] = ["metadatas", "documents", "distances", "embeddings"]
         res = self._collection.query(**kwargs)
         out: List[Dict[str, Any]] = []
         ids = cast(Any, res.get("ids") or [[]])
         dists = cast(Any, res.get("distances") or [[]])
         metas = cast(Any, res.get("metadatas") or [[]])
         docs = cast(Any, res.get("documents") or [[]])
+        embs = cast(Any, res.get("embeddings")) if with_vectors else None
         row_len = len(ids[0]) if ids and len(ids) > 0 else 0
         for i in range(row_len):
             score = float(dists[0][i]) if (dists and len(dists) > 0 and len(dists[0]) > i) else 0.0
             meta = metas[0][i] if (metas and len(metas) > 0 and len(metas[0]) > i) else {}
             doc = docs[0][i] if (docs and len(docs) > 0 and len(docs[0]) > i) else ""
             out.append({"id": ids[0][i], "score": score, "metadata": meta, "document": doc})
+            if embs is not None and len(embs) > 0 and len(embs[0]) > i:
+                out[-1]["embedding"] = np.asarray(embs[0][i], dtype=np.float32)
         return out
 
 
@@ -58,3 +213,510 @@ class PineconeStore(VectorStore):
     def __init__(self, api_key: str, index: str, tenant_id: str):
         # TODO: Implement Pinecone serverless adapter when enabled.
         raise NotImplementedError("Pinecone adapter not implemented yet")
+
+
+# Metadata fields NumpyStore keeps an inverted index for, so `where` filters
+# never scan the metadata sidecar.
+_NUMPY_FILTER_FIELDS = ("customer_id", "doc_id", "filename")
+_NUMPY_BLOCK_ROWS = 65536
+_NUMPY_COMPACT_MIN_RECORDS = 1024  # rows-log records before dead rows are worth compacting away
+
+
+def where_terms(where: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """Flatten a Chroma-style equality filter into (field, value) pairs."""
+    terms: List[Tuple[str, Any]] = []
+    for key, value in where.items():
+        if key == "$and":
+            for clause in value:
+                terms.extend(where_terms(clause))
+            continue
+        if isinstance(value, dict):
+            if set(value) != {"$eq"}:
+                raise ValueError(f"Unsupported filter on {key!r}: {value!r}")
+            value = value["$eq"]
+        terms.append((key, value))
+    return terms
+
+
+def _unit_rows(vectors: Any) -> np.ndarray:
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class NumpyStore(VectorStore):
+    """In-process vector index over a memory-mapped float32 matrix.
+
+    Files under ``<data_dir>/<tenant_id>/``:
+      - ``vectors.f32``: unit-normalized float32 rows, appended or overwritten in place
+      - ``meta.jsonl``: full metadata, one JSON line per write, read only for hits
+      - ``rows.jsonl``: compact log of ``{id, row, off, f}`` records replayed on open,
+        where ``off`` points into meta.jsonl and ``f`` holds the filterable fields
+      - ``index.json``: the embedding dimension and the current generation
+
+    Queries are a blocked matmul plus ``argpartition`` top-k. Scores are cosine
+    distances (lower is closer). Workers sharing a directory share the page
+    cache and pick up rows appended by another process on their next query.
+    Writers in any process serialize on an exclusive lock of ``.lock``.
+
+    Once the rows log holds more than twice as many records as live rows,
+    a writer compacts: live rows are copied into a new generation of the
+    three files (``vectors.<gen>.f32`` ...), and index.json is switched to
+    it. Opening then replays one record per live row plus what was written
+    since. Other handles notice the new generation and start over; the
+    previous generation is deleted at the following compaction.
+    """
+
+    def __init__(self, data_dir: str, tenant_id: str):
+        self.tenant_id = tenant_id
+        self._dir = Path(data_dir) / tenant_id
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._index_path = self._dir / "index.json"
+        self._file_lock_path = self._dir / ".lock"
+        self._lock = threading.RLock()
+        self._dim = 0
+        self._index_stamp: Tuple[int, int] = (0, 0)  # (inode, mtime) of the index.json last read
+        self._meta_map: Optional[mmap.mmap] = None
+        with self._lock:
+            self._reset(0)
+            self._refresh()
+
+    def _gen_paths(self, gen: int) -> Tuple[Path, Path, Path]:
+        suffix = f".{gen}" if gen else ""
+        return (
+            self._dir / f"vectors{suffix}.f32",
+            self._dir / f"meta{suffix}.jsonl",
+            self._dir / f"rows{suffix}.jsonl",
+        )
+
+    def _reset(self, gen: int) -> None:
+        # Caller holds self._lock
+        self._gen = gen
+        self._vec_path, self._meta_path, self._rows_path = self._gen_paths(gen)
+        self._ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._offsets = array("q")
+        self._live = np.zeros(1024, dtype=bool)
+        self._field_values: Dict[str, List[Any]] = {f: [] for f in _NUMPY_FILTER_FIELDS}
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {f: {} for f in _NUMPY_FILTER_FIELDS}
+        self._rows_size = 0
+        self._log_records = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._close_meta_map()
+
+    # -- log replay -----------------------------------------------------
+    def _refresh(self) -> None:
+        try:
+            st = self._index_path.stat()
+        except FileNotFoundError:
+            return  # nothing written yet
+        if (st.st_ino, st.st_mtime_ns) != self._index_stamp:
+            info = json.loads(self._index_path.read_text())
+            self._index_stamp = (st.st_ino, st.st_mtime_ns)
+            self._dim = int(info["dim"])
+            gen = int(info.get("gen", 0))
+            if gen != self._gen:
+                # Compacted by another handle: start over on the new files
+                self._reset(gen)
+        try:
+            size = self._rows_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size <= self._rows_size:
+            return
+        with self._rows_path.open("rb") as f:
+            f.seek(self._rows_size)
+            data = f.read(size - self._rows_size)
+        end = data.rfind(b"\n") + 1  # ignore a partially written trailing line
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+                self._log_records += 1
+        self._rows_size += end
+        self._matrix = None
+
+    def _grow(self, rows: int) -> None:
+        while len(self._ids) < rows:
+            self._ids.append(None)
+            self._offsets.append(-1)
+            for values in self._field_values.values():
+                values.append(None)
+        if rows > len(self._live):
+            live = np.zeros(max(rows, 2 * len(self._live)), dtype=bool)
+            live[: len(self._live)] = self._live
+            self._live = live
+
+    def _unindex(self, row: int) -> None:
+        for field, values in self._field_values.items():
+            value = values[row]
+            if value is not None:
+                self._postings[field].get(value, set()).discard(row)
+                values[row] = None
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        row = int(rec["row"])
+        chunk_id = str(rec["id"])
+        self._grow(row + 1)
+        previous = self._row_of.get(chunk_id)
+        if previous is not None and previous != row:
+            self._unindex(previous)
+            self._live[previous] = False
+            self._ids[previous] = None
+        self._unindex(row)
+        if rec.get("del"):
+            self._row_of.pop(chunk_id, None)
+            self._ids[row] = None
+            self._live[row] = False
+            return
+        self._row_of[chunk_id] = row
+        self._ids[row] = chunk_id
+        self._offsets[row] = int(rec["off"])
+        self._live[row] = True
+        for field, value in (rec.get("f") or {}).items():
+            if field in self._field_values and value is not None:
+                self._field_values[field][row] = value
+                self._postings[field].setdefault(value, set()).add(row)
+
+    # -- reads ------------------------------------------------------------
+    def _get_matrix(self) -> Optional[np.ndarray]:
+        rows = len(self._ids)
+        if not rows or not self._dim:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._matrix
+
+    def _close_meta_map(self) -> None:
+        if self._meta_map is not None:
+            self._meta_map.close()
+            self._meta_map = None
+
+    def _meta_line(self, row: int) -> bytes:
+        # Caller holds self._lock: the map is only replaced (and closed) under it
+        offset = self._offsets[row]
+        mm = self._meta_map
+        if mm is None or offset >= len(mm):
+            with self._meta_path.open("rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._close_meta_map()
+            self._meta_map = mm
+        end = mm.find(b"\n", offset)
+        return mm[offset:end if end >= 0 else len(mm)]
+
+    def _metadata(self, row: int) -> Dict[str, Any]:
+        return json.loads(self._meta_line(row))
+
+    def _candidates(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        rows: Optional[Set[int]] = None
+        for field, value in where_terms(where):
+            if field not in self._postings:
+                raise ValueError(f"NumpyStore cannot filter on {field!r}; indexed fields: {_NUMPY_FILTER_FIELDS}")
+            matched = self._postings[field].get(value, set())
+            rows = set(matched) if rows is None else rows & matched
+        return np.fromiter(sorted(rows or ()), dtype=np.int64)
+
+    def query(
+        self, vector: List[float], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[Dict[str, Any]]:
+        return self.query_batch([vector], top_k=top_k, where=where, with_vectors=with_vectors)[0]
+
+    def query_batch(
+        self, vectors: List[List[float]], top_k: int = 5, where: Optional[Dict[str, Any]] = None, with_vectors: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        while True:
+            with self._lock:
+                self._refresh()
+                gen = self._gen
+                mat = self._get_matrix()
+                live = self._live
+                candidates = self._candidates(where)
+            if mat is None or not vectors or top_k <= 0:
+                return [[] for _ in vectors]
+            queries = _unit_rows(vectors)
+            if queries.shape[1] != self._dim:
+                raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {self._dim}")
+
+            # The scan runs without the lock; hits are resolved under it below
+            if candidates is not None:
+                if not len(candidates):
+                    return [[] for _ in vectors]
+                rows, sims = self._top_k(queries @ mat[candidates].T, top_k)
+                rows = candidates[rows]
+            else:
+                parts_rows: List[np.ndarray] = []
+                parts_sims: List[np.ndarray] = []
+                for start in range(0, mat.shape[0], _NUMPY_BLOCK_ROWS):
+                    block = np.asarray(mat[start : start + _NUMPY_BLOCK_ROWS])
+                    scores = queries @ block.T
+                    scores[:, ~live[start : start + block.shape[0]]] = -np.inf
+                    block_rows, block_sims = self._top_k(scores, top_k)
+                    parts_rows.append(block_rows + start)
+                    parts_sims.append(block_sims)
+                merged_rows = np.concatenate(parts_rows, axis=1)
+                picked, sims = self._top_k(np.concatenate(parts_sims, axis=1), top_k)
+                rows = np.take_along_axis(merged_rows, picked, axis=1)
+
+            with self._lock:
+                if self._gen != gen:
+                    continue  # compacted meanwhile: row numbers changed, scan again
+                out: List[List[Dict[str, Any]]] = []
+                for qrows, qsims in zip(rows, sims):
+                    hits: List[Dict[str, Any]] = []
+                    for row, sim in zip(qrows.tolist(), qsims.tolist()):
+                        # Rows are never reused, so a row still holding an id holds that chunk
+                        chunk_id = self._ids[row] if row < len(self._ids) else None
+                        if sim == -np.inf or chunk_id is None:
+                            continue
+                        meta = self._metadata(row)
+                        hits.append({"id": chunk_id, "score": 1.0 - float(sim), "metadata": meta, "document": meta.get("text", "")})
+                        if with_vectors:
+                            hits[-1]["embedding"] = np.array(mat[row])  # unit length; copied out of the memmap
+                    out.append(hits)
+                return out
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Column indices and values of the k largest scores per row, best first."""
+        k = min(k, scores.shape[1])
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        vals = np.take_along_axis(scores, idx, axis=1)
+        order = np.argsort(-vals, axis=1)
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+    # -- writes ------------------------------------------------------------
+    def upsert(self, items: List[Tuple[str, List[float], Dict[str, Any]]]) -> int:
+        if not items:
+            return 0
+        vecs = _unit_rows([it[1] for it in items])
+        with self._lock, file_lock(self._file_lock_path):
+            # Under the lock every row another writer added is in the log
+            self._refresh()
+            dim = vecs.shape[1]
+            if not self._dim:
+                self._write_index(dim, self._gen)
+                self._dim = dim
+            elif dim != self._dim:
+                raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._dim}")
+            row_bytes = 4 * dim
+            size = self._vec_path.stat().st_size if self._vec_path.exists() else 0
+            # Rows past the log (a writer died before logging them) are skipped, not overwritten
+            next_row = max(len(self._ids), -(-size // row_bytes))
+            rows: List[int] = []
+            for chunk_id, _, _ in items:
+                row = self._row_of.get(chunk_id)
+                if row is None:
+                    row = next_row
+                    next_row += 1
+                rows.append(row)
+            # Vectors first, then metadata, then the rows log that makes them visible
+            with self._vec_path.open("r+b" if self._vec_path.exists() else "w+b") as f:
+                for idx, row in enumerate(rows):
+                    f.seek(row * row_bytes)
+                    f.write(vecs[idx].tobytes())
+            records: List[bytes] = []
+            with self._meta_path.open("ab") as f:
+                for (chunk_id, _, meta), row in zip(items, rows):
+                    offset = f.tell()
+                    f.write(json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n")
+                    fields = {k: meta.get(k) for k in _NUMPY_FILTER_FIELDS if meta.get(k) is not None}
+                    records.append(json.dumps({"id": chunk_id, "row": row, "off": offset, "f": fields}).encode("utf-8") + b"\n")
+            with self._rows_path.open("ab") as f:
+                f.write(b"".join(records))
+            self._refresh()
+            self._maybe_compact()
+        return len(items)
+
+    def delete(self, ids: List[str]) -> int:
+        with self._lock, file_lock(self._file_lock_path):
+            self._refresh()
+            records = [
+                json.dumps({"id": chunk_id, "row": self._row_of[chunk_id], "del": 1}).encode("utf-8") + b"\n"
+                for chunk_id in dict.fromkeys(ids)
+                if chunk_id in self._row_of
+            ]
+            if records:
+                with self._rows_path.open("ab") as f:
+                    f.write(b"".join(records))
+                self._refresh()
+                self._maybe_compact()
+        return len(records)
+
+    def _write_index(self, dim: int, gen: int) -> None:
+        # Readers open without the lock: publish the file whole
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"dim": dim, "gen": gen}))
+        os.replace(tmp, self._index_path)
+
+    def _maybe_compact(self) -> None:
+        # Caller holds both locks and has just refreshed
+        if self._log_records > 2 * max(len(self._row_of), _NUMPY_COMPACT_MIN_RECORDS):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Copy live rows into a new generation of files and switch to it."""
+        live_rows = [row for row, chunk_id in enumerate(self._ids) if chunk_id is not None]
+        mat = self._get_matrix()
+        gen = self._gen + 1
+        vec_path, meta_path, rows_path = self._gen_paths(gen)
+        with vec_path.open("wb") as vf, meta_path.open("wb") as mf, rows_path.open("wb") as rf:
+            if mat is not None:
+                for start in range(0, len(live_rows), _NUMPY_BLOCK_ROWS):
+                    vf.write(np.ascontiguousarray(mat[live_rows[start : start + _NUMPY_BLOCK_ROWS]]).tobytes())
+            for new_row, row in enumerate(live_rows):
+                offset = mf.tell()
+                mf.write(self._meta_line(row) + b"\n")
+                fields = {f: values[row] for f, values in self._field_values.items() if values[row] is not None}
+                record = {"id": self._ids[row], "row": new_row, "off": offset, "f": fields}
+                rf.write(json.dumps(record).encode("utf-8") + b"\n")
+        self._write_index(self._dim, gen)
+        if self._gen > 0:
+            # Handles still on the previous generation have had a whole cycle to move on
+            for path in self._gen_paths(self._gen - 1):
+                path.unlink(missing_ok=True)
+        self._reset(gen)
+        self._refresh()
+
+    def close(self) -> None:
+        with self._lock:
+            self._matrix = None
+            self._close_meta_map()
+
+
+S = TypeVar("S")
+
+
+class StoreRegistry(Generic[S]):
+    """Process-wide cache of open per-tenant stores (or any object with ``close()``).
+
+    Entries are kept in LRU order; the least recently used store is evicted once
+    more than ``max_open`` are held, and any store idle for ``idle_seconds`` is
+    dropped on the next access. Evicted stores get ``close()`` called.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], S],
+        max_open: int = 256,
+        idle_seconds: float = 900.0,
+    ):
+        self._factory = factory
+        self._max_open = max(1, int(max_open))
+        self._idle_seconds = float(idle_seconds)
+        self._stores: "OrderedDict[str, Tuple[S, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._opening: Dict[str, threading.Lock] = {}  # tenant -> lock held while its store opens
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, tenant_id: str, evicted: List[S]) -> Optional[S]:
+        # Caller holds self._lock
+        now = time.monotonic()
+        # Idle entries sit at the front of the LRU order
+        while self._stores and self._idle_seconds > 0:
+            oldest_tenant, (oldest, last_used) = next(iter(self._stores.items()))
+            if now - last_used < self._idle_seconds:
+                break
+            del self._stores[oldest_tenant]
+            evicted.append(oldest)
+            self.evictions += 1
+        entry = self._stores.get(tenant_id)
+        if entry is None:
+            return None
+        self._stores[tenant_id] = (entry[0], now)
+        self._stores.move_to_end(tenant_id)
+        return entry[0]
+
+    def _close(self, stores: List[S]) -> None:
+        for old in stores:
+            try:
+                old.close()
+            except Exception:
+                pass
+
+    def get(self, tenant_id: str) -> S:
+        evicted: List[S] = []
+        with self._lock:
+            store = self._lookup(tenant_id, evicted)
+            if store is not None:
+                self.hits += 1
+            else:
+                opening = self._opening.setdefault(tenant_id, threading.Lock())
+        if store is None:
+            # Open outside the registry lock so a slow open (log replay, client
+            # start) only holds up callers for the same tenant
+            with opening:
+                with self._lock:
+                    store = self._lookup(tenant_id, evicted)
+                    if store is not None:
+                        self.hits += 1  # opened by a concurrent caller
+                if store is None:
+                    try:
+                        store = self._factory(tenant_id)
+                    except BaseException:
+                        with self._lock:
+                            self._opening.pop(tenant_id, None)
+                        raise
+                    with self._lock:
+                        self._opening.pop(tenant_id, None)
+                        self.misses += 1
+                        self._stores[tenant_id] = (store, time.monotonic())
+                        while len(self._stores) > self._max_open:
+                            _, (oldest, _) = self._stores.popitem(last=False)
+                            evicted.append(oldest)
+                            self.evictions += 1
+        self._close(evicted)
+        return store
+
+    def clear(self) -> None:
+        with self._lock:
+            stores = [s for s, _ in self._stores.values()]
+            self._stores.clear()
+        self._close(stores)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "open": len(self._stores),
+                "max_open": self._max_open,
+                "idle_seconds": self._idle_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+def _build_store(tenant_id: str) -> VectorStore:
+    if SETTINGS.store == "chroma":
+        return ChromaStore(SETTINGS.chroma_dir, tenant_id)
+    if SETTINGS.store == "numpy":
+        return NumpyStore(SETTINGS.numpy_store_dir or str(Path(SETTINGS.data_dir) / "vectors"), tenant_id)
+    # Future: Pinecone adapter
+    return ChromaStore(SETTINGS.chroma_dir, tenant_id)
+
+
+_REGISTRY: StoreRegistry[VectorStore] = StoreRegistry(
+    _build_store,
+    max_open=SETTINGS.store_cache_max,
+    idle_seconds=SETTINGS.store_cache_idle_seconds,
+)
+
+
+def get_store(tenant_id: str) -> VectorStore:
+    """Return the shared store for a tenant, opening it on first use."""
+    return _REGISTRY.get(tenant_id)
+
+
+def store_stats() -> Dict[str, Any]:
+    return _REGISTRY.stats()
+
+
+def executor_stats() -> Dict[str, Any]:
+    return _EXECUTOR.stats()
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Protocol, Tuple
+
+import numpy as np
+
+from ..config import SETTINGS
+from .llm import stream_generate
+from .rag import build_prompt, retrieve
+from .scheduler import QueueFull
+from .stt import STTStream
+from .voice_turns import split_sentences
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000  # inbound audio is resampled to this for VAD and STT
+_WINDOW_MS = 20
+_PRE_ROLL_MS = 200  # audio kept before the detected start, so first syllables reach STT
+
+# text -> (sample rate, 16-bit mono PCM), or None when no voice is available
+Synthesizer = Callable[[str], Optional[Tuple[int, bytes]]]
+
+
+class AudioSink(Protocol):
+    def enqueue(self, pcm: np.ndarray, sample_rate: int) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class RingBuffer:
+    """Fixed-size sample buffer addressed by absolute sample index.
+
+    Frames are copied in once; reads of a contiguous range are views, so
+    the VAD and STT look at the same memory without per-frame copies.
+    """
+
+    def __init__(self, capacity: int, dtype: Any = np.int16):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        self.written = 0  # absolute index of the next sample
+
+    @property
+    def nbytes(self) -> int:
+        return self._buf.nbytes
+
+    def write(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if n > self.capacity:
+            self.written += n - self.capacity
+            samples, n = samples[-self.capacity :], self.capacity
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self._buf[pos : pos + first] = samples[:first]
+        self._buf[: n - first] = samples[first:]
+        self.written += n
+
+    def read(self, start: int, end: Optional[int] = None) -> np.ndarray:
+        """Samples [start, end) still in the buffer; a view unless the range wraps."""
+        end = self.written if end is None else min(end, self.written)
+        start = max(start, self.written - self.capacity, 0)
+        if end <= start:
+            return self._buf[:0]
+        a = start % self.capacity
+        if a + (end - start) <= self.capacity:
+            return self._buf[a : a + end - start]
+        return np.concatenate((self._buf[a:], self._buf[: end - start - (self.capacity - a)]))
+
+
+class EnergyEndpointer:
+    """Energy-based end-of-speech detection over 20 ms windows of a RingBuffer.
+
+    A window is speech when its level is above both ``energy_db`` (dBFS)
+    and the running noise floor plus ``margin_db``. An utterance starts
+    after ``start_ms`` of speech and ends after ``hangover_ms`` of silence
+    (or at ``max_seconds``); ``update`` returns ("start", index) and
+    ("end", index) events, indexes being absolute sample positions.
+    """
+
+    def __init__(
+        self,
+        ring: RingBuffer,
+        sample_rate: int = SAMPLE_RATE,
+        *,
+        energy_db: float = -45.0,
+        margin_db: float = 10.0,
+        start_ms: float = 60.0,
+        hangover_ms: float = 500.0,
+        min_speech_ms: float = 250.0,
+        max_seconds: float = 15.0,
+    ):
+        self.ring = ring
+        self.window = sample_rate * _WINDOW_MS // 1000
+        self.energy_db = energy_db
+        self.margin_db = margin_db
+        self.start_windows = max(1, math.ceil(start_ms / _WINDOW_MS))
+        self.hangover_windows = max(1, math.ceil(hangover_ms / _WINDOW_MS))
+        self.min_speech = int(sample_rate * min_speech_ms / 1000)
+        self.max_samples = int(sample_rate * max_seconds)
+        self.pre_roll = sample_rate * _PRE_ROLL_MS // 1000
+        self.noise_db = -60.0
+        self.in_speech = False
+        self.start = 0
+        self._pos = 0
+        self._run = 0  # consecutive speech (before start) or silence (during speech) windows
+
+    def _level(self, window: np.ndarray) -> float:
+        rms = math.sqrt(float(np.dot(window, window.astype(np.float32))) / len(window))
+        return 20.0 * math.log10(rms / 32768.0 + 1e-10)
+
+    def update(self) -> List[Tuple[str, int]]:
+        events: List[Tuple[str, int]] = []
+        while self.ring.written - self._pos >= self.window:
+            level = self._level(self.ring.read(self._pos, self._pos + self.window))
+            self._pos += self.window
+            speech = level > max(self.energy_db, self.noise_db + self.margin_db)
+            if not self.in_speech:
+                if not speech:
+                    self.noise_db = 0.95 * self.noise_db + 0.05 * level
+                self._run = self._run + 1 if speech else 0
+                if self._run >= self.start_windows:
+                    self.in_speech = True
+                    self.start = max(0, self._pos - self._run * self.window - self.pre_roll)
+                    self._run = 0
+                    events.append(("start", self.start))
+            else:
+                self._run = 0 if speech else self._run + 1
+                end = self._pos - self._run * self.window
+                if self._run >= self.hangover_windows or self._pos - self.start >= self.max_samples:
+                    self.in_speech = False
+                    self._run = 0
+                    if end - self.start >= self.min_speech:
+                        events.append(("end", end))
+                    else:
+                        events.append(("cancel", end))  # a click or a cough
+        return events
+
+
+class StageStats:
+    """Recent latencies of one pipeline stage, in seconds."""
+
+    def __init__(self, maxlen: int = 512):
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=maxlen)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.recent.append(seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        values = sorted(self.recent)
+        if not values:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "p50_ms": round(1000 * values[len(values) // 2], 1),
+            "p95_ms": round(1000 * values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        }
+
+
+# Process-wide, across sessions: see voice_stats()
+_STAGES: Dict[str, StageStats] = {}
+
+
+def _record(stage: str, seconds: float, into: Dict[str, float]) -> None:
+    into[stage] = round(1000 * seconds, 1)
+    _STAGES.setdefault(stage, StageStats()).add(seconds)
+
+
+class VoiceAgent:
+    """Voice conversation on one peer connection.
+
+    ``run`` consumes 16 kHz int16 audio, detects utterances, streams them
+    to STT and answers each with retrieve -> stream_generate -> sentence
+    TTS into ``output``. Speaking over an answer interrupts it. Per turn,
+    stage latencies (ms) are reported through ``on_event`` and kept in
+    ``turns``:
+
+    - endpoint: end of speech to its detection (audio time, ~hangover)
+    - stt: final transcript after the end of speech
+    - retrieve: retrieval and prompt packing
+    - llm_first_token, tts (first sentence)
+    - first_audio: end of speech detected to first answer audio queued
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        *,
+        stt: Optional[Callable[[], STTStream]],
+        synthesize: Synthesizer,
+        output: AudioSink,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.tenant_id = tenant_id
+        self.stt = stt
+        self.synthesize = synthesize
+        self.output = output
+        self.on_event = on_event
+        self.ring = RingBuffer(SAMPLE_RATE * (int(SETTINGS.vad_max_utterance_seconds) + 5))
+        self.endpointer = EnergyEndpointer(
+            self.ring,
+            energy_db=SETTINGS.vad_energy_db,
+            margin_db=SETTINGS.vad_margin_db,
+            hangover_ms=SETTINGS.vad_hangover_ms,
+            min_speech_ms=SETTINGS.vad_min_speech_ms,
+            max_seconds=SETTINGS.vad_max_utterance_seconds,
+        )
+        self.turns: List[Dict[str, float]] = []
+        self._stream: Optional[STTStream] = None
+        self._fed = 0
+        self._response: Optional[asyncio.Task] = None
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception:
+                pass
+
+    def _interrupt(self) -> None:
+        if self._response is not None and not self._response.done():
+            self._response.cancel()
+            self.output.clear()
+
+    def push(self, samples: np.ndarray) -> None:
+        """Add inbound audio; starts a response at each detected end of speech."""
+        self.ring.write(samples)
+        for kind, index in self.endpointer.update():
+            if kind == "start":
+                self._interrupt()
+                self._stream = self.stt() if self.stt is not None else None
+                self._fed = index
+            elif self._stream is not None:
+                stream, self._stream = self._stream, None
+                if kind == "end":
+                    stream.feed(self.ring.read(self._fed, index))
+                    lag = (self.ring.written - index) / SAMPLE_RATE
+                    self._response = asyncio.create_task(self._respond(stream.finish(), lag))
+        if self._stream is not None:
+            self._stream.feed(self.ring.read(self._fed))
+            self._fed = self.ring.written
+
+    async def run(self, audio: AsyncIterator[np.ndarray]) -> None:
+        """Consume inbound audio until it ends, then wait for the last answer."""
+        async for samples in audio:
+            self.push(samples)
+        if self._response is not None:
+            await asyncio.gather(self._response, return_exceptions=True)
+
+    def ask(self, text: str) -> None:
+        """Answer a typed question (data channel) the same way, without STT."""
+        self._interrupt()
+        self._response = asyncio.create_task(self._respond(_done(text), None))
+
+    async def close(self) -> None:
+        if self._response is not None:
+            self._response.cancel()
+            await asyncio.gather(self._response, return_exceptions=True)
+
+    async def _respond(self, transcript: Awaitable[str], lag: Optional[float]) -> None:
+        metrics: Dict[str, float] = {}
+        start = time.perf_counter()
+        if lag is not None:
+            _record("endpoint", lag, metrics)
+        try:
+            text = await transcript
+            _record("stt", time.perf_counter() - start, metrics)
+            if not text:
+                return
+            self._emit({"type": "transcript", "text": text})
+
+            t = time.perf_counter()
+            hits = await retrieve(self.tenant_id, text, top_k=4 * SETTINGS.context_overfetch, with_vectors=True)
+            messages = build_prompt(text, hits, max_snippets=4)
+            _record("retrieve", time.perf_counter() - t, metrics)
+
+            t = time.perf_counter()
+            spoken: List[str] = []
+            first_token = True
+
+            async def tokens() -> AsyncIterator[str]:
+                nonlocal first_token
+                async for chunk in stream_generate(messages, tenant_id=self.tenant_id, priority="voice"):
+                    if first_token:
+                        first_token = False
+                        _record("llm_first_token", time.perf_counter() - t, metrics)
+                    yield chunk
+
+            chunks = tokens()
+            try:
+                async for sentence in split_sentences(chunks):
+                    t_tts = time.perf_counter()
+                    audio = await asyncio.to_thread(self.synthesize, sentence)
+                    if not spoken:
+                        _record("tts", time.perf_counter() - t_tts, metrics)
+                    if audio is not None:
+                        self.output.enqueue(np.frombuffer(audio[1], dtype=np.int16), audio[0])
+                    if not spoken:
+                        _record("first_audio", time.perf_counter() - start, metrics)
+                    spoken.append(sentence)
+            finally:
+                await chunks.aclose()
+            _record("turn", time.perf_counter() - start, metrics)
+            self._emit({"type": "answer", "text": " ".join(spoken)})
+        except QueueFull:
+            self._emit({"type": "busy"})
+        except asyncio.CancelledError:
+            metrics["interrupted"] = 1
+            raise
+        except Exception as exc:
+            logger.warning("voice turn failed", extra={"extra": {"tenant_id": self.tenant_id, "error": str(exc)}})
+        finally:
+            self.turns.append(metrics)
+            self._emit({"type": "metrics", **metrics})
+
+
+async def _done(value: str) -> str:
+    return value
+
+
+def voice_stats() -> Dict[str, Any]:
+    return {stage: stats.as_dict() for stage, stats in _STAGES.items()}
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from typing import AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .llm import stream_generate
+from .scheduler import Ticket
+from .tts import synthesize_to_file
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at . ! or ? followed by whitespace; decimals like 2.5 do not match
+_BOUNDARY = re.compile(r"[.!?](?=\s)")
+_MIN_SENTENCE_CHARS = 24  # shorter sentences are joined with the next one
+_MAX_SENTENCE_CHARS = 240  # longer runs are cut at a comma or space
+_MAX_ANSWER_CHARS = 500  # phone answers stay short
+_TURN_TTL_SECONDS = 300.0
+_FALLBACK = "Sorry, I had trouble answering."
+
+
+def _cut(text: str) -> int:
+    """Index after which ``text`` can be spoken, or 0 to keep buffering."""
+    end = 0
+    for match in _BOUNDARY.finditer(text):
+        if match.end() >= _MIN_SENTENCE_CHARS:
+            end = match.end()
+            break
+    if not end and len(text) > _MAX_SENTENCE_CHARS:
+        head = text[:_MAX_SENTENCE_CHARS]
+        end = max(head.rfind(", ") + 1, head.rfind(" ")) or _MAX_SENTENCE_CHARS
+    return end
+
+
+async def split_sentences(chunks: AsyncIterator[str], max_chars: int = _MAX_ANSWER_CHARS) -> AsyncIterator[str]:
+    """Re-chunk streamed tokens into sentences as soon as each is complete.
+    Stops after about ``max_chars`` characters of answer."""
+    buf = ""
+    total = 0
+    async for chunk in chunks:
+        buf += chunk
+        while True:
+            end = _cut(buf)
+            if not end:
+                break
+            sentence, buf = buf[:end].strip(), buf[end:]
+            if sentence:
+                total += len(sentence)
+                yield sentence
+            if total >= max_chars:
+                return
+    if buf.strip():
+        yield buf.strip()
+
+
+class VoiceTurn:
+    """One spoken answer, synthesized sentence by sentence while the model
+    is still generating. ``segments`` are in speaking order: ("play", audio
+    URL path), or ("say", sentence) where synthesis failed so the telephony
+    side reads the text out itself."""
+
+    def __init__(self, turn_id: str):
+        self.turn_id = turn_id
+        self.segments: List[Tuple[str, str]] = []
+        self.sentences: List[str] = []
+        self.done = False
+        self.created = time.monotonic()
+        self.first_audio: Optional[float] = None  # seconds from start to the first segment
+        self._changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.sentences)
+
+    def _publish(self, segment: Optional[Tuple[str, str]] = None) -> None:
+        if segment is not None:
+            if not self.segments:
+                self.first_audio = time.monotonic() - self.created
+            self.segments.append(segment)
+        self._changed.set()
+
+    async def wait(self, start: int, timeout: float) -> List[Tuple[str, str]]:
+        """Segments from index ``start`` on, waiting up to ``timeout`` for at
+        least one unless the turn is done. Empty means none yet (or none left)."""
+        deadline = time.monotonic() + timeout
+        while len(self.segments) <= start and not self.done:
+            self._changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return self.segments[start:]
+
+
+async def _run(
+    turn: VoiceTurn,
+    chunks: AsyncGenerator[str, None],
+    synthesize: Callable[[str], str],
+    on_done: Optional[Callable[[str], None]],
+) -> None:
+    # Generation feeds sentences into a queue; synthesis drains it in order,
+    # so sentence N is spoken while sentence N+1 is still being generated
+    sentences: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    async def say(sentence: str) -> None:
+        try:
+            turn._publish(("play", await asyncio.to_thread(synthesize, sentence)))
+        except Exception as exc:
+            # No voice (e.g. Piper not installed): the caller still hears the text
+            logger.warning("speech synthesis failed; sending text", extra={"extra": {"turn_id": turn.turn_id, "error": str(exc)}})
+            turn._publish(("say", sentence))
+
+    async def produce() -> None:
+        try:
+            async for sentence in split_sentences(chunks):
+                await sentences.put(sentence)
+        finally:
+            # Closing the stream early releases the scheduler slot right away
+            await chunks.aclose()
+            await sentences.put(None)
+
+    async def speak() -> None:
+        while (sentence := await sentences.get()) is not None:
+            turn.sentences.append(sentence)
+            await say(sentence)
+
+    producer = asyncio.create_task(produce())
+    try:
+        try:
+            await speak()
+            await producer
+        except Exception:
+            pass  # whatever was already spoken stands
+        if not turn.segments:
+            turn.sentences = [_FALLBACK]
+            await say(_FALLBACK)
+    finally:
+        producer.cancel()
+        turn.done = True
+        turn._publish()
+        if on_done is not None:
+            on_done(turn.text)
+
+
+_TURNS: Dict[str, VoiceTurn] = {}
+
+
+def _prune(now: float) -> None:
+    for turn_id in [t for t, turn in _TURNS.items() if turn.done and now - turn.created > _TURN_TTL_SECONDS]:
+        del _TURNS[turn_id]
+
+
+def start_turn(
+    messages: List[Dict],
+    *,
+    ticket: Optional[Ticket] = None,
+    tenant_id: str = "default",
+    synthesize: Optional[Callable[[str], str]] = None,
+    on_done: Optional[Callable[[str], None]] = None,
+) -> VoiceTurn:
+    """Start generating and synthesizing an answer in the background.
+    ``synthesize`` defaults to tts.synthesize_to_file; ``on_done`` receives
+    the spoken text once the turn has finished."""
+    _prune(time.monotonic())
+    turn = VoiceTurn(uuid.uuid4().hex)
+    chunks = stream_generate(messages, tenant_id=tenant_id, priority="voice", ticket=ticket)
+    turn.task = asyncio.create_task(_run(turn, chunks, synthesize or synthesize_to_file, on_done))
+    _TURNS[turn.turn_id] = turn
+    return turn
+
+
+def get_turn(turn_id: str) -> Optional[VoiceTurn]:
+    return _TURNS.get(turn_id)
+
+
+async def shutdown() -> None:
+    tasks = [turn.task for turn in _TURNS.values() if turn.task is not None and not turn.task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _TURNS.clear()
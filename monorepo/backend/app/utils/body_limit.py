@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _detail(limit_bytes: int) -> str:
+    return f"Request body exceeds the {limit_bytes // (1024 * 1024)} MB limit"
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than ``limit(path)`` bytes with 413.
+
+    Starlette spools a whole multipart body to temp files before the route
+    runs, so size checks in the route only bound what is kept, not what is
+    received. A Content-Length over the limit is refused before the body is
+    read; bodies without one are counted as they arrive and cut off once
+    they pass the limit.
+    """
+
+    def __init__(self, app: ASGIApp, limit: Callable[[str], int]):
+        self.app = app
+        self.limit = limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.limit(scope["path"])
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": _detail(limit)}, status_code=status.HTTP_413_CONTENT_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside body parsing; FastAPI passes HTTPException through
+                    raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=_detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1 @@
+"""Micro-benchmarks run against local stand-ins (python -m benchmarks.<name>)."""
@@ -0,0 +1,100 @@
+"""Time to first token per conversation turn, with and without session context.
+
+Runs multi-turn conversations against the fake Ollama server, whose prefill
+cost grows with the tokens it has not seen before, in three modes:
+
+- resend: every turn resends all earlier prompts and answers as text
+  (client-held history), so the whole conversation is prefilled each time
+- history: server-side session without Ollama's context; earlier questions
+  and answers are re-prefilled, earlier retrieved context is not
+- context: server-side session sending back Ollama's returned context, so
+  only the new turn is prefilled (what /chat does with a session_id)
+
+Usage: python -m benchmarks.bench_chat_sessions [--conversations 8] [--turns 5] [--prefill-ms 0.4]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import SETTINGS
+from app.services import ollama
+from app.services.llm import stream_generate
+from app.services.sessions import SessionStore
+
+from .fake_ollama import FakeOllamaConfig, run_fake_ollama
+
+_SYSTEM = {"role": "system", "content": "Use the provided CONTEXT to answer. If unsure, say you don't know."}
+
+
+def _turn_prompt(conversation: int, turn: int) -> tuple[str, Dict[str, str]]:
+    # About the size of a packed prompt: CONTEXT_MAX_TOKENS of snippets plus the question
+    question = f"Follow-up question {turn} about the caliper?"
+    context = " ".join(f"Snippet {conversation}.{turn}.{i}: torque the caliper bolts to spec." for i in range(60))
+    return question, {"role": "user", "content": f"CONTEXT:\n{context}\n\nQUESTION: {question}"}
+
+
+async def _turn(messages: List[Dict], context: Optional[List[int]]) -> tuple[float, str, Optional[List[int]]]:
+    result: Dict[str, Any] = {}
+    start = time.perf_counter()
+    ttft = 0.0
+    parts: List[str] = []
+    async for piece in stream_generate(messages, context=context, result=result):
+        if not parts:
+            ttft = time.perf_counter() - start
+        parts.append(piece)
+    return ttft, "".join(parts), result.get("context")
+
+
+async def _conversation(mode: str, index: int, turns: int, store: SessionStore) -> List[float]:
+    session = store.open("bench", None, f"{mode}-{index}")
+    sent: List[Dict] = []  # resend mode: every prompt and answer so far
+    ttfts = []
+    for turn in range(turns):
+        question, prompt = _turn_prompt(index, turn)
+        if mode == "resend":
+            messages, context = [_SYSTEM, *sent, prompt], None
+        elif mode == "history" or session.context is None:
+            messages, context = [_SYSTEM, *session.history, prompt], None
+        else:
+            messages, context = [prompt], list(session.context)
+        ttft, answer, new_context = await _turn(messages, context)
+        ttfts.append(ttft)
+        sent += [prompt, {"role": "assistant", "content": answer}]
+        store.finish_turn(session, session.turns, question, answer, new_context if mode == "context" else None)
+    return ttfts
+
+
+async def _run(mode: str, conversations: int, turns: int) -> List[List[float]]:
+    await ollama.shutdown()
+    store = SessionStore(max_sessions=conversations, idle_seconds=3600, max_turns=turns)
+    # Conversations run one after another: the fake server is a single device
+    runs = [await _conversation(mode, i, turns, store) for i in range(conversations)]
+    await ollama.shutdown()
+    return runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--prefill-ms", type=float, default=0.4, help="fake server prefill cost per new prompt token")
+    args = parser.parse_args()
+
+    SETTINGS.session_max_context_tokens = 1 << 20
+    cfg = FakeOllamaConfig(prefill_token_ms=args.prefill_ms, decode_token_ms=1.0, answer_tokens=40)
+    with run_fake_ollama(cfg) as base:
+        SETTINGS.ollama_base = base
+        print(f"{args.conversations} conversations x {args.turns} turns; median time to first token (ms) by turn")
+        print(f"{'mode':>8}  " + "  ".join(f"turn{t + 1:>3}" for t in range(args.turns)))
+        for mode in ("resend", "history", "context"):
+            runs = asyncio.run(_run(mode, args.conversations, args.turns))
+            by_turn = [statistics.median(run[t] for run in runs) * 1000 for t in range(args.turns)]
+            print(f"{mode:>8}  " + "  ".join(f"{ms:7.1f}" for ms in by_turn))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Fixed character windows vs. the structure-aware chunker.
+
+Chunks the documents under --docs (default: DATA_DIR/docs; a synthetic
+service-manual corpus when none are found), embeds them through the fake
+Ollama server and measures recall@k. Recall is measured lexically: each
+query is a sampled sentence with words dropped, and it counts as a hit when
+a top-k BM25 result contains the whole sentence, i.e. the chunk could
+answer it.
+
+Usage: python -m benchmarks.bench_chunking [--docs DIR] [--queries 300] [--top-k 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from app.config import SETTINGS
+from app.services import ollama, storage
+from app.services.chunk import chunk_text, estimate_tokens, iter_chunks
+from app.services.embed import embed_documents
+from app.services.lexical import BM25Index
+
+from .fake_ollama import FakeOllamaConfig, run_fake_ollama
+
+Pages = List[Tuple[int, str]]
+
+
+def _synthetic_corpus(docs: int = 12, rng: random.Random = random.Random(7)) -> List[Pages]:
+    parts = ["caliper", "rotor", "pad", "hose", "bleeder", "sensor", "bracket", "piston"]
+    corpus = []
+    for d in range(docs):
+        pages = []
+        for p in range(1, 9):
+            paragraphs = []
+            for s in range(rng.randint(2, 5)):
+                sentences = [
+                    f"Section {d}.{p}.{s}: inspect the {rng.choice(parts)} for wear and replace it when below {rng.randint(2, 9)} mm."
+                    for _ in range(rng.randint(2, 7))
+                ]
+                paragraphs.append(" ".join(sentences))
+            rows = [f"| {rng.choice(parts)} | PN-{d}{p}{r:03d} | {rng.randint(10, 90)} Nm |" for r in range(rng.randint(0, 12))]
+            if rows:
+                paragraphs.append("\n".join(rows))
+            pages.append((p, "\n\n".join(paragraphs)))
+        corpus.append(pages)
+    return corpus
+
+
+async def _load(docs_dir: Path) -> List[Pages]:
+    corpus = []
+    for path in sorted(docs_dir.rglob("*")):
+        if path.suffix.lower() in {".pdf", ".docx", ".txt", ".md"}:
+            pages = [page async for page in storage.stream_pages(path)]
+            if any(text.strip() for _, text in pages):
+                corpus.append(pages)
+    return corpus
+
+
+def _fixed(pages: Pages) -> Pages:
+    # What ingest did before: one string per document, 1200/150 char windows
+    return [(0, chunk) for chunk in chunk_text("\n".join(text for _, text in pages))]
+
+
+def _structured(pages: Pages) -> Pages:
+    return list(iter_chunks(pages))
+
+
+def _queries(corpus: List[Pages], count: int, rng: random.Random) -> List[Tuple[str, str]]:
+    sentences = [
+        " ".join(s.split())
+        for pages in corpus
+        for _, text in pages
+        for s in re.split(r"(?<=[.!?])\s+", text)
+        if len(s) >= 40 and "|" not in s
+    ]
+    picked = rng.sample(sentences, min(count, len(sentences)))
+    out = []
+    for sentence in picked:
+        words = sentence.split()
+        kept = [w for w in words if rng.random() > 0.3] or words
+        out.append((" ".join(kept), sentence))
+    return out
+
+
+async def _run(name: str, strategy: Callable[[Pages], Pages], corpus: List[Pages], queries, top_k: int) -> None:
+    await ollama.shutdown()
+    start = time.perf_counter()
+    chunks = [text for pages in corpus for _, text in strategy(pages)]
+    chunk_s = time.perf_counter() - start
+    await embed_documents(chunks)
+    ingest_s = time.perf_counter() - start
+    await ollama.shutdown()
+
+    index = BM25Index()
+    index.upsert([(str(i), None, {"text": text}) for i, text in enumerate(chunks)])
+    hits = 0
+    for query, sentence in queries:
+        results = index.search(query, top_k=top_k)
+        hits += any(sentence in " ".join(r["document"].split()) for r in results)
+    tokens = sum(estimate_tokens(c) for c in chunks) / max(1, len(chunks))
+    print(
+        f"{name:>11}: {len(chunks):6d} chunks  {tokens:6.1f} tok/chunk  "
+        f"chunk {chunk_s * 1000:7.1f}ms  ingest {ingest_s:6.2f}s  recall@{top_k} {hits / max(1, len(queries)):.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", default=str(Path(SETTINGS.data_dir) / "docs"))
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    docs_dir = Path(args.docs)
+    corpus = asyncio.run(_load(docs_dir)) if docs_dir.is_dir() else []
+    storage.shutdown_extractors()
+    source = f"{len(corpus)} documents from {docs_dir}"
+    if not corpus:
+        corpus = _synthetic_corpus()
+        source = f"{len(corpus)} synthetic documents"
+    queries = _queries(corpus, args.queries, random.Random(11))
+    print(f"{source}, {len(queries)} queries, chunk budget {SETTINGS.chunk_max_tokens} tokens")
+
+    # Per-item cost dominates on real servers, so fewer chunks means faster ingest
+    with run_fake_ollama(FakeOllamaConfig(embed_item_ms=4.0)) as base:
+        SETTINGS.ollama_base = base
+        asyncio.run(_run("fixed-1200", _fixed, corpus, queries, args.top_k))
+        asyncio.run(_run("structured", _structured, corpus, queries, args.top_k))
+
+
+if __name__ == "__main__":
+    main()
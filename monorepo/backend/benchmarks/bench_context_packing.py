@@ -0,0 +1,172 @@
+"""Prompt context: rank-order character packing vs. MMR token packing.
+
+Builds a corpus where near-duplicate chunks are common (each manual exists
+in three lightly edited revisions and shares safety boilerplate), stores it
+in a temporary NumpyStore and, per query, packs a prompt both ways:
+
+- before: the top-k hits in rank order up to 4000 characters, deduplicated
+  on (doc_id, page) only
+- after@N: top_k * CONTEXT_OVERFETCH candidates, MMR-ordered and packed
+  to a budget of N tokens (rag.pack_prompt)
+
+It reports prompt tokens, distinct sentences in the context, packing time,
+and time to first token from the fake Ollama server, whose prefill cost
+grows with prompt length. Embeddings are bag-of-words hashes, so similar
+text gets similar vectors, as with a real embedding model.
+
+Usage: python -m benchmarks.bench_context_packing [--queries 40] [--top-k 5] [--budgets 1000,700] [--prefill-ms 0.4]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+
+from app.config import SETTINGS
+from app.services import ollama
+from app.services.chunk import estimate_tokens, iter_chunks
+from app.services.llm import _messages_to_prompt, stream_generate
+from app.services.rag import pack_prompt
+from app.services.vector import NumpyStore
+
+from .fake_ollama import FakeOllamaConfig, run_fake_ollama
+
+_DIM = 512
+_PARTS = ["caliper", "rotor", "pad", "hose", "bleeder", "sensor", "bracket", "piston", "shim", "clip"]
+_SAFETY = (
+    "Safety: always support the vehicle on stands before working underneath it. "
+    "Wear eye protection when handling brake fluid, and never reuse self-locking fasteners."
+)
+
+
+def _embed(text: str) -> np.ndarray:
+    vec = np.zeros(_DIM, dtype=np.float32)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+        vec[h % _DIM] += 1.0 if (h >> 32) & 1 else -1.0
+    return vec / (np.linalg.norm(vec) or 1.0)
+
+
+def _corpus(manuals: int, rng: random.Random) -> List[Tuple[str, List[Tuple[int, str]]]]:
+    docs = []
+    for m in range(manuals):
+        pages = []
+        for p in range(1, 7):
+            part = _PARTS[(m + p) % len(_PARTS)]
+            sentences = [
+                f"Model {m} {part} step {s}: inspect the {part} and replace it below {rng.randint(2, 9)} mm, torque to {rng.randint(20, 90)} Nm."
+                for s in range(rng.randint(6, 10))
+            ]
+            pages.append((p, " ".join(sentences) + "\n\n" + _SAFETY))
+        for rev in range(3):
+            # Revisions change a number here and there; most chunks stay near-identical
+            edited = [(p, re.sub(r"\b(\d+) Nm", lambda x: f"{int(x.group(1)) + (rng.random() < 0.1)} Nm", text)) for p, text in pages]
+            docs.append((f"model{m}-rev{rev}", edited))
+    return docs
+
+
+def _legacy_prompt(question: str, hits: List[Dict[str, Any]], max_snippets: int = 8, max_chars: int = 4000) -> List[Dict]:
+    # build_prompt before diversity packing: rank order, character cap, (doc_id, page) dedup
+    seen: Set[Tuple[Any, Any]] = set()
+    lines: List[str] = []
+    total = 0
+    for h in hits:
+        if len(lines) >= max_snippets or total >= max_chars:
+            break
+        meta = h["metadata"]
+        key = (meta["doc_id"], meta["page"])
+        if key in seen:
+            continue
+        seen.add(key)
+        snippet = f"[{len(lines) + 1}] Source: {meta['filename']} p.{meta['page']}\n{meta['text']}"
+        snippet = snippet[: max_chars - total]
+        lines.append(snippet)
+        total += len(snippet) + 2
+    context = "\n\n".join(lines)
+    return [
+        {"role": "system", "content": "Use the provided CONTEXT to answer. If unsure, say you don't know."},
+        {"role": "user", "content": f"CONTEXT:\n{context}\n\nQUESTION: {question}"},
+    ]
+
+
+def _distinct_sentences(messages: List[Dict]) -> int:
+    context = messages[-1]["content"].split("CONTEXT:", 1)[-1]
+    return len({" ".join(s.split()) for s in re.split(r"(?<=[.!?])\s+", context) if len(s) > 30})
+
+
+async def _ttft(messages: List[Dict]) -> float:
+    start = time.perf_counter()
+    stream = stream_generate(messages)
+    try:
+        await stream.__anext__()
+        return time.perf_counter() - start
+    finally:
+        await stream.aclose()
+
+
+async def _run(store: NumpyStore, queries: List[str], top_k: int, budgets: List[int]) -> None:
+    results: Dict[str, Dict[str, List[float]]] = {}
+    for question in queries:
+        qvec = _embed(question)
+        start = time.perf_counter()
+        hits = store.query(qvec.tolist(), top_k=top_k)
+        runs = [("before", _legacy_prompt(question, hits), (time.perf_counter() - start) * 1000)]
+        for budget in budgets:
+            start = time.perf_counter()
+            candidates = store.query(qvec.tolist(), top_k=top_k * SETTINGS.context_overfetch, with_vectors=True)
+            packed = pack_prompt(question, candidates, query_vector=qvec.tolist(), max_snippets=top_k, max_tokens=budget)
+            runs.append((f"after@{budget}", packed.messages, (time.perf_counter() - start) * 1000))
+        for label, messages, ms in runs:
+            row = results.setdefault(label, {})
+            row.setdefault("tokens", []).append(estimate_tokens(_messages_to_prompt(messages)))
+            row.setdefault("distinct", []).append(_distinct_sentences(messages))
+            row.setdefault("pack_ms", []).append(ms)
+            row.setdefault("ttft", []).append(await _ttft(messages))
+    await ollama.shutdown()
+    for label, row in results.items():
+        print(
+            f"{label:>10}: prompt {statistics.mean(row['tokens']):7.1f} tok  "
+            f"distinct sentences {statistics.mean(row['distinct']):5.1f}  "
+            f"retrieve+pack {statistics.mean(row['pack_ms']):6.2f}ms  "
+            f"ttft p50 {statistics.median(row['ttft']) * 1000:7.1f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manuals", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--budgets", default=f"1000,{SETTINGS.context_max_tokens}", help="context token budgets to try")
+    parser.add_argument("--prefill-ms", type=float, default=0.4, help="fake server prefill cost per prompt token")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyStore(tmp, "bench")
+        items = []
+        for doc_id, pages in _corpus(args.manuals, rng):
+            for n, (page, text) in enumerate(iter_chunks(pages)):
+                meta = {"doc_id": doc_id, "filename": f"{doc_id}.pdf", "page": page, "text": text}
+                items.append((f"{doc_id}-{n}", _embed(text).tolist(), meta))
+        store.upsert(items)
+        queries = [
+            f"What torque for the model {rng.randrange(args.manuals)} {rng.choice(_PARTS)}?" for _ in range(args.queries)
+        ]
+        print(f"{len(items)} chunks, {len(queries)} queries, top_k {args.top_k}")
+        with run_fake_ollama(FakeOllamaConfig(prefill_token_ms=args.prefill_ms, answer_tokens=4)) as base:
+            SETTINGS.ollama_base = base
+            asyncio.run(_run(store, queries, args.top_k, [int(b) for b in args.budgets.split(",")]))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
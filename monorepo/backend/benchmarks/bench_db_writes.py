@@ -0,0 +1,75 @@
+"""Chat-log write throughput on a tenant SQLite file under concurrent requests.
+
+Each writer thread commits one ChatLog row per session, as chat._log_chat
+does, against two engines for a fresh database file:
+
+- default: create_engine(dsn) with SQLite's defaults (rollback journal,
+  synchronous=FULL), as tenant engines were created before
+- tuned: db.make_engine (WAL, synchronous=NORMAL, mmap, busy timeout, sized pool)
+
+Usage: python -m benchmarks.bench_db_writes [--writers 8] [--rows 200]
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.services.db import Base, ChatLog, make_engine
+
+
+def _run(engine: Engine, writers: int, rows: int) -> Tuple[float, int]:
+    Base.metadata.create_all(engine)
+    errors = 0
+    lock = threading.Lock()
+
+    def write(n: int) -> None:
+        nonlocal errors
+        for i in range(rows):
+            try:
+                with Session(engine) as session:
+                    session.add(ChatLog(site_id="bench", customer_id=f"c{n}", question=f"question {i}", answer="answer " * 40))
+                    session.commit()
+            except Exception:
+                with lock:
+                    errors += 1
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=200, help="rows committed per writer")
+    args = parser.parse_args()
+
+    engines: Tuple[Tuple[str, Callable[[str], Engine]], ...] = (
+        ("default", lambda dsn: create_engine(dsn, pool_pre_ping=True)),
+        ("tuned", make_engine),
+    )
+    total = args.writers * args.rows
+    print(f"{args.writers} writers x {args.rows} commits")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, factory in engines:
+            dsn = f"sqlite:///{Path(tmp) / f'{label}.db'}"
+            elapsed, errors = _run(factory(dsn), args.writers, args.rows)
+            print(f"{label:>8}: {elapsed:6.2f}s  {(total - errors) / elapsed:8.0f} rows/s  {errors} failed")
+
+
+if __name__ == "__main__":
+    main()
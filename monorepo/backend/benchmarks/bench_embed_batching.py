@@ -0,0 +1,48 @@
+"""Concurrent single-query embeddings with and without the micro-batcher.
+
+Usage: python -m benchmarks.bench_embed_batching [--requests 400] [--concurrency 64]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.config import SETTINGS
+from app.services import embed, ollama
+
+from .fake_ollama import FakeOllamaConfig, run_fake_ollama
+
+
+async def _run(requests: int, concurrency: int, max_items: int) -> float:
+    embed._BATCHER = embed._EmbedBatcher(max_items, SETTINGS.embed_batch_max_wait_ms)
+    await ollama.shutdown()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with gate:
+            await embed.embed_texts([f"question number {i}"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await ollama.shutdown()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    with run_fake_ollama(FakeOllamaConfig()) as base:
+        SETTINGS.ollama_base = base
+        for label, max_items in (("unbatched", 1), (f"batched(max={args.batch})", args.batch)):
+            elapsed = asyncio.run(_run(args.requests, args.concurrency, max_items))
+            print(f"{label:>20}: {elapsed:6.2f}s  {args.requests / elapsed:8.1f} embeds/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Phone-turn synthesis latency: one TTS process per utterance vs. the worker pool.
+
+Uses the stand-in worker (benchmarks/fake_piper.py) with a model load time
+and a per-character synthesis cost, in two modes:
+
+- spawn: start a worker per utterance, synthesize, exit (what a Piper CLI
+  call per sentence costs: the voice model is loaded every time)
+- pool: piper_pool.VoicePool with the model loaded once per worker
+
+Usage: python -m benchmarks.bench_piper_pool [--utterances 20] [--load-ms 300] [--ms-per-char 2]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from app.services.piper_pool import PiperProcess, VoicePool
+
+_SENTENCES = [
+    "Thanks for calling, how can I help?",
+    "We are open nine to five on weekdays.",
+    "On Saturday we open at ten in the morning.",
+    "You can ask another question.",
+]
+
+
+def _spawn(command: List[str], texts: List[str]) -> List[float]:
+    times = []
+    for text in texts:
+        start = time.perf_counter()
+        worker = PiperProcess(command, timeout=30)
+        worker.start()
+        worker.synthesize(text)
+        worker.close()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _pool(command: List[str], texts: List[str]) -> List[float]:
+    pool = VoicePool("bench", command, size=1, max_queue=4, timeout=30)
+    pool.synthesize("warm up")  # the pool starts with the app, not on the first call
+    times = []
+    try:
+        for text in texts:
+            start = time.perf_counter()
+            pool.synthesize(text)
+            times.append(time.perf_counter() - start)
+    finally:
+        pool.close()
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=20)
+    parser.add_argument("--load-ms", type=float, default=300.0, help="stand-in voice model load time")
+    parser.add_argument("--ms-per-char", type=float, default=2.0, help="stand-in synthesis time per character")
+    args = parser.parse_args()
+
+    command = [
+        sys.executable,
+        str(Path(__file__).with_name("fake_piper.py")),
+        "--load-ms",
+        str(args.load_ms),
+        "--ms-per-char",
+        str(args.ms_per_char),
+    ]
+    texts = [_SENTENCES[i % len(_SENTENCES)] for i in range(args.utterances)]
+    print(f"{len(texts)} utterances; model load {args.load_ms}ms, synthesis {args.ms_per_char}ms/char")
+    for label, run in (("spawn", _spawn), ("pool", _pool)):
+        times = run(command, texts)
+        print(f"{label:>6}: p50 {statistics.median(times) * 1000:7.1f}ms  max {max(times) * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
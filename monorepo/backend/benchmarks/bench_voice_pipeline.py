@@ -0,0 +1,98 @@
+"""Time to first audio for a phone answer: whole-answer TTS vs. sentence pipelining.
+
+Generates answers from the fake Ollama server at a CPU-like decode rate and
+synthesizes them with a stand-in TTS whose cost grows with text length
+(Piper's shape), in two modes:
+
+- before: stream until more than 500 characters, then synthesize the whole
+  text and return one <Play> (what /twilio/handle used to do)
+- after: voice_turns.start_turn, which synthesizes each sentence as soon as
+  it is complete; the first <Play> goes out with the first segment
+
+Usage: python -m benchmarks.bench_voice_pipeline [--calls 10] [--decode-ms 20] [--tts-ms-per-char 4]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from app.config import SETTINGS
+from app.services import ollama
+from app.services.llm import stream_generate
+from app.services.voice_turns import start_turn
+
+from .fake_ollama import FakeOllamaConfig, run_fake_ollama
+
+_MESSAGES = [
+    {"role": "system", "content": "Use the provided CONTEXT to answer. If unsure, say you don't know."},
+    {"role": "user", "content": "CONTEXT:\n[1] Source: hours.txt p.1\nOpen 9-5 on weekdays.\n\nQUESTION: When are you open?"},
+]
+
+
+def _stand_in_tts(overhead_ms: float, ms_per_char: float) -> Callable[[str], str]:
+    def synthesize(text: str) -> str:
+        time.sleep((overhead_ms + ms_per_char * len(text)) / 1000.0)
+        return "/static/audio/bench.wav"
+
+    return synthesize
+
+
+async def _before(synthesize: Callable[[str], str]) -> Dict[str, float]:
+    start = time.perf_counter()
+    text: List[str] = []
+    stream = stream_generate(_MESSAGES, priority="voice")
+    try:
+        async for chunk in stream:
+            text.append(chunk)
+            if len("".join(text)) > 500:
+                break
+    finally:
+        await stream.aclose()
+    await asyncio.to_thread(synthesize, "".join(text))
+    ttfa = time.perf_counter() - start
+    return {"ttfa": ttfa, "total": ttfa}
+
+
+async def _after(synthesize: Callable[[str], str]) -> Dict[str, float]:
+    start = time.perf_counter()
+    turn = start_turn(_MESSAGES, synthesize=synthesize)
+    await turn.wait(0, timeout=60)
+    ttfa = time.perf_counter() - start
+    await turn.task
+    return {"ttfa": ttfa, "total": time.perf_counter() - start}
+
+
+async def _run(mode: str, calls: int, synthesize: Callable[[str], str]) -> List[Dict[str, float]]:
+    await ollama.shutdown()
+    run = _before if mode == "before" else _after
+    # Calls run one after another: the fake server is a single device
+    results = [await run(synthesize) for _ in range(calls)]
+    await ollama.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--decode-ms", type=float, default=20.0, help="fake server time per generated token")
+    parser.add_argument("--tts-overhead-ms", type=float, default=60.0, help="stand-in TTS cost per call")
+    parser.add_argument("--tts-ms-per-char", type=float, default=4.0, help="stand-in TTS cost per character")
+    args = parser.parse_args()
+
+    synthesize = _stand_in_tts(args.tts_overhead_ms, args.tts_ms_per_char)
+    cfg = FakeOllamaConfig(decode_token_ms=args.decode_ms, answer_tokens=120, sentence_words=10)
+    with run_fake_ollama(cfg) as base:
+        SETTINGS.ollama_base = base
+        print(f"{args.calls} calls; decode {args.decode_ms}ms/token, TTS {args.tts_overhead_ms}ms + {args.tts_ms_per_char}ms/char")
+        for mode in ("before", "after"):
+            results = asyncio.run(_run(mode, args.calls, synthesize))
+            ttfa = statistics.median(r["ttfa"] for r in results) * 1000
+            total = statistics.median(r["total"] for r in results) * 1000
+            print(f"{mode:>7}: time to first audio p50 {ttfa:7.1f}ms  all audio ready p50 {total:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Local stand-in for the Ollama HTTP API used by the benchmarks.
+
+The model server is emulated as a single device: requests are serialized
+behind a lock and cost a fixed overhead plus a per-item (embeddings) or
+per-token (generation) amount of time, which is the shape that makes
+batching and prefill reuse pay off on a real server.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+@dataclass
+class FakeOllamaConfig:
+    dim: int = 768
+    request_overhead_ms: float = 8.0
+    embed_item_ms: float = 0.5
+    prefill_token_ms: float = 0.05
+    decode_token_ms: float = 5.0
+    answer_tokens: int = 40
+    sentence_words: int = 0  # end a sentence every N answer tokens; 0 never does
+
+
+def _fake_vector(text: str, dim: int) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vec /= np.linalg.norm(vec) or 1.0
+    return vec.tolist()
+
+
+def _prompt_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def create_app(cfg: FakeOllamaConfig) -> FastAPI:
+    app = FastAPI()
+    device = asyncio.Lock()
+    app.state.requests = 0
+
+    async def _busy(ms: float) -> None:
+        await asyncio.sleep(ms / 1000.0)
+
+    @app.post("/api/embed")
+    async def embed(request: Request) -> dict:
+        body = await request.json()
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        async with device:
+            app.state.requests += 1
+            await _busy(cfg.request_overhead_ms + cfg.embed_item_ms * len(inputs))
+        return {"model": body.get("model"), "embeddings": [_fake_vector(t, cfg.dim) for t in inputs]}
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request) -> dict:
+        body = await request.json()
+        async with device:
+            app.state.requests += 1
+            await _busy(cfg.request_overhead_ms + cfg.embed_item_ms)
+        return {"embedding": _fake_vector(str(body.get("prompt", "")), cfg.dim)}
+
+    def _generation(prompt: str, context: List[int]) -> tuple[float, List[str], List[int]]:
+        # Tokens already in the supplied context are not prefilled again
+        new_tokens = _prompt_tokens(prompt)
+        prefill_ms = cfg.request_overhead_ms + cfg.prefill_token_ms * new_tokens
+        n = cfg.sentence_words
+        words = [f"word{i}. " if n and (i + 1) % n == 0 else f"word{i} " for i in range(cfg.answer_tokens)]
+        next_context = list(context) + list(range(new_tokens + cfg.answer_tokens))
+        return prefill_ms, words, next_context
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        prefill_ms, words, next_context = _generation(str(body.get("prompt", "")), body.get("context") or [])
+        if not body.get("stream", True):
+            async with device:
+                app.state.requests += 1
+                await _busy(prefill_ms + cfg.decode_token_ms * len(words))
+            return {"response": "".join(words), "done": True, "context": next_context}
+
+        async def _lines():
+            async with device:
+                app.state.requests += 1
+                await _busy(prefill_ms)
+                for w in words:
+                    await _busy(cfg.decode_token_ms)
+                    yield json.dumps({"response": w, "done": False}) + "\n"
+            yield json.dumps({"response": "", "done": True, "context": next_context}) + "\n"
+
+        return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+@contextmanager
+def run_fake_ollama(cfg: FakeOllamaConfig | None = None) -> Iterator[str]:
+    """Serve the fake API on an ephemeral localhost port; yields its base URL."""
+    server = uvicorn.Server(uvicorn.Config(create_app(cfg or FakeOllamaConfig()), host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
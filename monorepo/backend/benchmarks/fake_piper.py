@@ -0,0 +1,46 @@
+"""Local stand-in for the Piper worker: same frame protocol, synthetic audio.
+
+A sine tone of 10ms per character. The texts "crash" and "hang" make the
+worker exit or stall mid-request, to exercise the pool's restarts.
+
+Usage: python benchmarks/fake_piper.py [--load-ms 0] [--ms-per-char 0]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.piper_worker import serve  # noqa: E402
+
+_RATE = 16000
+
+
+def _tone(text: str, ms_per_char: float):
+    if text == "crash":
+        os._exit(3)
+    if text == "hang":
+        time.sleep(3600)
+    time.sleep(ms_per_char * len(text) / 1000.0)
+    samples = _RATE * len(text) // 100
+    for start in range(0, samples, 1600):
+        n = min(1600, samples - start)
+        yield struct.pack(f"<{n}h", *(int(8000 * math.sin(2 * math.pi * 440 * (start + i) / _RATE)) for i in range(n)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--load-ms", type=float, default=0.0, help="simulated voice model load time")
+    parser.add_argument("--ms-per-char", type=float, default=0.0, help="simulated synthesis time")
+    args = parser.parse_args()
+    time.sleep(args.load_ms / 1000.0)
+    serve(lambda text: (_RATE, _tone(text, args.ms_per_char)), sys.stdin.buffer, sys.stdout.buffer)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,47 @@
 import os
 import sys
 
+import pytest
+
 # Ensure the backend root (containing the 'app' package) is on sys.path
 BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BACKEND_ROOT not in sys.path:
     sys.path.insert(0, BACKEND_ROOT)
+
+
+@pytest.fixture
+def chat_client(monkeypatch):
+    """TestClient for a bare app with the chat router; embedding, retrieval
+    and generation are faked and caches/sessions start empty. Returns
+    (client, calls): each generate() call is recorded as (messages, context)
+    and answered with "answer N"."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import chat
+    from app.services import answer_cache, sessions
+    from app.services.answer_cache import AnswerCache
+    from app.services.sessions import SessionStore
+
+    calls = []
+
+    async def fake_embed_query(text):
+        return [1.0, 0.0]
+
+    async def fake_retrieve(tenant_id, question, top_k=5, where=None, with_vectors=False):
+        return [{"score": 0.2, "metadata": {"filename": "hours.txt", "page": 1, "text": "Open 9-5"}}]
+
+    async def fake_generate(messages, context=None, result=None, ticket=None):
+        ticket.release()
+        calls.append((messages, context))
+        result["context"] = list(context or []) + [len(calls)] * 3
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr(chat, "embed_query", fake_embed_query)
+    monkeypatch.setattr(chat, "retrieve", fake_retrieve)
+    monkeypatch.setattr(chat, "generate", fake_generate)
+    monkeypatch.setattr(answer_cache, "_ANSWERS", AnswerCache(threshold=0.95, max_entries=8, ttl_seconds=60))
+    monkeypatch.setattr(sessions, "_SESSIONS", SessionStore(max_sessions=8, idle_seconds=60, max_turns=10))
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1")
+    return TestClient(app), calls
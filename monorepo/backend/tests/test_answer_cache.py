@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services.answer_cache import AnswerCache
+
+
+def test_similar_questions_hit_and_ingest_invalidates():
+    cache = AnswerCache(threshold=0.9, max_entries=8, ttl_seconds=60)
+    cache.store("t1", None, [1.0, 0.0], "hours?", "9 to 5", [{"source": "a.txt", "page": 1, "score": 0.1}])
+    hit = cache.lookup("t1", None, [0.99, 0.05])
+    assert hit is not None and hit.answer == "9 to 5"
+    assert cache.lookup("t1", None, [0.0, 1.0]) is None
+    # Scoped per tenant and per customer
+    assert cache.lookup("t2", None, [1.0, 0.0]) is None
+    assert cache.lookup("t1", "cust", [1.0, 0.0]) is None
+    cache.invalidate_tenant("t1")
+    assert cache.lookup("t1", None, [1.0, 0.0]) is None
+
+
+def test_chat_json_serves_repeat_question_from_cache(chat_client):
+    client, calls = chat_client
+    body = {"message": "What are your hours?", "tenant": "cache_test"}
+    first = client.post("/api/v1/chat", json=body).json()
+    second = client.post("/api/v1/chat", json=body).json()
+    assert first["cached"] is False and second["cached"] is True
+    assert second["answer"] == first["answer"] == "answer 1"
+    assert second["citations"] == first["citations"]
+    assert len(calls) == 1
+
+    r = client.post("/api/v1/chat/stream", json=body)
+    assert r.headers["X-Answer-Cache"] == "hit"
+    assert r.text == "answer 1"
+
+
+def test_buckets_are_lru_bounded_and_external_ingest_invalidates():
+    generation = {"t1": "1"}
+    cache = AnswerCache(threshold=0.9, max_entries=8, ttl_seconds=60, max_buckets=2, generation=generation.get, check_seconds=0)
+    asyncio.run(cache.check_generation("t1"))
+    cache.store("t1", "a", [1.0, 0.0], "q", "answer a", [])
+    cache.store("t1", "b", [1.0, 0.0], "q", "answer b", [])
+    assert cache.lookup("t1", "a", [1.0, 0.0]) is not None  # b is now least recently used
+    cache.store("t1", "c", [1.0, 0.0], "q", "answer c", [])
+    assert cache.stats()["buckets"] == 2
+    assert cache.lookup("t1", "b", [1.0, 0.0]) is None
+
+    asyncio.run(cache.check_generation("t1"))  # unchanged
+    assert cache.lookup("t1", "a", [1.0, 0.0]) is not None
+    generation["t1"] = "2"  # another process ingested a document
+    asyncio.run(cache.check_generation("t1"))
+    assert cache.lookup("t1", "a", [1.0, 0.0]) is None
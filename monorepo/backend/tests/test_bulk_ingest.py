@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.main import app
+from app.services import db, ingest_jobs, pipeline
+
+
+class _Store:
+    def __init__(self):
+        self.calls = []
+
+    async def aupsert(self, items):
+        self.calls.append(len(items))
+        return len(items)
+
+    async def adelete(self, ids):
+        return len(ids)
+
+
+class _Lexical:
+    def upsert(self, items):
+        return len(items)
+
+    def delete(self, ids):
+        return len(ids)
+
+
+@pytest.fixture
+def bulk_env(tmp_path, monkeypatch):
+    dsn = f"sqlite:///{tmp_path / 't1.db'}"
+    engine = create_engine(dsn)
+    db.Base.metadata.create_all(engine)
+    monkeypatch.setattr(db.SETTINGS, "default_sql_dsn", dsn)  # every tenant's database
+    monkeypatch.setitem(db._engines, dsn, engine)
+
+    async def fake_embed(texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    store = _Store()
+    monkeypatch.setattr(pipeline, "get_store", lambda tenant_id: store)
+    monkeypatch.setattr(pipeline, "get_lexical_index", lambda tenant_id: _Lexical())
+    monkeypatch.setattr(pipeline, "embed_documents", fake_embed)
+    monkeypatch.setattr(pipeline.SETTINGS, "data_dir", str(tmp_path / "data"))
+    monkeypatch.setattr(pipeline.SETTINGS, "admin_api_key", "admin")
+    monkeypatch.setattr(pipeline.SETTINGS, "site_api_keys", {})
+    monkeypatch.setattr(pipeline.SETTINGS, "bulk_upsert_batch", 50)
+    monkeypatch.setattr(pipeline.SETTINGS, "bulk_claim_files", 50)
+    return store
+
+
+HEADERS = {"X-Admin-Key": "admin", "X-Tenant-Id": "t1"}
+
+
+def _doc(i):
+    return f"Manual {i}. Torque the caliper bolts to {20 + i} Nm and check the pads."
+
+
+def _drain():
+    """Run queued jobs as an ingest worker would."""
+    while (job := ingest_jobs.claim_next()) is not None:
+        more = ingest_jobs.claim_batch(job["batch_id"], pipeline.SETTINGS.bulk_claim_files - 1)
+        asyncio.run(ingest_jobs.run_batch([job, *more]))
+
+
+def _status(client, batch_id):
+    return client.get(f"/api/v1/ingest/batches/{batch_id}", headers=HEADERS).json()
+
+
+def test_archive_is_queued_and_ingested_with_batched_upserts(bulk_env):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for i in range(20):
+            zf.writestr(f"manuals/m{i}.txt", _doc(i))
+        zf.writestr("manuals/logo.png", b"\x89PNG")
+        zf.writestr("../escape.txt", _doc(99))
+        zf.writestr("empty.md", "   ")
+    client = TestClient(app)
+    res = client.post("/api/v1/ingest/bulk", files={"archive": ("docs.zip", buf.getvalue())}, headers=HEADERS)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["summary"]["queued"] == 22 and body["summary"]["skipped"] == 1 and not body["finished"]
+    by_name = {r["name"]: r for r in body["results"]}
+    assert by_name["manuals/logo.png"]["status"] == "skipped"
+    assert by_name["escape.txt"]["job_id"]  # "../" dropped; saved under a fresh name in the docs dir
+    assert bulk_env.calls == []  # nothing ingested inside the request
+
+    _drain()
+    status = _status(client, body["batch_id"])
+    by_name = {r["name"]: r for r in status["results"]}
+    assert status["finished"] and by_name["empty.md"]["status"] == "failed"
+    assert status["summary"]["done"] == 21 and status["summary"]["chunks"] == 21
+    # One write per 50 buffered chunks, not one per document
+    assert bulk_env.calls == [21]
+    assert client.get("/api/v1/ingest/batches/nope", headers=HEADERS).status_code == 404
+
+
+def test_multipart_batch_and_failed_write(bulk_env, monkeypatch):
+    client = TestClient(app)
+    files = [("files", (f"m{i}.txt", _doc(i).encode(), "text/plain")) for i in range(3)]
+    files.append(("files", ("m0.txt", _doc(0).encode(), "text/plain")))
+    body = client.post("/api/v1/ingest/bulk", files=files, headers=HEADERS).json()
+    assert sorted(r["status"] for r in body["results"]) == ["queued", "queued", "queued", "skipped"]  # same logical document twice
+    _drain()
+    assert _status(client, body["batch_id"])["summary"]["done"] == 3
+    with db.open_session("t1") as session:
+        previous = Path(session.query(db.Document).filter(db.Document.doc_id == body["results"][1]["doc_id"]).one().path)
+
+    async def down(items):
+        raise ConnectionError("vector store down")
+
+    monkeypatch.setattr(bulk_env, "aupsert", down)
+    monkeypatch.setattr(pipeline.SETTINGS, "ingest_job_max_attempts", 2)
+    body = client.post("/api/v1/ingest/bulk", files=[("files", ("m0.txt", b"Edited text here.", "text/plain"))], headers=HEADERS).json()
+    _drain()
+    status = _status(client, body["batch_id"])
+    assert status["ok"] is False and "vector store down" in status["results"][0]["error"]
+    assert ingest_jobs.get_job(status["results"][0]["job_id"])["attempts"] == 2  # store errors are retried
+    # The failed write did not retire the previous version or its file
+    assert previous.exists()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from app.services import sessions
+from app.services.sessions import SessionStore
+
+
+def test_sessions_are_bounded_and_scoped(monkeypatch):
+    store = SessionStore(max_sessions=2, idle_seconds=60, max_turns=1)
+    a = store.open("t1", None, None)
+    assert len(a.session_id) >= 20 and store.open("t1", None, a.session_id) is a
+    store.finish_turn(a, 0, "q1", "a1", [1, 2, 3])
+    store.finish_turn(a, 1, "q2", "a2", [1, 2, 3, 4])
+    assert [m["content"] for m in a.history] == ["q2", "a2"] and list(a.context) == [1, 2, 3, 4]
+    other = store.open("t2", None, a.session_id)  # another tenant never sees it
+    assert other is not a and other.session_id != a.session_id
+    # A client-chosen id is not adopted
+    assert store.open("t1", None, "guessed").session_id != "guessed"
+    assert store.stats()["sessions"] == 2 and store.evicted == 1
+
+    now = sessions.time.monotonic()
+    monkeypatch.setattr(sessions.time, "monotonic", lambda: now + 120)
+    store.open("t1", None, None)
+    assert store.stats()["sessions"] == 1
+
+
+def test_stale_or_oversized_context_is_dropped(monkeypatch):
+    store = SessionStore(max_sessions=4, idle_seconds=60, max_turns=5)
+    s = store.open("t1", None, None)
+    store.finish_turn(s, 0, "q1", "a1", [1, 2])
+    store.finish_turn(s, 0, "q2", "a2", [1, 2, 9])  # started before q1 finished
+    assert s.context is None
+    monkeypatch.setattr(sessions.SETTINGS, "session_max_context_tokens", 2)
+    store.finish_turn(s, 2, "q3", "a3", [1, 2, 3])
+    assert s.context is None and store.context_resets == 2
+
+
+def test_zero_max_turns_keeps_no_history():
+    store = SessionStore(max_sessions=4, idle_seconds=60, max_turns=0)
+    s = store.open("t1", None, None)
+    store.finish_turn(s, 0, "q1", "a1", [1, 2])
+    assert s.history == [] and s.context is None
+
+
+def test_follow_up_turns_reuse_ollama_context(chat_client):
+    client, calls = chat_client
+    body = {"message": "What are your hours?", "tenant": "t1", "session_id": "s1"}
+    first = client.post("/api/v1/chat", json=body).json()
+    assert first["session_id"] != "s1"  # unknown id: the server issues its own
+    body["session_id"] = first["session_id"]
+    second = client.post("/api/v1/chat", json={**body, "message": "And on Sunday?"}).json()
+    assert second["session_id"] == first["session_id"]
+    assert second["cached"] is False
+    (first_msgs, first_ctx), (second_msgs, second_ctx) = calls
+    assert first_ctx is None and first_msgs[0]["role"] == "system"
+    # Only the new turn is sent, on top of the returned context
+    assert list(second_ctx) == [1, 1, 1] and [m["role"] for m in second_msgs] == ["user"]
+    assert "And on Sunday?" in second_msgs[0]["content"]
+
+
+def test_client_history_is_used_without_a_session(chat_client):
+    client, calls = chat_client
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello!"}]
+    client.post("/api/v1/chat", json={"message": "Hours?", "tenant": "t1", "history": history})
+    messages, context = calls[0]
+    assert context is None and [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
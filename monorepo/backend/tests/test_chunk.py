@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services.chunk import Chunker, chunk_text, estimate_tokens, iter_chunks
+
+
+def test_short_text_is_a_single_chunk():
+    assert chunk_text("hello world") == ["hello world"]
+
+
+def test_chunks_overlap_and_cover_text():
+    text = "".join(chr(ord("a") + i % 26) for i in range(3000))
+    chunks = chunk_text(text, max_chars=1200, overlap=150)
+    assert [len(c) for c in chunks] == [1200, 1200, 900]
+    assert chunks[1].startswith(text[1050:1100])
+
+
+def test_degenerate_overlap_is_rejected():
+    with pytest.raises(ValueError):
+        chunk_text("abc", max_chars=100, overlap=100)
+    with pytest.raises(ValueError):
+        Chunker(max_tokens=50, overlap_tokens=50)
+
+
+def test_chunks_fill_budget_on_sentence_boundaries_with_overlap():
+    paragraphs = [" ".join(f"Step {p}.{i} tighten the caliper bolts." for i in range(10)) for p in range(4)]
+    chunks = list(iter_chunks([(1, "\n\n".join(paragraphs[:2])), (2, "\n\n".join(paragraphs[2:]))], max_tokens=120, overlap_tokens=20))
+    assert all(estimate_tokens(text) <= 120 for _, text in chunks)
+    assert all(text.endswith("bolts.") for _, text in chunks)  # never cut mid-sentence
+    # Each chunk opens with the last sentence(s) of the one before it
+    for (_, prev), (_, cur) in zip(chunks, chunks[1:]):
+        opening = cur.split(" Step")[0].split("\n")[0]
+        assert opening in prev[-80:]
+    assert chunks[0][0] == 1 and chunks[-1][0] == 2
+    joined = " ".join(text for _, text in chunks)
+    assert all(f"Step {p}.{i} " in joined for p in range(4) for i in range(10))
+
+
+def test_tables_split_by_row_and_short_pages_merge():
+    table = "\n".join(f"| PN-{i:04d} | rotor | {i}.00 |" for i in range(60))
+    rows = [text for _, text in iter_chunks([(1, table)], max_tokens=80, overlap_tokens=0)]
+    assert len(rows) > 1 and all(line.startswith("| PN-") for text in rows for line in text.splitlines())
+    pages = [(n, f"Page {n} note.") for n in range(1, 6)]
+    assert list(iter_chunks(pages, max_tokens=200, overlap_tokens=0)) == [
+        (1, "Page 1 note.\n\nPage 2 note.\n\nPage 3 note.\n\nPage 4 note.\n\nPage 5 note.")
+    ]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.services.crawler import Crawler, extract_html, parse_sitemap
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site(tmp_path):
+    root = tmp_path / "site"
+    root.mkdir()
+    page = "<html><head><title>{t}</title></head><body><nav><a href='/{link}'>next</a></nav><main><p>{body}</p></main></body></html>"
+    (root / "index.html").write_text(page.format(t="Home", link="a.html", body="Welcome to the shop."))
+    (root / "a.html").write_text(page.format(t="Brakes", link="b.html#top", body="Brake service costs $120."))
+    (root / "b.html").write_text(page.format(t="Tires", link="private/x.html", body="Tire rotation is free."))
+    (root / "private").mkdir()
+    (root / "private" / "x.html").write_text(page.format(t="Secret", link="index.html", body="Staff only."))
+    (root / "robots.txt").write_text("User-agent: *\nDisallow: /private/\n")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_extract_html_prefers_main_content():
+    title, text, links = extract_html(
+        "<title> Hours </title><nav>Menu <a href='/x#y'>x</a></nav><article><h1>Hours</h1><p>Open 9&ndash;5.</p></article>",
+        "http://example.com/page",
+    )
+    assert title == "Hours"
+    assert text == "Hours\n\nOpen 9–5."
+    assert links == ["http://example.com/x"]
+
+
+def test_parse_sitemap_and_index():
+    ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    assert parse_sitemap(f"<urlset {ns}><url><loc>http://s/a</loc></url></urlset>") == (["http://s/a"], [])
+    assert parse_sitemap(f"<sitemapindex {ns}><sitemap><loc>http://s/m.xml</loc></sitemap></sitemapindex>") == ([], ["http://s/m.xml"])
+
+
+def test_recrawl_only_ingests_changed_pages(site, tmp_path):
+    root, base = site
+    ingested: list[tuple[str, str]] = []
+
+    async def ingest(tenant_id, doc_id, url, title, text):
+        ingested.append((url.rsplit("/", 1)[-1], text))
+        return 1
+
+    def crawl():
+        crawler = Crawler("t1", state_path=tmp_path / "state.json", ingest=ingest, delay=0.0)
+        return asyncio.run(crawler.run([f"{base}/index.html"]))
+
+    stats = crawl()
+    assert sorted(name for name, _ in ingested) == ["a.html", "b.html", "index.html"]
+    assert ("a.html", "Brake service costs $120.") in ingested
+    assert stats.disallowed == 1 and stats.ingested == 3
+
+    ingested.clear()
+    stats = crawl()
+    assert ingested == [] and stats.not_modified == 3
+
+    # Edit one page; its Last-Modified moves forward
+    (root / "b.html").write_text((root / "b.html").read_text().replace("free", "$20"))
+    later = time.time() + 10
+    os.utime(root / "b.html", (later, later))
+    stats = crawl()
+    assert ingested == [("b.html", "Tire rotation is $20.")]
+    assert stats.not_modified == 2
+
+
+def test_per_host_politeness_delay(site, tmp_path):
+    _, base = site
+    starts: list[float] = []
+
+    async def ingest(tenant_id, doc_id, url, title, text):
+        starts.append(time.monotonic())
+        return 1
+
+    crawler = Crawler("t1", state_path=tmp_path / "state.json", ingest=ingest, delay=0.1, per_host=4, follow_links=False)
+    asyncio.run(crawler.run([f"{base}/index.html", f"{base}/a.html", f"{base}/b.html"]))
+    starts.sort()
+    assert len(starts) == 3
+    assert starts[2] - starts[0] >= 0.18
+
+
+def test_robots_error_does_not_hang_and_state_is_saved_during_crawl(tmp_path):
+    page = "<html><body><main><p>Page {n} text.</p></main></body></html>"
+
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            raise RuntimeError("robots exploded")  # not an httpx.HTTPError
+        return httpx.Response(200, headers={"content-type": "text/html"}, text=page.format(n=request.url.path))
+
+    state_path = tmp_path / "state.json"
+    saved: list[int] = []
+
+    async def ingest(tenant_id, doc_id, url, title, text):
+        saved.append(len(json.loads(state_path.read_text())) if state_path.exists() else 0)
+        return 1
+
+    seeds = [f"http://shop.test/p{i}.html" for i in range(4)]
+    crawler = Crawler(
+        "t1", state_path=state_path, ingest=ingest, delay=0.0, concurrency=1, save_every=1, transport=httpx.MockTransport(handler)
+    )
+    stats = asyncio.run(asyncio.wait_for(crawler.run(seeds), timeout=10))
+    assert stats.failed == 1 and stats.ingested == 3  # only the request that hit the robots error
+    assert saved == [0, 1, 2]  # state written after every visited page, before the crawl ended
+
+
+def _refused(request):
+    raise httpx.ConnectError("connection refused", request=request)
+
+
+@pytest.mark.parametrize(
+    "robots, allowed",
+    [
+        (lambda request: httpx.Response(404), True),  # no robots.txt: crawl everything
+        (lambda request: httpx.Response(403), True),
+        (lambda request: httpx.Response(503), False),  # unreachable: crawl nothing
+        (_refused, False),
+    ],
+)
+def test_robots_unavailable_allows_unreachable_disallows(tmp_path, robots, allowed):
+    def handler(request):
+        if request.url.path == "/robots.txt":
+            return robots(request)
+        return httpx.Response(200, headers={"content-type": "text/html"}, text="<html><body><p>Open daily.</p></body></html>")
+
+    async def ingest(tenant_id, doc_id, url, title, text):
+        return 1
+
+    crawler = Crawler("t1", state_path=tmp_path / "state.json", ingest=ingest, delay=0.0, transport=httpx.MockTransport(handler))
+    stats = asyncio.run(crawler.run(["http://shop.test/a.html", "http://shop.test/b.html"]))
+    assert (stats.ingested, stats.disallowed) == ((2, 0) if allowed else (0, 2))
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+
+from sqlalchemy import inspect, text
+
+from app.services import db
+
+
+def _isolate(monkeypatch, tmp_path, max_engines):
+    monkeypatch.setattr(db.SETTINGS, "data_dir", str(tmp_path))
+    monkeypatch.setattr(db.SETTINGS, "tenant_sql_dsn", {})
+    monkeypatch.setattr(db.SETTINGS, "default_sql_dsn", None)
+    monkeypatch.setattr(db.SETTINGS, "db_max_engines", max_engines)
+    monkeypatch.setattr(db, "_engines", OrderedDict())
+    monkeypatch.setattr(db, "_schema_ready", set())
+    created = []
+    create_all = db.Base.metadata.create_all
+    monkeypatch.setattr(db.Base.metadata, "create_all", lambda engine: (created.append(str(engine.url)), create_all(engine)))
+    return created
+
+
+def test_engines_are_lru_bounded_and_disposed(monkeypatch, tmp_path):
+    created = _isolate(monkeypatch, tmp_path, max_engines=2)
+    a = db._get_engine("a")
+    b = db._get_engine("b")
+    assert db._get_engine("a") is a  # a is now the most recently used
+    disposed = []
+    monkeypatch.setattr(b, "dispose", lambda: disposed.append("b"))
+    db._get_engine("c")
+    assert disposed == ["b"] and list(db._engines) == [db._tenant_dsn("a"), db._tenant_dsn("c")]
+
+    # Re-opening an evicted tenant does not re-run schema creation
+    db._get_engine("b")
+    assert len(created) == 3 and list(db._engines) == [db._tenant_dsn("c"), db._tenant_dsn("b")]
+    assert db.db_stats()["engines"] == 2
+
+    with db.open_session("b") as session:
+        session.add(db.ChatLog(site_id="b", question="q", answer="a"))
+        session.commit()
+        assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    db.dispose_engines()
+    assert not db._engines
+
+
+def test_tenants_sharing_a_dsn_share_one_engine(monkeypatch, tmp_path):
+    created = _isolate(monkeypatch, tmp_path, max_engines=2)
+    shared = f"sqlite:///{tmp_path / 'shared.db'}"
+    monkeypatch.setattr(db.SETTINGS, "default_sql_dsn", shared)
+    monkeypatch.setattr(db.SETTINGS, "tenant_sql_dsn", {"own": [f"sqlite:///{tmp_path / 'own.db'}"]})
+    evicted = db.db_stats()["evicted"]
+    engine = db._get_engine("a")
+    assert all(db._get_engine(t) is engine for t in ("b", "c", "default"))
+    assert db._get_engine("own") is not engine
+    assert list(db._engines) == [shared, db._tenant_dsn("own")] and len(created) == 2
+    assert db.db_stats()["engines"] == 2 and db.db_stats()["evicted"] == evicted
+
+
+def test_migrate_creates_known_tenant_schemas_once(monkeypatch, tmp_path):
+    created = _isolate(monkeypatch, tmp_path, max_engines=4)
+    (tmp_path / "site_a.db").touch()
+    assert db.migrate() == 2  # central + site_a
+    assert "chats" in inspect(db.make_engine(f"sqlite:///{tmp_path / 'site_a.db'}")).get_table_names()
+    assert db.migrate() == 0
+    db._get_engine("site_a")
+    db._get_engine("default")
+    assert len(created) == 2
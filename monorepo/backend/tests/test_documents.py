@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.services import db, pipeline
+from app.services.documents import logical_doc_id
+from app.services.lexical import BM25Index
+from app.services.vector import NumpyStore
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    dsn = f"sqlite:///{tmp_path / 't1.db'}"
+    engine = create_engine(dsn)
+    db.Base.metadata.create_all(engine)
+    monkeypatch.setattr(db.SETTINGS, "default_sql_dsn", dsn)  # every tenant's database
+    monkeypatch.setitem(db._engines, dsn, engine)
+    store = NumpyStore(str(tmp_path / "vectors"), "t1")
+    lexical = BM25Index()
+    embedded: list[str] = []
+
+    async def fake_embed(texts):
+        embedded.extend(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    monkeypatch.setattr(pipeline, "get_store", lambda tenant_id: store)
+    monkeypatch.setattr(pipeline, "get_lexical_index", lambda tenant_id: lexical)
+    monkeypatch.setattr(pipeline, "embed_documents", fake_embed)
+    # One paragraph per chunk and no overlap, so an edit touches one chunk
+    monkeypatch.setattr(pipeline.SETTINGS, "chunk_max_tokens", 14)
+    monkeypatch.setattr(pipeline.SETTINGS, "chunk_overlap_tokens", 0)
+    return store, lexical, embedded
+
+
+def _manual(edited: int = -1) -> str:
+    return "\n\n".join(
+        f"Step {i}: torque the caliper bolt to {20 + i} Nm." + (" Revised." if i == edited else "") for i in range(100)
+    )
+
+
+def test_reingest_embeds_only_changed_chunks_and_replaces_version(env, tmp_path):
+    store, lexical, embedded = env
+    doc_id = logical_doc_id("t1", "Brake Manual.txt")
+    assert doc_id == logical_doc_id("t1", "brake manual.txt ")
+
+    v1 = tmp_path / "v1.txt"
+    v1.write_text(_manual())
+    assert asyncio.run(pipeline.ingest_file("t1", doc_id, v1)) == 100
+    assert len(embedded) == 100
+
+    embedded.clear()
+    v2 = tmp_path / "v2.txt"
+    v2.write_text(_manual(edited=42))
+    assert asyncio.run(pipeline.ingest_file("t1", doc_id, v2)) == 100
+    assert embedded == ["Step 42: torque the caliper bolt to 62 Nm. Revised."]
+
+    # The old chunk 42 is gone from both indexes; no duplicates remain
+    hits = store.query([62.0, 1.0, 0.5], top_k=200, where={"doc_id": doc_id})
+    assert len(hits) == 100
+    assert sum("Step 42:" in h["document"] for h in hits) == 1
+    assert len(lexical) == 100
+    assert not v1.exists()  # previous upload file removed
+
+
+def test_repeated_chunks_are_stored_once(env, tmp_path, monkeypatch):
+    store, _, embedded = env
+    monkeypatch.setattr(pipeline.SETTINGS, "chunk_max_tokens", 5)
+    path = tmp_path / "faq.txt"
+    path.write_text("Call us at 555-0100.\n\nOpening hours vary.\n\nCall us at 555-0100.")
+    assert asyncio.run(pipeline.ingest_file("t1", "faq", path)) == 2
+    assert len(embedded) == 2
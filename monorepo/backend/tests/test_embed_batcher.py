@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services import embed
+
+
+def test_concurrent_calls_share_one_request(monkeypatch):
+    calls: list = []
+
+    async def fake_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(embed, "_embed_batch", fake_batch)
+    monkeypatch.setattr(embed, "_BATCHER", embed._EmbedBatcher(max_items=8, max_wait_ms=20))
+
+    async def run():
+        return await asyncio.gather(*(embed.embed_texts(["x" * i]) for i in range(1, 6)))
+
+    results = asyncio.run(run())
+    assert [r[0][0] for r in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert len(calls) == 1 and len(calls[0]) == 5
+
+
+def test_full_batch_flushes_without_waiting(monkeypatch):
+    calls: list = []
+
+    async def fake_batch(texts):
+        calls.append(list(texts))
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(embed, "_embed_batch", fake_batch)
+    monkeypatch.setattr(embed, "_BATCHER", embed._EmbedBatcher(max_items=2, max_wait_ms=10_000))
+
+    async def run():
+        return await asyncio.wait_for(embed.embed_texts(["a", "b", "c", "d"]), timeout=1)
+
+    assert len(asyncio.run(run())) == 4
+    assert [len(c) for c in calls] == [2, 2]
+
+
+def test_batch_errors_reach_every_caller(monkeypatch):
+    async def broken(texts):
+        return []
+
+    monkeypatch.setattr(embed, "_embed_batch", broken)
+    monkeypatch.setattr(embed, "_BATCHER", embed._EmbedBatcher(max_items=4, max_wait_ms=1))
+
+    async def run():
+        return await asyncio.gather(embed.embed_texts(["a"]), embed.embed_texts(["b"]), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(embed.embed_texts(["c"]))
+
+
+def test_batcher_recovers_after_its_loop_is_gone(monkeypatch):
+    async def fake_batch(texts):
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(embed, "_embed_batch", fake_batch)
+    monkeypatch.setattr(embed, "_BATCHER", embed._EmbedBatcher(max_items=8, max_wait_ms=200))
+
+    async def abandoned():
+        # The loop ends before the flush timer fires
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(embed.embed_texts(["a"]), timeout=0.01)
+
+    asyncio.run(abandoned())
+
+    async def run():
+        return await asyncio.wait_for(embed.embed_texts(["b", "c"]), timeout=2)
+
+    assert asyncio.run(run()) == [[1.0], [1.0]]
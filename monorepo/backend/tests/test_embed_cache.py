@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services import embed
+from app.services.embed_cache import EmbeddingCache
+
+
+def test_cache_normalizes_and_tracks_hit_rate():
+    cache = EmbeddingCache(max_bytes=1024, ttl_seconds=60)
+    cache.put("m", "What are your  hours?", [0.1, 0.2])
+    assert cache.get("m", "what are your hours?") is not None
+    assert cache.get("m", "do you take walk-ins?") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cache_enforces_byte_budget_lru():
+    cache = EmbeddingCache(max_bytes=2 * 4 * 4, ttl_seconds=60)  # two 4-dim float32 vectors
+    cache.put("m", "a", [1.0] * 4)
+    cache.put("m", "b", [2.0] * 4)
+    cache.get("m", "a")
+    cache.put("m", "c", [3.0] * 4)
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == [1.0] * 4
+    assert cache.stats()["bytes"] <= 32
+
+
+def test_model_switch_invalidates():
+    cache = EmbeddingCache(max_bytes=1024, ttl_seconds=60)
+    cache.put("old", "q", [1.0])
+    assert cache.get("new", "q") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_embed_query_calls_model_once(monkeypatch):
+    calls: list = []
+
+    async def fake_embed(texts):
+        calls.append(texts)
+        return [[0.5, 0.5]]
+
+    monkeypatch.setattr(embed, "embed_texts", fake_embed)
+    monkeypatch.setattr(embed, "_QUERY_CACHE", EmbeddingCache(max_bytes=1024, ttl_seconds=60))
+
+    async def run():
+        return [await embed.embed_query("Hours?"), await embed.embed_query("hours?")]
+
+    first, second = asyncio.run(run())
+    assert first == second == [0.5, 0.5]
+    assert len(calls) == 1
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.config import SETTINGS
+from app.services import embed
+
+
+def test_plan_batches_respects_char_and_item_budget():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 10, "e" * 10, "f" * 10]
+    assert embed._plan_batches(texts, max_chars=100, max_items=10) == [(0, 2), (2, 6)]
+    assert embed._plan_batches(texts, max_chars=1000, max_items=4) == [(0, 4), (4, 6)]
+    # A single oversized text still gets its own batch
+    assert embed._plan_batches(["x" * 500], max_chars=100, max_items=4) == [(0, 1)]
+
+
+def test_one_vector_per_chunk_even_with_single_embedding_server(monkeypatch):
+    async def legacy(texts):
+        # Old servers answer any batch with one 'embedding'
+        return [[float(len(texts[0]))]]
+
+    monkeypatch.setattr(embed, "_embed_batch", legacy)
+    chunks = [f"chunk {i}" * (i + 1) for i in range(7)]
+    vectors = asyncio.run(embed.embed_documents(chunks))
+    assert len(vectors) == 7
+    assert [v[0] for v in vectors] == [float(len(c)) for c in chunks]
+
+
+def test_failed_batches_are_retried(monkeypatch):
+    failures = {"left": 2}
+
+    async def flaky(texts):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise ConnectionError("model server restarting")
+        return [[1.0] for _ in texts]
+
+    async def no_sleep(_delay):
+        return None
+
+    monkeypatch.setattr(embed, "_embed_batch", flaky)
+    monkeypatch.setattr(embed.asyncio, "sleep", no_sleep)
+    monkeypatch.setattr(SETTINGS, "embed_ingest_batch_items", 2)
+    vectors = asyncio.run(embed.embed_documents(["a", "b", "c"]))
+    assert vectors == [[1.0]] * 3
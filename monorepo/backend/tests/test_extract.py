@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.services import db, pipeline, storage
+
+
+def _write_pdf(path, pages):
+    """Minimal uncompressed PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{off:010d} 00000 n \n" for off in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+async def _collect(path):
+    return [page async for page in storage.stream_pages(path)]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _extractors():
+    yield
+    storage.shutdown_extractors()
+
+
+@pytest.fixture
+def small_readahead(monkeypatch):
+    monkeypatch.setattr(storage, "PDF_READAHEAD_PAGES", 2)
+
+
+def test_pdf_pages_stream_with_real_numbers(tmp_path, small_readahead):
+    path = tmp_path / "manual.pdf"
+    _write_pdf(path, [f"Page {i} torque spec" for i in range(1, 6)])
+    pages = asyncio.run(_collect(path))
+    assert [n for n, _ in pages] == [1, 2, 3, 4, 5]
+    assert "Page 4 torque spec" in pages[3][1]
+
+
+def test_docx_blocks_follow_page_breaks(tmp_path, small_readahead):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("Intro on page one")
+    document.add_page_break()
+    document.add_paragraph("Warranty on page two")
+    path = tmp_path / "policy.docx"
+    document.save(str(path))
+    blocks = asyncio.run(_collect(path))
+    assert blocks[0] == (1, "Intro on page one")
+    assert blocks[-1] == (2, "Warranty on page two")
+
+
+def test_text_sections_split_at_blank_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "BLOCK_CHARS", 50)
+    path = tmp_path / "notes.txt"
+    path.write_text(("x" * 30 + "\n") * 2 + "\n" + "y" * 20 + "\n")
+    sections = asyncio.run(_collect(path))
+    assert [n for n, _ in sections] == [1, 2]
+    assert sections[1][1] == "y" * 20 + "\n"
+
+
+def test_pipeline_stores_page_numbers(tmp_path, monkeypatch, small_readahead):
+    dsn = f"sqlite:///{tmp_path / 't1.db'}"
+    engine = create_engine(dsn)
+    db.Base.metadata.create_all(engine)
+    monkeypatch.setattr(db.SETTINGS, "default_sql_dsn", dsn)  # every tenant's database
+    monkeypatch.setitem(db._engines, dsn, engine)
+
+    class _Store:
+        def __init__(self):
+            self.items = []
+
+        async def aupsert(self, items):
+            self.items.extend(items)
+            return len(items)
+
+    class _Lexical:
+        def upsert(self, items):
+            return len(items)
+
+    async def fake_embed(texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    store = _Store()
+    monkeypatch.setattr(pipeline, "get_store", lambda tenant_id: store)
+    monkeypatch.setattr(pipeline, "get_lexical_index", lambda tenant_id: _Lexical())
+    monkeypatch.setattr(pipeline, "embed_documents", fake_embed)
+    monkeypatch.setattr(pipeline.SETTINGS, "embed_ingest_batch_items", 1)
+    monkeypatch.setattr(pipeline.SETTINGS, "embed_ingest_concurrency", 2)
+    # One chunk per page: budget below two pages' worth of text
+    monkeypatch.setattr(pipeline.SETTINGS, "chunk_max_tokens", 4)
+    monkeypatch.setattr(pipeline.SETTINGS, "chunk_overlap_tokens", 0)
+    path = tmp_path / "manual.pdf"
+    _write_pdf(path, [f"Page {i} text" for i in range(1, 4)])
+    count = asyncio.run(pipeline.ingest_file("t1", "doc", path))
+    assert count == 3
+    assert [m["page"] for _, _, m in store.items] == [1, 2, 3]
+    assert all(i.startswith("doc-") for i, _, _ in store.items)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.services import db, ingest_jobs
+from app.services.pipeline import IngestError
+
+
+@pytest.fixture
+def jobs_db(tmp_path, monkeypatch):
+    dsn = f"sqlite:///{tmp_path / 'central.db'}"
+    engine = create_engine(dsn)
+    db.Base.metadata.create_all(engine)
+    monkeypatch.setattr(db.SETTINGS, "default_sql_dsn", dsn)  # every tenant's database
+    monkeypatch.setitem(db._engines, dsn, engine)
+    return engine
+
+
+def test_claim_run_and_progress(jobs_db, tmp_path, monkeypatch):
+    reported = [("extract", 0), ("chunk", 0), ("embed", 0), ("embed", 4), ("upsert", 8)]
+    writes = []
+    update = ingest_jobs._update
+
+    def recording_update(job_id, **values):
+        writes.append((threading.get_ident(), values))
+        update(job_id, **values)
+
+    async def fake_ingest(tenant_id, doc_id, path, customer_id=None, progress=None):
+        for stage, done in reported:
+            progress(stage, done, 8)  # on the event loop, as the pipeline reports
+            await asyncio.sleep(0)
+        return 8
+
+    monkeypatch.setattr(ingest_jobs, "ingest_file", fake_ingest)
+    monkeypatch.setattr(ingest_jobs, "_update", recording_update)
+    job_id = ingest_jobs.enqueue("t1", "doc1", tmp_path / "doc1.txt")
+    assert ingest_jobs.get_job(job_id)["status"] == "queued"
+
+    job = ingest_jobs.claim_next()
+    assert job["job_id"] == job_id and job["status"] == "running" and job["attempts"] == 1
+    assert ingest_jobs.claim_next() is None  # already owned
+
+    asyncio.run(ingest_jobs.run_job(job))
+    # Every write ran in a thread; progress reports were coalesced, in order
+    assert all(thread != threading.get_ident() for thread, _ in writes)
+    progress = [(v["stage"], v["chunks_done"]) for _, v in writes if "status" not in v]
+    assert progress and progress[0] == ("extract", 0) and len(progress) <= len(reported)
+    assert [r for r in reported if r in progress] == progress
+    done = ingest_jobs.get_job(job_id)
+    assert done["status"] == "done" and done["stage"] == "done" and done["chunks_done"] == 8
+    assert done["finished_at"] is not None
+
+
+def test_failures_retry_then_fail(jobs_db, tmp_path, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise ConnectionError("embedding server down")
+
+    monkeypatch.setattr(ingest_jobs, "ingest_file", broken)
+    monkeypatch.setattr(ingest_jobs.SETTINGS, "ingest_job_max_attempts", 2)
+    job_id = ingest_jobs.enqueue("t1", "doc1", tmp_path / "doc1.txt")
+    asyncio.run(ingest_jobs.run_job(ingest_jobs.claim_next()))
+    assert ingest_jobs.get_job(job_id)["status"] == "queued"
+    asyncio.run(ingest_jobs.run_job(ingest_jobs.claim_next()))
+    failed = ingest_jobs.get_job(job_id)
+    assert failed["status"] == "failed" and "server down" in failed["error"]
+
+    async def unreadable(*args, **kwargs):
+        raise IngestError("Empty or unreadable document")
+
+    monkeypatch.setattr(ingest_jobs, "ingest_file", unreadable)
+    job_id = ingest_jobs.enqueue("t1", "doc2", tmp_path / "doc2.txt")
+    asyncio.run(ingest_jobs.run_job(ingest_jobs.claim_next()))
+    assert ingest_jobs.get_job(job_id)["status"] == "failed"  # not retried
+
+
+def _expire(job_id):
+    with db.open_session("default") as session:
+        session.get(db.IngestJob, job_id).updated_at = datetime.utcnow() - timedelta(seconds=120)
+        session.commit()
+
+
+def test_stale_running_jobs_are_requeued(jobs_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_jobs.SETTINGS, "ingest_job_max_attempts", 2)
+    job_id = ingest_jobs.enqueue("t1", "doc1", tmp_path / "doc1.txt")
+    ingest_jobs.claim_next()
+    assert ingest_jobs.requeue_stale(lease_seconds=60) == 0
+    _expire(job_id)
+    assert ingest_jobs.requeue_stale(lease_seconds=60) == 1
+    assert ingest_jobs.claim_next()["attempts"] == 2
+    # The worker died again on its last attempt: fail rather than requeue forever
+    _expire(job_id)
+    assert ingest_jobs.requeue_stale(lease_seconds=60) == 1
+    failed = ingest_jobs.get_job(job_id)
+    assert failed["status"] == "failed" and failed["finished_at"] is not None and "worker stopped" in failed["error"]
+    assert ingest_jobs.claim_next() is None
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from app.services.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _item(chunk_id: str, text: str, **meta):
+    return (chunk_id, None, {"text": text, "filename": f"{chunk_id}.txt", **meta})
+
+
+def test_tokenize_keeps_part_and_phone_numbers():
+    terms = tokenize("Call 555-123-4567 about part AB-1234.")
+    assert "555-123-4567" in terms and "5551234567" in terms
+    assert "ab-1234" in terms and "1234" in terms
+
+
+def test_exact_identifiers_rank_first_and_filters_apply():
+    index = BM25Index()
+    index.upsert([
+        _item("a", "Brake pads for sedans, part AB-1234, fit most models.", customer_id="c1"),
+        _item("b", "Brake rotors and brake pads, part AB-9999.", customer_id="c2"),
+        _item("c", "Our phone number is 555-123-4567 for service bookings.", customer_id="c1"),
+    ])
+    assert index.search("ab-1234")[0]["id"] == "a"
+    assert index.search("what is the number 555-123-4567")[0]["id"] == "c"
+    assert [h["id"] for h in index.search("brake pads", where={"customer_id": "c2"})] == ["b"]
+
+
+def test_incremental_updates_persist_across_reopen(tmp_path):
+    path = tmp_path / "t1.jsonl"
+    index = BM25Index(path)
+    index.upsert([_item("a", "oil change special"), _item("b", "tire rotation")])
+    index.upsert([_item("a", "windshield repair")])
+    index.delete(["b"])
+
+    reopened = BM25Index(path)
+    assert len(reopened) == 1
+    assert reopened.search("oil") == []
+    assert reopened.search("windshield")[0]["id"] == "a"
+
+
+def test_reciprocal_rank_fusion_prefers_items_in_both_lists():
+    vector = [{"id": "x", "score": 0.1}, {"id": "y", "score": 0.2}]
+    lexical = [{"id": "y", "score": 9.0}, {"id": "z", "score": 3.0}]
+    fused = reciprocal_rank_fusion([vector, lexical], top_k=3)
+    assert [h["id"] for h in fused] == ["y", "x", "z"]
+    assert fused[0]["score"] > fused[1]["score"]
+
+
+def _write_many(path, prefix: str) -> None:
+    index = BM25Index(path)
+    for i in range(60):
+        index.upsert([_item(f"{prefix}{i}", f"token{prefix}{i} shared words")])
+
+
+def test_concurrent_writers_torn_lines_and_compaction(tmp_path):
+    import multiprocessing
+
+    path = tmp_path / "t1.jsonl"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_write_many, args=(path, p)) for p in ("a", "b")]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert [p.exitcode for p in procs] == [0, 0]
+    reader = BM25Index(path)
+    assert len(reader) == 120 and reader.search("tokenb59")[0]["id"] == "b59"
+
+    # A writer that died mid-record leaves a torn line; it is skipped, not fatal
+    with path.open("ab") as f:
+        f.write(b'{"id": "torn", "m": {"te')
+    writer = BM25Index(path)
+    writer.upsert([_item("c", "windshield repair")])
+    assert reader.search("windshield")[0]["id"] == "c"
+    assert len(BM25Index(path)) == 121
+
+    # Compaction by another instance replaces the file; a stale reader starts over
+    writer.upsert([_item(f"d{i}", "x " * 50) for i in range(2000)])
+    assert reader.search("tokenb3")[0]["id"] == "b3"
+    inode = path.stat().st_ino
+    writer.delete([f"a{i}" for i in range(60)] + [f"d{i}" for i in range(1990)])
+    assert path.stat().st_ino != inode  # compacted
+    writer.upsert([_item(f"e{i}", "y " * 50) for i in range(2000)])  # regrows past the old size
+    assert reader.search("tokena3") == [] and reader.search("tokenb3")[0]["id"] == "b3"
+    assert len(reader) == len(writer) == 2071
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+from app.services.vector import NumpyStore
+
+
+def _items(n: int, dim: int = 8, customer: str | None = None, prefix: str = "doc"):
+    rng = np.random.default_rng(0)
+    out = []
+    for i in range(n):
+        meta = {"doc_id": prefix, "filename": f"{prefix}.txt", "page": i + 1, "text": f"chunk {i}"}
+        if customer:
+            meta["customer_id"] = customer
+        out.append((f"{prefix}-{i}", rng.standard_normal(dim).tolist(), meta))
+    return out
+
+
+def test_query_returns_nearest_with_metadata(tmp_path):
+    store = NumpyStore(str(tmp_path), "t1")
+    items = _items(20)
+    assert store.upsert(items) == 20
+    hits = store.query(items[7][1], top_k=3)
+    assert hits[0]["id"] == "doc-7"
+    assert hits[0]["score"] == pytest.approx(0.0, abs=1e-5)
+    assert hits[0]["metadata"]["page"] == 8
+    assert hits[0]["document"] == "chunk 7"
+    assert len(hits) == 3
+
+
+def test_customer_filter_and_batch_query(tmp_path):
+    store = NumpyStore(str(tmp_path), "t1")
+    a = _items(5, customer="alice", prefix="a")
+    b = _items(5, customer="bob", prefix="b")
+    store.upsert(a + b)
+    results = store.query_batch([a[0][1], b[0][1]], top_k=10, where={"customer_id": "bob"})
+    assert all(h["metadata"]["customer_id"] == "bob" for r in results for h in r)
+    assert results[1][0]["id"] == "b-0"
+    assert store.query(a[0][1], where={"customer_id": "nobody"}) == []
+
+
+def test_upsert_overwrites_and_reopen_replays_log(tmp_path):
+    store = NumpyStore(str(tmp_path), "t1")
+    items = _items(4)
+    store.upsert(items)
+    new_vec = (-np.asarray(items[0][1])).tolist()
+    store.upsert([("doc-0", new_vec, {"doc_id": "doc", "filename": "doc.txt", "page": 1, "text": "updated"})])
+    store.close()
+
+    reopened = NumpyStore(str(tmp_path), "t1")
+    hits = reopened.query(new_vec, top_k=1)
+    assert hits[0]["id"] == "doc-0" and hits[0]["document"] == "updated"
+    assert (tmp_path / "t1" / "vectors.f32").stat().st_size == 4 * 8 * 4
+
+
+def test_second_handle_sees_appended_rows(tmp_path):
+    writer = NumpyStore(str(tmp_path), "t1")
+    reader = NumpyStore(str(tmp_path), "t1")
+    items = _items(3)
+    writer.upsert(items)
+    assert reader.query(items[2][1], top_k=1)[0]["id"] == "doc-2"
+
+
+def _distinct_items(prefix: str):
+    rng = np.random.default_rng(ord(prefix))
+    return [(f"{prefix}-{i}", rng.standard_normal(8).tolist(), {"doc_id": prefix, "text": str(i)}) for i in range(40)]
+
+
+def _write_items(data_dir: str, prefix: str) -> None:
+    store = NumpyStore(data_dir, "t1")
+    for item in _distinct_items(prefix):
+        store.upsert([item])
+
+
+def test_concurrent_writer_processes_keep_every_row(tmp_path):
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_write_items, args=(str(tmp_path), p)) for p in ("a", "b")]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    assert [p.exitcode for p in procs] == [0, 0]
+
+    store = NumpyStore(str(tmp_path), "t1")
+    for prefix in ("a", "b"):
+        for chunk_id, vec, _ in _distinct_items(prefix):
+            assert store.query(vec, top_k=1)[0]["id"] == chunk_id
+    assert len(set(store._row_of.values())) == 80
+
+
+def test_compaction_drops_dead_rows_and_stale_handles_follow(tmp_path, monkeypatch):
+    from app.services import vector
+
+    monkeypatch.setattr(vector, "_NUMPY_COMPACT_MIN_RECORDS", 8)
+    writer = NumpyStore(str(tmp_path), "t1")
+    reader = NumpyStore(str(tmp_path), "t1")
+    items = _items(8)
+    writer.upsert(items)
+    assert reader.query(items[3][1], top_k=1)[0]["id"] == "doc-3"
+    for rev in range(3):
+        writer.upsert([(cid, vec, {**meta, "text": f"rev {rev}"}) for cid, vec, meta in items])
+    writer.delete(["doc-0", "doc-1"])
+    writer.upsert(items[:1])  # re-added after the delete, in a new row
+
+    directory = tmp_path / "t1"
+    gen = json.loads((directory / "index.json").read_text())["gen"]
+    assert gen >= 2 and not (directory / "vectors.f32").exists()  # generation 0 is gone
+    live = len(writer._row_of)
+    assert live == 7 and writer._log_records <= 2 * 8
+    vectors = directory / f"vectors.{gen}.f32"
+    assert vectors.stat().st_size <= (live + writer._log_records) * 8 * 4
+
+    # The stale handle notices the new generation and starts over
+    hit = reader.query(items[5][1], top_k=1)[0]
+    assert hit["id"] == "doc-5" and hit["document"] == "rev 2"
+    assert reader.query(items[0][1], top_k=1)[0]["document"] == "chunk 0"
+    assert [h["id"] for h in reader.query(items[1][1], top_k=8)].count("doc-1") == 0
+    reopened = NumpyStore(str(tmp_path), "t1")
+    assert sorted(reopened._row_of) == sorted(writer._row_of)
+
+
+def test_queries_survive_concurrent_writes_compaction_and_close(tmp_path, monkeypatch):
+    import threading
+
+    from app.services import vector
+
+    monkeypatch.setattr(vector, "_NUMPY_COMPACT_MIN_RECORDS", 16)
+    store = NumpyStore(str(tmp_path), "t1")
+    items = [(cid, vec, {**meta, "cid": cid}) for cid, vec, meta in _items(30)]
+    store.upsert(items)
+    errors = []
+    stop = threading.Event()
+
+    def query_loop():
+        while not stop.is_set():
+            try:
+                for hits in store.query_batch([items[0][1], items[7][1]], top_k=5, with_vectors=True):
+                    assert all(h["metadata"]["cid"] == h["id"] for h in hits)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+                return
+
+    threads = [threading.Thread(target=query_loop) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for i in range(40):
+        store.upsert(items[i % 30 : i % 30 + 5])
+        if i % 7 == 0:
+            store.delete([items[(i + 3) % 30][0]])
+        store.close()  # what a registry eviction does
+    stop.set()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert json.loads((tmp_path / "t1" / "index.json").read_text())["gen"] >= 1
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+
+from app.services.ollama import OllamaClient
+
+
+def test_inflight_cap_queues_requests():
+    state = {"active": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return httpx.Response(200, json={"response": "ok"})
+
+    async def run() -> list:
+        client = OllamaClient("http://ollama.test", max_inflight=2, transport=httpx.MockTransport(handler))
+        try:
+            return await asyncio.gather(*(client.post_json("/api/generate", {}) for _ in range(6)))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+    assert [r["response"] for r in results] == ["ok"] * 6
+    assert state["peak"] == 2
+
+
+def test_stream_json_skips_bad_lines():
+    body = b'{"response": "a"}\n\nnot-json\n{"response": "b", "done": true}\n'
+
+    async def run() -> list:
+        client = OllamaClient("http://ollama.test", transport=httpx.MockTransport(lambda r: httpx.Response(200, content=body)))
+        try:
+            return [d async for d in client.stream_json("/api/generate", {})]
+        finally:
+            await client.aclose()
+
+    assert [d["response"] for d in asyncio.run(run())] == ["a", "b"]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import io
+import sys
+import threading
+import time
+import wave
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import piper_pool
+from app.services.piper_pool import TTSBusy, VoicePool, WorkerError
+
+_FAKE_WORKER = [sys.executable, str(Path(__file__).parents[1] / "benchmarks" / "fake_piper.py")]
+
+
+@pytest.fixture
+def pool():
+    pool = VoicePool("fake", _FAKE_WORKER, size=2, max_queue=1, timeout=5)
+    yield pool
+    pool.close()
+
+
+def test_workers_are_reused_and_stream_pcm(pool):
+    pids = {w.proc.pid for w in pool._workers}
+    for text in ("Hello there.", "You can ask another question."):
+        sample_rate, pcm = pool.synthesize(text)
+        assert sample_rate == 16000 and len(pcm) == 2 * 160 * len(text)
+    assert {w.proc.pid for w in pool._workers} == pids and pool.stats()["requests"] == 2
+
+    wav = piper_pool.pcm_to_wav(pcm, sample_rate)
+    with wave.open(io.BytesIO(wav)) as f:
+        assert f.getframerate() == 16000 and f.getnframes() == 160 * len("You can ask another question.")
+
+
+def test_crashed_or_hung_worker_is_replaced(pool):
+    pool.timeout = 1
+    for worker in pool._workers:
+        worker.timeout = 1
+    with pytest.raises(WorkerError):
+        pool.synthesize("crash")  # crashes again on the retry
+    with pytest.raises(WorkerError):
+        pool.synthesize("hang")
+    assert pool.stats()["restarts"] == 4 and pool.stats()["failures"] == 2
+    assert pool.synthesize("still works")[1]
+
+    pool._workers[0].proc.kill()
+    pool._workers[0].proc.wait()
+    pool.check()
+    assert all(w.alive for w in pool._workers) and pool.stats()["restarts"] == 5
+
+
+def test_queue_is_bounded(pool):
+    held = [pool._acquire(), pool._acquire()]
+    waiter = threading.Thread(target=lambda: pool._idle.put(pool._acquire()))
+    waiter.start()
+    while pool.stats()["waiting"] < 1:
+        time.sleep(0.01)
+    with pytest.raises(TTSBusy):
+        pool.synthesize("one too many")
+    for worker in held:
+        pool._idle.put(worker)
+    waiter.join()
+    assert pool.stats()["rejected"] == 1
+
+
+def test_voice_pools_from_settings(monkeypatch):
+    monkeypatch.setattr(piper_pool.SETTINGS, "piper_voices_dir", "")
+    monkeypatch.setattr(piper_pool.SETTINGS, "piper_worker_cmd", "")
+    assert piper_pool.synthesize_wav("Hi", "en_US-amy") is None  # voice not installed
+    monkeypatch.setattr(piper_pool.SETTINGS, "piper_worker_cmd", " ".join(_FAKE_WORKER))
+    monkeypatch.setattr(piper_pool.SETTINGS, "piper_workers", 1)
+    monkeypatch.setattr(piper_pool.SETTINGS, "piper_health_seconds", 0)
+    try:
+        assert piper_pool.synthesize_wav("Hi", "en_US-amy").startswith(b"RIFF")
+        piper_pool.synthesize_wav("Hi", "en_GB-alan")
+        assert set(piper_pool.piper_stats()) == {"en_US-amy", "en_GB-alan"}
+    finally:
+        piper_pool.shutdown()
+    assert piper_pool.piper_stats() == {}
+
+
+def test_malformed_reply_restarts_the_worker(monkeypatch):
+    pool = VoicePool("fake", _FAKE_WORKER, size=1, max_queue=1, timeout=5)
+    real_loads = piper_pool.json.loads
+    garbled = []
+
+    def loads(data):
+        if not garbled:
+            garbled.append(data)
+            raise ValueError("garbled header")
+        return real_loads(data)
+
+    monkeypatch.setattr(piper_pool, "json", SimpleNamespace(loads=loads, dumps=piper_pool.json.dumps))
+    try:
+        pid = pool._workers[0].proc.pid
+        sample_rate, pcm = pool.synthesize("Hello there.")  # retried on a fresh process
+        assert garbled and pool._workers[0].proc.pid != pid and pool.stats()["restarts"] == 1
+        # The unread PCM of the garbled reply is not taken for the next header
+        sample_rate, pcm = pool.synthesize("Next sentence.")
+        assert sample_rate == 16000 and len(pcm) == 2 * 160 * len("Next sentence.")
+    finally:
+        pool.close()
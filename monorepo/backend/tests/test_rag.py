@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from app.services.rag import build_prompt
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.rag import build_prompt, pack_prompt, select_diverse
 
 
 def test_build_prompt_dedup_and_limits():
@@ -17,3 +22,100 @@ def test_build_prompt_dedup_and_limits():
     assert "[1]" in user_msg
     assert "[2]" in user_msg
     assert user_msg.count("Source:") == 2
+
+
+def _hit(doc, page, text, vec):
+    return {"metadata": {"doc_id": doc, "filename": f"{doc}.txt", "page": page, "text": text}, "embedding": np.asarray(vec, dtype=np.float32)}
+
+
+def test_select_diverse_skips_near_duplicates():
+    hits = [
+        _hit("A", 1, "Brake pads wear out.", [1.0, 0.0, 0.0]),
+        _hit("A", 2, "Brake pads wear out!", [0.99, 0.05, 0.0]),  # overlapping window, same content
+        _hit("B", 1, "Rotors warp when hot.", [0.7, 0.7, 0.0]),
+        _hit("C", 1, "Fluid absorbs water.", [0.0, 0.0, 1.0]),
+    ]
+    order = select_diverse(hits, [1.0, 0.2, 0.0], k=4)
+    assert order[0] in (0, 1) and len(order) == 3 and {2, 3} <= set(order)
+
+
+def test_pack_prompt_respects_token_budget():
+    hits = [_hit(f"D{i}", 1, f"Section {i}. " + "word " * 60, [float(i == j) for j in range(8)]) for i in range(8)]
+    packed = pack_prompt("q?", hits, max_tokens=200, max_snippets=8)
+    assert packed.tokens <= 200
+    assert 1 < len(packed.hits) < 8 and packed.candidates == 8
+    assert packed.messages[1]["content"].count("Source:") == len(packed.hits)
+
+
+def test_slow_lexical_search_does_not_block_the_loop(monkeypatch):
+    from app.services import rag
+
+    class _SlowIndex:
+        def search(self, question, top_k=5, where=None):
+            time.sleep(0.2)
+            return [{"id": "lex", "score": 1.0, "metadata": {}}]
+
+    class _Store:
+        def query(self, vector, top_k=5, where=None, with_vectors=False):
+            return [{"id": "vec", "score": 0.1, "metadata": {}}]
+
+    async def fake_embed_query(text):
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(rag, "get_lexical_index", lambda tenant_id: _SlowIndex())
+    monkeypatch.setattr(rag, "get_store", lambda tenant_id: _Store())
+    monkeypatch.setattr(rag, "embed_query", fake_embed_query)
+
+    async def ticking(mode):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        hits = await rag.retrieve("t1", "brake pads", mode=mode)
+        ticker.cancel()
+        return hits, ticks
+
+    for mode in ("lexical", "hybrid"):
+        hits, ticks = asyncio.run(ticking(mode))
+        assert "lex" in [h["id"] for h in hits]
+        assert ticks >= 5  # the loop kept running while the search slept
+
+
+def test_cold_store_opens_off_the_loop(monkeypatch):
+    from app.services import rag
+
+    class _Store:
+        def query(self, vector, top_k=5, where=None, with_vectors=False):
+            return [{"id": "vec", "score": 0.1, "metadata": {}}]
+
+    def slow_open(tenant_id):
+        time.sleep(0.2)  # replaying a large rows.jsonl
+        return _Store()
+
+    async def fake_embed_query(text):
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(rag, "get_store", slow_open)
+    monkeypatch.setattr(rag, "embed_query", fake_embed_query)
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        hits = await rag.retrieve("t1", "brake pads", mode="vector")
+        ticker.cancel()
+        return hits, ticks
+
+    hits, ticks = asyncio.run(main())
+    assert hits[0]["id"] == "vec" and ticks >= 5
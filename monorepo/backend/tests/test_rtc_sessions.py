@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import rtc
+from app.services import rtc_sessions
+from app.services.rtc_sessions import RTCSessionManager, SessionLimit
+
+
+class _FakePC:
+    def __init__(self):
+        self.closed = 0
+
+    async def close(self):
+        self.closed += 1
+
+
+def test_sessions_are_capped_reaped_and_shut_down(monkeypatch):
+    async def main():
+        manager = RTCSessionManager(max_sessions=2, idle_seconds=30, reap_interval=5)
+        a, b = manager.open("t1"), manager.open("t2")
+        a.pc, b.pc = _FakePC(), _FakePC()
+        a.tasks.append(asyncio.create_task(asyncio.sleep(3600)))
+        try:
+            manager.open("t3")
+            raise AssertionError("expected SessionLimit")
+        except SessionLimit:
+            pass
+
+        now = rtc_sessions.time.monotonic()
+        b.touch()
+        monkeypatch.setattr(rtc_sessions.time, "monotonic", lambda: now + 20)
+        b.touch()  # recent media keeps b alive
+        monkeypatch.setattr(rtc_sessions.time, "monotonic", lambda: now + 40)
+        assert await manager.reap() == 1
+        assert a.closed and a.pc.closed == 1 and a.tasks[0].cancelled()
+        await manager.close(a)  # idempotent
+        assert a.pc.closed == 1
+
+        c = manager.open("t3")  # capacity freed
+        stats = manager.stats()
+        assert stats["sessions"] == 2 and stats["rejected"] == 1 and stats["reaped"] == 1
+        assert {s["tenant_id"] for s in stats["active"]} == {"t2", "t3"}
+        await manager.shutdown()
+        return manager, b, c
+
+    manager, b, c = asyncio.run(main())
+    assert len(manager) == 0 and b.pc.closed == 1 and c.closed
+
+
+def test_offer_rejected_when_full_and_health_reports_capacity(monkeypatch):
+    manager = RTCSessionManager(max_sessions=1, idle_seconds=30, reap_interval=10)
+    monkeypatch.setattr(rtc_sessions, "_SESSIONS", manager)
+    manager.open("t1")
+    app = FastAPI()
+    app.include_router(rtc.router, prefix="/api/v1")
+    client = TestClient(app)
+    health = client.get("/api/v1/rtc/health").json()
+    assert health["ok"] is True and "pc" in health
+    assert health["sessions"] == 1 and health["capacity"] == 1
+    if rtc._RTCPeerConnection is not None:
+        r = client.post("/api/v1/rtc/offer", json={"type": "offer", "sdp": "v=0"})
+        assert r.status_code == 503 and r.headers["Retry-After"] == "10"
+        assert manager.rejected == 1
+
+
+def test_offer_requires_a_public_key(monkeypatch):
+    monkeypatch.setattr(rtc.SETTINGS, "api_public_keys", ["pk1"])
+    monkeypatch.setattr(rtc_sessions, "_SESSIONS", RTCSessionManager(max_sessions=0, idle_seconds=30, reap_interval=10))
+    app = FastAPI()
+    app.include_router(rtc.router, prefix="/api/v1")
+    client = TestClient(app)
+    offer = {"type": "offer", "sdp": "v=0"}
+    assert client.post("/api/v1/rtc/offer", json=offer).status_code == 401
+    authorized = client.post("/api/v1/rtc/offer", json=offer, headers={"X-Public-Key": "pk1"})
+    assert authorized.status_code == 503  # past auth: no session capacity (or no aiortc)
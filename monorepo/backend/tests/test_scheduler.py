@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.routers import chat
+from app.services.scheduler import LLMScheduler, QueueFull
+
+
+async def _drain(sched: LLMScheduler, requests):
+    """Hold the only slot, queue ``requests`` behind it, then record the order they are served in."""
+    order = []
+    first = await sched.admit("warmup")
+
+    async def one(tenant, priority):
+        ticket = await sched.admit(tenant, priority)
+        order.append((tenant, priority))
+        await asyncio.sleep(0)
+        ticket.release()
+
+    tasks = []
+    for tenant, priority in requests:
+        tasks.append(asyncio.create_task(one(tenant, priority)))
+        await asyncio.sleep(0)
+    first.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_priority_classes_then_fair_share_across_tenants():
+    sched = LLMScheduler(max_concurrent=1, max_queue=32, max_tenant_queue=32, weights={"big": 2.0})
+    burst = [("noisy", "web")] * 4 + [("quiet", "web"), ("phone", "voice"), ("big", "batch")]
+    order = asyncio.run(_drain(sched, burst))
+    # Voice jumps the queue, batch goes last; the quiet tenant is not stuck behind the burst
+    assert order[0] == ("phone", "voice") and order[-1] == ("big", "batch")
+    assert order.index(("quiet", "web")) <= 2
+
+    order = asyncio.run(_drain(sched, [("a", "web")] * 4 + [("big", "web")] * 4))
+    assert [t for t, _ in order[:3]].count("big") == 2  # weight 2 gets two turns per one
+    stats = sched.stats()
+    assert stats["running"] == 0 and stats["tenants"]["noisy"]["admitted"] == 4
+    assert stats["tenants"]["noisy"]["wait_ms_max"] >= 0 and stats["tenants"]["noisy"]["queued"] == 0
+
+
+def test_queue_limits_and_cancellation():
+    async def main():
+        sched = LLMScheduler(max_concurrent=1, max_queue=3, max_tenant_queue=2)
+        held = await sched.admit("t1")
+        waiting = [asyncio.create_task(sched.admit("t1")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull) as tenant_full:
+            await sched.admit("t1")
+        other = asyncio.create_task(sched.admit("t2"))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull) as server_full:
+            await sched.admit("t3", "batch")
+        # Voice only counts itself, so a phone caller is still queued
+        voice = asyncio.create_task(sched.admit("t3", "voice"))
+        await asyncio.sleep(0)
+        waiting[0].cancel()
+        await asyncio.sleep(0)
+        held.release()
+        (await voice).release()
+        (await other).release()  # tied with t1's cancelled request, so it goes first
+        (await waiting[1]).release()
+        return sched, tenant_full.value, server_full.value
+
+    sched, tenant_full, server_full = asyncio.run(main())
+    assert tenant_full.status == 429 and server_full.status == 503
+    assert 1 <= tenant_full.retry_after <= 60
+    stats = sched.stats()
+    assert stats["running"] == 0 and stats["queued"] == {"voice": 0, "web": 0, "batch": 0}
+    assert stats["tenants"]["t1"]["rejected"] == 1 and stats["tenants"]["t3"]["rejected"] == 1
+
+
+def test_chat_returns_retry_after_when_busy(chat_client, monkeypatch):
+    async def busy(tenant_id, priority="web"):
+        raise QueueFull(503, 7, "Server busy, try again shortly")
+
+    monkeypatch.setattr(chat, "admit", busy)
+    client, _ = chat_client
+    for path in ("/api/v1/chat", "/api/v1/chat/stream"):
+        res = client.post(path, json={"message": "Hours?", "tenant": "t1"})
+        assert res.status_code == 503 and res.headers["Retry-After"] == "7"
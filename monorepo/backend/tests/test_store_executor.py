@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from app.services.vector import VectorStore, _StoreExecutor
+
+
+def test_per_tenant_limit_and_queue_depth():
+    pool = _StoreExecutor(workers=4, per_tenant=1)
+    lock = threading.Lock()
+    active = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    def work(tenant: str) -> str:
+        with lock:
+            active[tenant] += 1
+            peak[tenant] = max(peak[tenant], active[tenant])
+        time.sleep(0.02)
+        with lock:
+            active[tenant] -= 1
+        return tenant
+
+    async def main():
+        calls = [pool.run(t, work, t) for t in ("a", "a", "a", "b")]
+        tasks = [asyncio.ensure_future(c) for c in calls]
+        await asyncio.sleep(0.005)
+        depth = pool.stats()["queue_depth"]
+        return depth, await asyncio.gather(*tasks)
+
+    depth, results = asyncio.run(main())
+    assert results == ["a", "a", "a", "b"]
+    assert peak == {"a": 1, "b": 1}
+    assert depth == 2  # two "a" calls held back by the tenant limit
+    stats = pool.stats()
+    assert stats["completed"] == 4 and stats["queue_depth"] == 0 and stats["running"] == 0
+
+
+def test_async_methods_wrap_blocking_calls():
+    class _Store(VectorStore):
+        tenant_id = "t"
+
+        def __init__(self):
+            self.threads: list[str] = []
+
+        def query(self, vector, top_k=5, where=None, with_vectors=False):
+            self.threads.append(threading.current_thread().name)
+            return [{"id": "x", "score": 0.0, "top_k": top_k, "where": where}]
+
+    store = _Store()
+    hits = asyncio.run(store.aquery([1.0], top_k=3, where={"doc_id": "d"}))
+    assert hits[0]["top_k"] == 3 and hits[0]["where"] == {"doc_id": "d"}
+    assert store.threads[0].startswith("vector")
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import threading
+
+from app.services.vector import StoreRegistry, VectorStore
+
+
+class _FakeStore(VectorStore):
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_registry_reuses_and_evicts_lru():
+    opened: list[_FakeStore] = []
+
+    def factory(tenant_id: str) -> _FakeStore:
+        store = _FakeStore(tenant_id)
+        opened.append(store)
+        return store
+
+    reg = StoreRegistry(factory, max_open=2, idle_seconds=0)
+    a = reg.get("a")
+    assert reg.get("a") is a
+    reg.get("b")
+    reg.get("a")  # refresh a; b is now least recently used
+    reg.get("c")
+    stats = reg.stats()
+    assert stats["open"] == 2
+    assert stats["hits"] == 2 and stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert [s.tenant_id for s in opened if s.closed] == ["b"]
+    assert reg.get("a") is a
+
+
+def test_registry_drops_idle_stores(monkeypatch):
+    import app.services.vector as vector
+
+    clock = [100.0]
+    monkeypatch.setattr(vector.time, "monotonic", lambda: clock[0])
+    reg = StoreRegistry(_FakeStore, max_open=10, idle_seconds=60)
+    first = reg.get("a")
+    clock[0] += 61
+    second = reg.get("a")
+    assert first is not second
+    assert first.closed
+    assert reg.stats()["evictions"] == 1
+
+
+def test_slow_open_does_not_block_other_tenants():
+    release = threading.Event()
+    calls: list[str] = []
+
+    def factory(tenant_id: str) -> _FakeStore:
+        calls.append(tenant_id)
+        if tenant_id == "slow":
+            assert release.wait(5)
+        return _FakeStore(tenant_id)
+
+    reg = StoreRegistry(factory, max_open=10, idle_seconds=0)
+    results: list[_FakeStore] = []
+    slow = [threading.Thread(target=lambda: results.append(reg.get("slow"))) for _ in range(2)]
+    for t in slow:
+        t.start()
+    assert reg.get("fast").tenant_id == "fast"  # returns while "slow" is still opening
+    release.set()
+    for t in slow:
+        t.join()
+    assert calls.count("slow") == 1 and results[0] is results[1]
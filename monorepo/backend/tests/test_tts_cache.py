@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from app.services import tts
+from app.services.tts import AudioCache
+
+
+def test_phrases_are_synthesized_once_and_evicted_lru(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_synthesize(text, voice, out):
+        calls.append(text)
+        out.write_bytes(b"x" * 100)
+
+    monkeypatch.setattr(tts, "_synthesize", fake_synthesize)
+    cache = AudioCache(tmp_path, max_bytes=250)
+    a = cache.get_or_synthesize("You can ask another question.")
+    assert cache.get_or_synthesize("  You can ask\nanother question. ") == a  # same audio, same URL
+    assert cache.get_or_synthesize("You can ask another question.", voice="en_GB-alan") != a
+    assert len(calls) == 2 and cache.hits == 1
+
+    cache.get_or_synthesize("You can ask another question.")  # a is now the most recent
+    cache.get_or_synthesize("Goodbye")
+    assert (tmp_path / a).exists() and cache.evicted == 1
+    assert cache.stats()["bytes"] <= 250 and len(list(tmp_path.glob("*.wav"))) == 2
+
+    # A new process picks up the files in access order
+    os.utime(tmp_path / a, (1, 1))
+    reloaded = AudioCache(tmp_path, max_bytes=250)
+    assert reloaded.get_or_synthesize("Goodbye") and reloaded.misses == 0
+    reloaded.get_or_synthesize("Hello there")
+    assert not (tmp_path / a).exists()
+
+
+def test_prewarm_tenant_phrases(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "synthesize_wav", lambda text, voice: b"RIFF" + text.encode())
+    monkeypatch.setattr(tts.SETTINGS, "data_dir", str(tmp_path))
+    monkeypatch.setattr(tts, "_AUDIO", AudioCache(tmp_path / "audio", max_bytes=0))
+    phrases = tmp_path / "tenants" / "site_a" / "phrases.json"
+    phrases.parent.mkdir(parents=True)
+    phrases.write_text(json.dumps(["Thanks for calling.", "We are open 9 to 5.", 3]))
+    (tmp_path / "tenants" / "site_b").mkdir()
+    assert tts.prewarm() == 2
+    tts.synthesize_to_file("We are open 9 to 5.")
+    assert tts.tts_stats()["misses"] == 2 and tts.tts_stats()["hits"] == 1
+
+
+def test_missing_voice_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "synthesize_wav", lambda text, voice: None)
+    monkeypatch.setattr(tts.SETTINGS, "data_dir", str(tmp_path))
+    monkeypatch.setattr(tts, "_AUDIO", AudioCache(tmp_path / "audio", max_bytes=0))
+    with pytest.raises(tts.VoiceUnavailable):
+        tts.synthesize_to_file("Thanks for calling.")
+    assert list((tmp_path / "audio").iterdir()) == [] and tts.tts_stats()["files"] == 0
+
+    phrases = tmp_path / "tenants" / "site_a" / "phrases.json"
+    phrases.parent.mkdir(parents=True)
+    phrases.write_text(json.dumps(["Thanks for calling.", "Goodbye."]))
+    assert tts.prewarm() == 0
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile
+
+from app.main import app
+from app.services import storage
+
+
+@pytest.fixture
+def docs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage.SETTINGS, "data_dir", str(tmp_path))
+    monkeypatch.setattr(storage, "UPLOAD_CHUNK_BYTES", 1024)
+    return tmp_path / "docs" / "t1"
+
+
+def test_save_upload_streams_and_hashes(docs_dir):
+    data = b"torque spec " * 1000
+    saved = asyncio.run(storage.save_upload("t1", UploadFile(io.BytesIO(data), filename="Manual.TXT")))
+    assert saved.path.read_bytes() == data and saved.path.suffix == ".txt"
+    assert saved.size == len(data) and saved.sha256 == hashlib.sha256(data).hexdigest()
+    assert [p.name for p in docs_dir.iterdir()] == [saved.path.name]  # no temp file left behind
+
+
+def test_oversized_upload_is_aborted(docs_dir):
+    upload = UploadFile(io.BytesIO(b"x" * 5000), filename="big.txt")
+    with pytest.raises(storage.UploadTooLarge):
+        asyncio.run(storage.save_upload("t1", upload, max_bytes=4096))
+    assert upload.file.tell() <= 4096 + 1024  # stopped reading at the limit
+    assert list(docs_dir.iterdir()) == []
+
+
+def test_upload_route_returns_413(docs_dir, monkeypatch):
+    monkeypatch.setattr(storage.SETTINGS, "max_upload_mb", 0)
+    monkeypatch.setattr(storage.SETTINGS, "site_api_keys", {})
+    res = TestClient(app).post("/api/v1/uploads", files={"file": ("a.txt", b"hello", "text/plain")}, headers={"X-Tenant-Id": "t1"})
+    assert res.status_code == 413
+
+
+def test_oversized_body_is_refused_before_parsing(docs_dir, monkeypatch):
+    from app.routers import uploads
+
+    def never(*args, **kwargs):
+        raise AssertionError("route should not run")
+
+    monkeypatch.setattr(storage.SETTINGS, "max_upload_mb", 1)
+    monkeypatch.setattr(storage.SETTINGS, "site_api_keys", {})
+    monkeypatch.setattr(uploads, "save_upload", never)
+    client = TestClient(app)
+    big = b"x" * (3 * 1024 * 1024)
+    res = client.post("/api/v1/uploads", files={"file": ("a.txt", big, "text/plain")}, headers={"X-Tenant-Id": "t1"})
+    assert res.status_code == 413 and "2 MB" in res.json()["detail"]
+
+    # Without a Content-Length the body is counted as it arrives
+    def chunked():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.txt\"\r\n\r\n"
+        for _ in range(3):
+            yield b"x" * (1024 * 1024)
+
+    res = client.post(
+        "/api/v1/uploads",
+        content=chunked(),
+        headers={"X-Tenant-Id": "t1", "Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert res.status_code == 413
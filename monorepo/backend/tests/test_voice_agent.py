@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import types
+
+import numpy as np
+
+from app.services import stt, voice_agent
+from app.services.rtc_media import PCMOutputTrack, PCMSourceTrack, track_pcm
+from app.services.stt import STTStream
+from app.services.voice_agent import EnergyEndpointer, RingBuffer, VoiceAgent
+
+
+def _recording(rate: int, layout=((0.5, False), (1.0, True), (0.8, False)), seed: int = 1) -> np.ndarray:
+    """Room noise around a second of speech-like audio (noise with a syllable envelope)."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for seconds, speech in layout:
+        n = int(rate * seconds)
+        if speech:
+            envelope = 0.6 + 0.4 * np.sin(np.linspace(0, 8 * np.pi, n)) ** 2
+            parts.append(rng.normal(0, 4000, n) * envelope)
+        else:
+            parts.append(rng.normal(0, 60, n))
+    return np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+
+
+def test_ring_buffer_reads_views_and_wraps():
+    ring = RingBuffer(10)
+    ring.write(np.arange(6, dtype=np.int16))
+    view = ring.read(2, 5)
+    assert view.base is not None and list(view) == [2, 3, 4]
+    ring.write(np.arange(6, 14, dtype=np.int16))
+    assert list(ring.read(0)) == list(range(4, 14))  # oldest samples were overwritten
+    assert list(ring.read(8, 12)) == [8, 9, 10, 11]
+
+
+def test_endpointer_finds_the_utterance():
+    ring = RingBuffer(16000 * 5)
+    vad = EnergyEndpointer(ring, hangover_ms=400)
+    events = []
+    pcm = _recording(16000)
+    for i in range(0, len(pcm), 320):
+        ring.write(pcm[i : i + 320])
+        events += vad.update()
+    (start_kind, start), (end_kind, end) = events
+    assert start_kind == "start" and end_kind == "end"
+    assert 0.25 <= start / 16000 <= 0.55 and 1.45 <= end / 16000 <= 1.6
+
+
+class _StandInSTT(STTStream):
+    instances = []
+
+    def __init__(self):
+        self.samples = 0
+        _StandInSTT.instances.append(self)
+
+    def feed(self, samples):
+        self.samples += len(samples)
+
+    async def finish(self):
+        return "When are you open?"
+
+
+def _stand_in_tts(text):
+    t = np.arange(22050 * len(text) // 20) / 22050
+    return 22050, (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16).tobytes()
+
+
+def test_recorded_audio_through_the_pipeline(monkeypatch):
+    prompts = []
+
+    async def fake_retrieve(tenant_id, question, top_k=5, where=None, with_vectors=False):
+        return [{"score": 0.9, "metadata": {"filename": "hours.txt", "page": 1, "text": "Open 9-5 weekdays."}}]
+
+    async def fake_stream(messages, model=None, *, tenant_id="default", priority="web", **_):
+        prompts.append((messages, tenant_id, priority))
+        for token in "We are open nine to five on weekdays. Call us any time before then.".split(" "):
+            yield token + " "
+
+    monkeypatch.setattr(voice_agent, "retrieve", fake_retrieve)
+    monkeypatch.setattr(voice_agent, "stream_generate", fake_stream)
+    events = []
+
+    async def main():
+        output = PCMOutputTrack()
+        agent = VoiceAgent("t1", stt=_StandInSTT, synthesize=_stand_in_tts, output=output, on_event=events.append)
+        source = PCMSourceTrack(_recording(48000))
+        await agent.run(track_pcm(source))
+        frames = [await output.recv() for _ in range(3)]
+        return agent, output, frames
+
+    agent, output, frames = asyncio.run(main())
+    stt = _StandInSTT.instances[-1]
+    assert 1.0 <= stt.samples / 16000 <= 1.8  # the utterance plus pre-roll and trailing silence
+    assert prompts[0][1:] == ("t1", "voice") and "When are you open?" in prompts[0][0][-1]["content"]
+    assert [e["type"] for e in events] == ["transcript", "answer", "metrics"]
+    assert events[1]["text"].startswith("We are open nine to five on weekdays.")
+    assert {"endpoint", "stt", "retrieve", "llm_first_token", "tts", "first_audio", "turn"} <= set(agent.turns[0])
+    assert any(np.abs(f.to_ndarray()).max() > 1000 for f in frames) and output.pending_seconds > 1
+    assert voice_agent.voice_stats()["first_audio"]["count"] >= 1
+
+
+def test_talking_over_an_answer_interrupts_it(monkeypatch):
+    async def fake_retrieve(tenant_id, question, top_k=5, where=None, with_vectors=False):
+        return []
+
+    async def slow_stream(messages, **_):
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            yield "More words here. "
+
+    monkeypatch.setattr(voice_agent, "retrieve", fake_retrieve)
+    monkeypatch.setattr(voice_agent, "stream_generate", slow_stream)
+
+    async def main():
+        output = PCMOutputTrack()
+        agent = VoiceAgent("t1", stt=_StandInSTT, synthesize=_stand_in_tts, output=output)
+        layout = ((0.3, False), (0.8, True), (0.7, False), (0.8, True), (0.7, False))
+        pcm = _recording(48000, layout)
+        # Real time, so the first answer is still being generated when the caller speaks again
+        await agent.run(track_pcm(PCMSourceTrack(pcm, realtime=True)))
+        await agent.close()
+        return agent
+
+    agent = asyncio.run(main())
+    assert agent.turns[0].get("interrupted") == 1 and len(agent.turns) == 2
+
+
+def test_whisper_model_loads_off_the_event_loop(monkeypatch):
+    loads = []
+
+    class FakeWhisper:
+        def __init__(self, *args, **kwargs):
+            loads.append(threading.get_ident())
+
+        def transcribe(self, audio, **kwargs):
+            return [types.SimpleNamespace(text=" hello")], None
+
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=FakeWhisper))
+    monkeypatch.setattr(stt, "_whisper", None)
+    monkeypatch.setattr(stt.SETTINGS, "stt_engine", "whisper")
+
+    async def main():
+        stream = stt.stt_factory()()  # what VoiceAgent.push does at start of speech
+        assert loads == []
+        stream.feed(np.zeros(160, dtype=np.int16))
+        return await stream.finish()
+
+    assert asyncio.run(main()) == "hello"
+    assert len(loads) == 1 and loads[0] != threading.get_ident()
+
+    async def lifespan():
+        await stt.startup()
+        await stt.shutdown()
+
+    monkeypatch.setattr(stt, "_whisper", None)
+    asyncio.run(lifespan())
+    assert len(loads) == 2 and loads[1] != threading.get_ident()
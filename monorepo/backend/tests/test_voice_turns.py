@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import twilio
+from app.services import voice_turns
+from app.services.voice_turns import split_sentences
+
+
+async def _tokens(text: str):
+    for piece in re.findall(r"\S+\s*", text):
+        yield piece
+
+
+def test_split_sentences_joins_short_and_stops_at_limit():
+    async def collect(text, **kwargs):
+        return [s async for s in split_sentences(_tokens(text), **kwargs)]
+
+    text = "Yes. We are open from 9 to 5.30 on weekdays. Saturdays we close at noon! Call us"
+    assert asyncio.run(collect(text)) == [
+        "Yes. We are open from 9 to 5.30 on weekdays.",
+        "Saturdays we close at noon!",
+        "Call us",
+    ]
+    long_answer = " ".join(f"This is sentence number {i} of the answer." for i in range(40))
+    spoken = asyncio.run(collect(long_answer, max_chars=100))
+    assert 100 <= sum(map(len, spoken)) < 200
+
+
+def test_twilio_plays_first_sentence_then_redirects(monkeypatch):
+    synthesized = []
+    logged = []
+
+    async def fake_retrieve(tenant_id, query, top_k=5, where=None, with_vectors=False):
+        return []
+
+    async def fake_stream(messages, model=None, *, tenant_id="default", priority="web", ticket=None, **_):
+        try:
+            yield "Our hours are nine to five on weekdays. "
+            await asyncio.sleep(0.2)
+            yield "On Saturday we open at ten in the morning."
+        finally:
+            ticket.release()
+
+    def fake_synthesize(text):
+        synthesized.append(text)
+        return f"/static/audio/{len(synthesized)}.wav"
+
+    async def fake_embed(text):
+        return [0.6, 0.8]
+
+    prompts = []
+    monkeypatch.setattr(twilio, "embed_query", fake_embed)
+    monkeypatch.setattr(twilio, "build_prompt", lambda *a, **kw: prompts.append(kw) or [])
+    monkeypatch.setattr(twilio, "retrieve", fake_retrieve)
+    monkeypatch.setattr(voice_turns, "stream_generate", fake_stream)
+    monkeypatch.setattr(voice_turns, "synthesize_to_file", fake_synthesize)
+    monkeypatch.setattr(twilio, "open_session", lambda: logged.append(1))
+    monkeypatch.setattr(twilio.SETTINGS, "twilio_voice_webhook_base", "")
+    app = FastAPI()
+    app.include_router(twilio.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        first = client.post("/api/v1/twilio/handle", data={"SpeechResult": "When are you open?"}).text
+        # Answered before the second sentence was generated
+        assert "<Play>/static/audio/1.wav</Play>" in first and "2.wav" not in first
+        redirect = re.search(r"<Redirect[^>]*>([^<]+)</Redirect>", first).group(1)
+        second = client.post(redirect).text
+        assert "<Play>/static/audio/2.wav</Play>" in second
+        redirect = re.search(r"<Redirect[^>]*>([^<]+)</Redirect>", second).group(1)
+        last = client.post(redirect).text
+        assert "<Gather" in last and "<Play>" not in last
+    assert synthesized == ["Our hours are nine to five on weekdays.", "On Saturday we open at ten in the morning."]
+    assert prompts[0]["query_vector"] == [0.6, 0.8]  # over-fetched hits are ranked against the query
+    assert logged
+
+
+def test_twilio_says_the_text_when_no_voice_is_installed(monkeypatch):
+    from app.services.tts import VoiceUnavailable
+
+    async def fake_retrieve(tenant_id, query, top_k=5, where=None, with_vectors=False):
+        return []
+
+    async def fake_stream(messages, model=None, *, tenant_id="default", priority="web", ticket=None, **_):
+        try:
+            yield "Parts & labour are covered for a year. "
+        finally:
+            ticket.release()
+
+    def no_voice(text):
+        raise VoiceUnavailable("en_US-lessac-medium")
+
+    async def fake_embed(text):
+        return [1.0, 0.0]
+
+    monkeypatch.setattr(twilio, "embed_query", fake_embed)
+    monkeypatch.setattr(twilio, "retrieve", fake_retrieve)
+    monkeypatch.setattr(voice_turns, "stream_generate", fake_stream)
+    monkeypatch.setattr(voice_turns, "synthesize_to_file", no_voice)
+    monkeypatch.setattr(twilio, "open_session", lambda: None)
+    app = FastAPI()
+    app.include_router(twilio.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        first = client.post("/api/v1/twilio/handle", data={"SpeechResult": "Is it covered?"}).text
+        assert "<Say>Parts &amp; labour are covered for a year.</Say>" in first and "<Play>" not in first
+
+        async def failed_turn():
+            async def broken(messages, **_):
+                raise RuntimeError("model down")
+                yield  # pragma: no cover
+
+            monkeypatch.setattr(voice_turns, "stream_generate", broken)
+            turn = voice_turns.start_turn([], synthesize=no_voice)
+            await turn.task
+            return turn
+
+        turn = asyncio.run(failed_turn())
+        assert turn.segments == [("say", voice_turns._FALLBACK)]
@@ -1,3 +1,10 @@
 #!/usr/bin/env bash
+# Install Piper and download a voice for the TTS worker pool.
+# Usage: scripts/create_piper_voice.sh [voice] [dir]   (defaults: $TTS_VOICE or en_US-amy-medium, ./voices)
 set -euo pipefail
-echo "TODO: Install piper and download a voice model, then configure services/tts.py to use it."
+VOICE="${1:-${TTS_VOICE:-en_US-amy-medium}}"
+DIR="${2:-voices}"
+pip install piper-tts
+mkdir -p "$DIR"
+python -m piper.download_voices --download-dir "$DIR" "$VOICE"
+echo "Set PIPER_VOICES_DIR=$(cd "$DIR" && pwd); the voice name is the model file name without .onnx"
@@ -0,0 +1,134 @@
+"""Bulk-ingest a directory (or a list of files) through POST /api/v1/ingest/bulk.
+
+Usage (from monorepo/):
+  python scripts/ingest_dir.py --tenant site_a ./manuals
+  python scripts/ingest_dir.py --tenant site_a --batch 50 --parallel 2 a.pdf b.docx
+
+Files are uploaded in multipart batches, a few batches at a time; the
+server queues each batch as background ingest jobs, and the script polls
+GET /api/v1/ingest/batches/{batch_id} for per-file results. Exits non-zero
+if any file failed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+SUPPORTED_EXTS = {".pdf", ".docx", ".txt", ".md"}
+
+
+def _collect(paths: List[str]) -> List[Path]:
+    found: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            found.extend(p for p in sorted(path.rglob("*")) if p.is_file() and not p.name.startswith("."))
+        elif path.is_file():
+            found.append(path)
+        else:
+            print(f"not found: {raw}", file=sys.stderr)
+    return [p for p in found if p.suffix.lower() in SUPPORTED_EXTS]
+
+
+def _name(path: Path, roots: List[Path]) -> str:
+    # Relative to the walked directory, so "a/manual.pdf" and "b/manual.pdf" stay distinct documents
+    for root in roots:
+        if root.is_dir() and path.is_relative_to(root):
+            return path.relative_to(root).as_posix()
+    return path.name
+
+
+def _print(result: Dict[str, Any]) -> None:
+    line = f"{result['status']:>7}  {result.get('chunks', 0):5d}  {result['name']}"
+    print(line + (f"  ({result['error']})" if result.get("error") else ""))
+
+
+async def _send(client: httpx.AsyncClient, url: str, batch: List[Path], roots: List[Path], params: Dict[str, str]) -> Dict[str, Any]:
+    handles = [p.open("rb") for p in batch]
+    try:
+        files = [("files", (_name(p, roots), h, "application/octet-stream")) for p, h in zip(batch, handles)]
+        res = await client.post(url, files=files, params=params)
+    finally:
+        for h in handles:
+            h.close()
+    if res.status_code != 200:
+        error = f"HTTP {res.status_code}: {res.text[:200]}"
+        return {"batch_id": None, "results": [{"name": _name(p, roots), "status": "failed", "chunks": 0, "error": error} for p in batch]}
+    return res.json()
+
+
+async def _wait(client: httpx.AsyncClient, url: str, batch_id: str, interval: float) -> List[Dict[str, Any]]:
+    """Poll a queued batch until every file is done or failed."""
+    while True:
+        res = await client.get(f"{url}/{batch_id}")
+        res.raise_for_status()
+        body = res.json()
+        if body["finished"]:
+            return body["results"]
+        await asyncio.sleep(interval)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    roots = [Path(p) for p in args.paths]
+    paths = _collect(args.paths)
+    if not paths:
+        print("no supported files (.pdf, .docx, .txt, .md)", file=sys.stderr)
+        return 1
+    batches = [paths[i : i + args.batch] for i in range(0, len(paths), args.batch)]
+    headers = {"X-Admin-Key": args.admin_key, "X-Tenant-Id": args.tenant}
+    if args.api_key:
+        headers.update({"X-Site-Id": args.tenant, "X-Api-Key": args.api_key})
+    params = {"customer_id": args.customer} if args.customer else {}
+    base = args.server.rstrip("/") + "/api/v1/ingest"
+    gate = asyncio.Semaphore(max(1, args.parallel))
+    totals = {"files": 0, "done": 0, "failed": 0, "skipped": 0, "chunks": 0}
+    start = time.perf_counter()
+
+    def record(result: Dict[str, Any]) -> None:
+        totals["files"] += 1
+        totals[result["status"]] += 1
+        totals["chunks"] += result.get("chunks", 0)
+        _print(result)
+
+    async def run(batch: List[Path]) -> None:
+        async with gate:
+            body = await _send(client, f"{base}/bulk", batch, roots, params)
+        for result in body["results"]:
+            if result["status"] not in ("queued", "running"):
+                record(result)  # skipped, or the upload itself failed
+        if body["batch_id"] and any(r["status"] in ("queued", "running") for r in body["results"]):
+            for result in await _wait(client, f"{base}/batches", body["batch_id"], args.poll):
+                record(result)
+
+    async with httpx.AsyncClient(headers=headers, timeout=httpx.Timeout(args.timeout, connect=10.0)) as client:
+        await asyncio.gather(*(run(batch) for batch in batches))
+    totals["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(totals))
+    return 1 if totals["failed"] else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="directories (walked recursively) and/or files")
+    parser.add_argument("--tenant", default=os.environ.get("TENANT", "default"))
+    parser.add_argument("--customer", default=None)
+    parser.add_argument("--server", default=os.environ.get("SERVER", "http://127.0.0.1:8000"))
+    parser.add_argument("--admin-key", default=os.environ.get("ADMIN_API_KEY", "admin_CHANGE_ME"))
+    parser.add_argument("--api-key", default=os.environ.get("SITE_API_KEY"), help="site API key, when SITE_API_KEYS is set")
+    parser.add_argument("--batch", type=int, default=25, help="files per request")
+    parser.add_argument("--parallel", type=int, default=2, help="requests in flight")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per request (uploads only; ingestion is polled)")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between batch status checks")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
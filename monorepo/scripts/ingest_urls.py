@@ -0,0 +1,55 @@
+"""Crawl a tenant's website (seed pages and/or sitemaps) and ingest changed pages.
+
+Usage (from monorepo/):
+  python scripts/ingest_urls.py --tenant site_a https://example.com/sitemap.xml
+  python scripts/ingest_urls.py --tenant site_a --per-host 4 --delay 0.25 https://example.com/
+
+Crawl state (ETag/Last-Modified and text hashes) lives in DATA_DIR/crawl/<tenant>.json,
+so re-running only re-ingests pages that changed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.services import ollama  # noqa: E402
+from app.services.crawler import Crawler  # noqa: E402
+
+
+async def _main(args: argparse.Namespace) -> None:
+    crawler = Crawler(
+        args.tenant,
+        customer_id=args.customer,
+        per_host=args.per_host,
+        delay=args.delay,
+        concurrency=args.concurrency,
+        max_pages=args.max_pages,
+        follow_links=not args.no_follow,
+    )
+    try:
+        stats = await crawler.run(args.seeds)
+    finally:
+        await ollama.shutdown()
+    print(json.dumps(stats.as_dict()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("seeds", nargs="+", help="page or sitemap URLs")
+    parser.add_argument("--tenant", required=True)
+    parser.add_argument("--customer", default=None)
+    parser.add_argument("--per-host", type=int, default=2, help="concurrent requests per host")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds between request starts per host")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-pages", type=int, default=5000)
+    parser.add_argument("--no-follow", action="store_true", help="only fetch the seeds/sitemap entries")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
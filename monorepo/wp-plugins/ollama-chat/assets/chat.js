@@ -109,8 +109,9 @@
         } catch (e) { }
         const offer = await pc.createOffer();
         await pc.setLocalDescription(offer);
+        const headers = { 'Content-Type': 'application/json' }; if (cfg.public_key) headers['X-Public-Key'] = cfg.public_key; if (cfg.tenant_override && tenantAttr !== 'auto') headers['X-Tenant-Id'] = cfg.tenant_override;
         const res = await fetch(api.replace(/\/$/, '') + '/api/v1/rtc/offer', {
-          method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ type: offer.type, sdp: offer.sdp })
+          method: 'POST', headers, body: JSON.stringify({ type: offer.type, sdp: offer.sdp })
         });
         if (!res.ok) { callLog.textContent = 'Error: ' + res.status; return; }
         const answer = await res.json(); await pc.setRemoteDescription(answer);